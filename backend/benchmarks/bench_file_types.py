@@ -0,0 +1,141 @@
+"""Accuracy and cost of the paste file-type classifier.
+
+Samples real source files from the local system (the Python installation,
+/usr/include, /usr/share and /usr/lib by default), labels them by file
+extension and classifies their content without hints (the hard case). It
+reports per-type accuracy next to the substring heuristic the classifier
+replaced, then the cost per paste and per MB with a cold and a warm
+decision cache. Types with no files under the roots are listed as missing.
+
+    cd backend && python benchmarks/bench_file_types.py [--per-type N] [ROOT ...]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scrapers import file_types  # noqa: E402
+
+# Labels come from file extensions. Ambiguous ones (.h is C or C++, .txt
+# holds anything from licences to lists) and non-paste formats are left out.
+LABELS = {extension: file_type for extension, file_type in file_types.EXTENSIONS.items()
+          if extension not in ('h', 'txt', 'text', 'log', 'svg')}
+
+DEFAULT_ROOTS = (sys.prefix, '/usr/include', '/usr/share', '/usr/lib')
+
+# Real pastes are rarely bigger; larger files are skipped
+MAX_BYTES = 256 * 1024
+
+
+def legacy_classify(content: str) -> str:
+    """The content fallback of the former PastebinScraper._detect_file_type"""
+    content_lower = content.lower()
+    if content.strip().startswith('{') and content.strip().endswith('}'):
+        return 'json'
+    elif '<?php' in content_lower:
+        return 'php'
+    elif 'def ' in content and 'import ' in content:
+        return 'py'
+    elif 'function' in content and ('var ' in content or 'const ' in content):
+        return 'js'
+    elif 'select ' in content_lower or 'insert ' in content_lower:
+        return 'sql'
+    elif '<html' in content_lower or '<!doctype' in content_lower:
+        return 'html'
+    elif content.strip().startswith('<') and content.strip().endswith('>'):
+        return 'xml'
+    return 'txt'
+
+
+def build_corpus(roots, per_type: int, rng: random.Random):
+    """Up to `per_type` files of each type found under `roots`, as (label, text)"""
+    found = {}
+    for root in roots:
+        for directory, _, names in os.walk(root):
+            for name in names:
+                label = LABELS.get(name.rsplit('.', 1)[-1].lower()) if '.' in name else None
+                if label:
+                    found.setdefault(label, []).append(os.path.join(directory, name))
+    
+    corpus = []
+    for label in sorted(found):
+        paths = found[label]
+        rng.shuffle(paths)
+        taken = 0
+        for path in paths:
+            if taken == per_type:
+                break
+            try:
+                if not 0 < os.path.getsize(path) <= MAX_BYTES:
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    text = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            if text.strip():
+                corpus.append((label, text))
+                taken += 1
+    return corpus
+
+
+def accuracy(corpus, classify):
+    right, seen = Counter(), Counter()
+    for label, text in corpus:
+        seen[label] += 1
+        right[label] += classify(text) == label
+    return right, seen
+
+
+def timed(corpus, classify, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in corpus:
+            classify(text)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-type', type=int, default=200, help='files sampled per type')
+    parser.add_argument('roots', nargs='*', default=DEFAULT_ROOTS, help='directories to sample files from')
+    args = parser.parse_args()
+    rng = random.Random(42)
+    corpus = build_corpus(args.roots, args.per_type, rng)
+    if not corpus:
+        sys.exit('No labelled files found')
+    
+    new_right, seen = accuracy(corpus, file_types.classify)
+    old_right, _ = accuracy(corpus, legacy_classify)
+    print(f'{"type":6} {"files":>7} {"classifier":>11} {"legacy":>8}')
+    for label in file_types.FILE_TYPES:
+        if seen[label]:
+            print(f'{label:6} {seen[label]:7} {new_right[label] / seen[label]:11.1%} '
+                  f'{old_right[label] / seen[label]:8.1%}')
+    total = sum(seen.values())
+    print(f'{"all":6} {total:7} {sum(new_right.values()) / total:11.1%} {sum(old_right.values()) / total:8.1%}')
+    missing = [label for label in file_types.FILE_TYPES if label != 'txt' and not seen[label]]
+    if missing:
+        print(f'no files found for: {", ".join(missing)}')
+    
+    # Most pastes are a few KB; the windowed classifier's cost does not grow
+    # with size, so large ones are built by repeating files past 1 MB
+    small = [(label, text) for label, text in corpus if len(text) <= 4096]
+    large = [(label, text * (1024 * 1024 // len(text) + 1)) for label, text in corpus[::max(len(corpus) // 25, 1)]]
+    for name, sample in (('up to 4 KB', small), ('all', corpus), ('1 MB+', large)):
+        megabytes = sum(len(text) for _, text in sample) / 1e6
+        file_types.clear_cache()
+        cold = timed(sample, file_types.classify)
+        warm = timed(sample, file_types.classify, repeat=3)
+        legacy = timed(sample, legacy_classify)
+        print(f'\n{name} pastes: {len(sample)} pastes, {megabytes:.1f} MB')
+        for what, seconds in (('classifier, cold cache', cold), ('classifier, warm cache', warm),
+                              ('legacy heuristic', legacy)):
+            print(f'  {what:24} {seconds / len(sample) * 1e6:9.1f} us/paste {seconds / megabytes * 1e3:9.2f} ms/MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Correctness and speed of HTML to text extraction on paste-site pages.
+
+Builds pages shaped like paste-site views (navigation, inline scripts and
+styles, a highlighted code listing and a raw <textarea>), a gist-like page
+and a page with broken markup, then checks each extractor for script/style
+leakage, undecoded entities and paste lines lost, and times it per MB. The
+extractor is compared with the regex tag stripper it replaced, a streaming
+run in 8 KB chunks, the standard library HTMLParser and BeautifulSoup.
+
+    cd backend && python benchmarks/bench_html_text.py [--lines N]
+"""
+import argparse
+import html
+import os
+import random
+import re
+import sys
+import time
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.scrapers.html_text import HtmlTextExtractor, html_to_text  # noqa: E402
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None  # bs4 is optional here; its row is skipped
+
+# Present only in scripts, styles and comments: must never reach the text
+JUNK = ('googletag_slot', 'font-family:__junk', 'tracking_pixel', 'HIDDEN_COMMENT')
+
+HEAD = (
+    '<!DOCTYPE html><html><head><title>{title} - Pastebin.com</title>'
+    '<style>body {{ font-family:__junk; }} .de1 {{ color: #333; }}</style>'
+    '<script>window.googletag_slot = "<div>" + (a < b) + "</div>";</script>'
+    '<script type="text/javascript" src="/js/app.js"></script>'
+    '</head><body><!-- HIDDEN_COMMENT --><div class="header"><a href="/">Home</a> | '
+    '<a href="/archive">Archive</a></div><noscript><img src="/tracking_pixel.gif"></noscript>'
+)
+WORDS = ('password', 'token', 'server', 'user', 'config', 'admin', 'key', 'port', 'db', 'host')
+LINE_TEMPLATES = (
+    '{w}_{n} = "{w}-{n}" && {w} < {n}',
+    'if ({w} > {n}) {{ return "<{w}>"; }}',
+    "SELECT * FROM {w} WHERE id = '{n}' & flag;",
+    '# note: {w} {n} is the "primary" {w}',
+)
+
+
+def paste_lines(count: int, rng: random.Random):
+    return [rng.choice(LINE_TEMPLATES).format(w=rng.choice(WORDS), n=rng.randint(1, 99999)) for _ in range(count)]
+
+
+def pastebin_page(lines):
+    listing = ''.join(f'<li class="li1"><div class="de1">{html.escape(line)}</div></li>\n' for line in lines)
+    raw = html.escape('\n'.join(lines))
+    return (HEAD.format(title='Untitled') + f'<div class="source"><ol>{listing}</ol></div>'
+            + f'<textarea class="textarea">{raw}</textarea>'
+            + '<script>tracking_pixel(); if (x < 1 && y > 2) {}</script></body></html>')
+
+
+def gist_page(lines):
+    rows = ''.join(f'<tr><td class="blob-num">{i}</td><td class="blob-code"><span class="pl-k">'
+                   f'{html.escape(line, quote=False)}</span></td></tr>\n' for i, line in enumerate(lines, 1))
+    return HEAD.format(title='gist') + f'<table class="highlight">{rows}</table></body></html>'
+
+
+def broken_page(lines):
+    # Unclosed tags, bare '<' and '&' in text, an unterminated comment at the end
+    body = ''.join('<p>' + line.replace('&&', '&amp;&amp;').replace('"<', '"&lt;') + '<br>\n' for line in lines)
+    return HEAD.format(title='broken') + f'<div><span>{body}</div></span><!-- HIDDEN_COMMENT never closed'
+
+
+def legacy_extract(markup: str) -> str:
+    """The former BaseScraper._extract_text_content"""
+    text = re.sub(r'<[^>]+>', '', markup)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class _ParserExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style', 'noscript'):
+            self.skip += 1
+    
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style', 'noscript'):
+            self.skip = max(self.skip - 1, 0)
+    
+    def handle_data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+
+def htmlparser_extract(markup: str) -> str:
+    parser = _ParserExtractor()
+    parser.feed(markup)
+    parser.close()
+    return re.sub(r'\s+', ' ', ''.join(parser.parts)).strip()
+
+
+def soup_extract(markup: str) -> str:
+    soup = BeautifulSoup(markup, 'html.parser')
+    for element in soup(['script', 'style', 'noscript', 'template']):
+        element.decompose()
+    return soup.get_text(' ', strip=True)
+
+
+def streamed_extract(markup: str, chunk_size: int = 8192) -> str:
+    extractor = HtmlTextExtractor()
+    for start in range(0, len(markup), chunk_size):
+        extractor.feed(markup[start:start + chunk_size])
+    return extractor.close()
+
+
+def correctness(text: str, lines):
+    """(junk leaked, undecoded entities, share of paste lines found)"""
+    leaked = sum(junk in text for junk in JUNK)
+    entities = len(re.findall(r'&(?:amp|lt|gt|quot|#x?[0-9a-f]+);', text))
+    flat = re.sub(r'\s+', ' ', text)
+    found = sum(re.sub(r'\s+', ' ', line) in flat for line in lines) / len(lines)
+    return leaked, entities, found
+
+
+def timed(extract, markup, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract(markup)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=2000, help='paste lines per page')
+    args = parser.parse_args()
+    rng = random.Random(48)
+    lines = paste_lines(args.lines, rng)
+    pages = {
+        'pastebin view': pastebin_page(lines),
+        'gist view': gist_page(lines),
+        'broken markup': broken_page(lines),
+        'stray "<" text': 'if a < b and c <d then ' * (args.lines * 2),
+    }
+    extractors = [('html_text', html_to_text), ('html_text, 8 KB chunks', streamed_extract),
+                  ('legacy regex', legacy_extract), ('HTMLParser', htmlparser_extract)]
+    if BeautifulSoup is not None:
+        extractors.append(('BeautifulSoup', soup_extract))
+    
+    for name, markup in pages.items():
+        megabytes = len(markup) / 1e6
+        print(f'\n{name}: {megabytes:.2f} MB')
+        print(f'  {"extractor":24} {"ms/MB":>9} {"junk leaked":>12} {"entities":>9} {"lines found":>12}')
+        for label, extract in extractors:
+            seconds = timed(extract, markup)
+            if name.startswith('stray'):
+                leaked, entities, found = 0, 0, float('nan')
+            else:
+                leaked, entities, found = correctness(extract(markup), lines)
+            print(f'  {label:24} {seconds / megabytes * 1e3:9.1f} {leaked:>8}/{len(JUNK)} {entities:9} {found:12.1%}')
+
+
+if __name__ == '__main__':
+    main()
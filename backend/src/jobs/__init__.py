@@ -0,0 +1 @@
+# Background jobs that run alongside the API (retention, queue workers, scheduling)
@@ -0,0 +1,260 @@
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+from src.models.jobs import SessionCheckpoint, SessionJob, SessionShard
+from src.models.scraper import SearchSession, db
+from src.jobs.fairshare import saturated_services
+
+ACTIVE_SHARD_STATUSES = ('queued', 'running')
+
+
+def split_session(session: SearchSession) -> int:
+    """Create one shard per service of a session. The caller commits.
+    
+    Shards inherit the fair-share tag of the session's job, so they are
+    claimed in the same order as the sessions were.
+    """
+    services = json.loads(session.services) if session.services else []
+    fair_tag = db.session.query(db.func.max(SessionJob.fair_tag))\
+                         .filter_by(session_id=session.id).scalar() or 0.0
+    existing = {
+        service_id for (service_id,) in
+        db.session.query(SessionShard.service_id).filter_by(session_id=session.id)
+    }
+    
+    created = 0
+    for service_id in services:
+        if service_id not in existing:
+            db.session.add(SessionShard(session_id=session.id, service_id=service_id, fair_tag=fair_tag))
+            created += 1
+    return created
+
+
+def claim_shard(worker_id: str, lease_seconds: int = 60,
+                service_concurrency: int = 0) -> Optional[Tuple[int, int, str]]:
+    """Atomically lease the next runnable shard to `worker_id`.
+    
+    Shards are served in fair-share order. At most `service_concurrency`
+    shards run against one service across the cluster (0 disables the
+    budget); shards of a saturated service wait while others go ahead.
+    
+    Returns (shard_id, session_id, service_id), or None when nothing is
+    claimable. Shards whose lease expired are reclaimed here. As in
+    `claim_job`, the UPDATE re-checks the shard and PostgreSQL skips rows
+    locked by another claim.
+    """
+    now = datetime.utcnow()
+    
+    claimable = SessionShard.status == 'queued'
+    if service_concurrency:
+        claimable = db.and_(
+            claimable, SessionShard.service_id.notin_(saturated_services(service_concurrency, now))
+        )
+    
+    claimable = db.and_(
+        db.or_(
+            claimable,
+            db.and_(SessionShard.status == 'running', SessionShard.lease_expires_at < now)
+        ),
+        SessionShard.attempts < SessionShard.max_attempts
+    )
+    candidate = db.select(SessionShard.id).where(claimable)\
+                  .order_by(SessionShard.fair_tag, SessionShard.id).limit(1)\
+                  .with_for_update(skip_locked=True).scalar_subquery()
+    
+    row = db.session.execute(
+        db.update(SessionShard)
+        .where(SessionShard.id == candidate, claimable)
+        .values(
+            status='running',
+            lease_owner=worker_id,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=SessionShard.attempts + 1
+        )
+        .returning(SessionShard.id, SessionShard.session_id, SessionShard.service_id)
+    ).first()
+    db.session.commit()
+    
+    return (row.id, row.session_id, row.service_id) if row else None
+
+
+def renew_shard_lease(shard_id: int, worker_id: str, lease_seconds: int = 60) -> bool:
+    """Extend a held shard lease. Returns False if the lease was lost."""
+    result = db.session.execute(
+        db.update(SessionShard)
+        .where(
+            SessionShard.id == shard_id,
+            SessionShard.lease_owner == worker_id,
+            SessionShard.status == 'running'
+        )
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _saved_results():
+    """Results a shard's service has saved so far, over all its attempts"""
+    saved = db.select(SessionCheckpoint.results_count).where(
+        SessionCheckpoint.session_id == SessionShard.session_id,
+        SessionCheckpoint.service_id == SessionShard.service_id
+    ).scalar_subquery()
+    return db.func.coalesce(saved, 0)
+
+
+def finish_shard(shard_id: int, worker_id: str, status: str = 'done', error: Optional[str] = None):
+    """Release a shard with its final status (a cancelled shard stays cancelled).
+    
+    Its results count is what the service saved, which a failed shard
+    keeps as well: those results stay in the session.
+    """
+    db.session.execute(
+        db.update(SessionShard)
+        .where(
+            SessionShard.id == shard_id,
+            SessionShard.lease_owner == worker_id,
+            SessionShard.status == 'running'
+        )
+        .values(
+            status=status,
+            results_count=_saved_results(),
+            last_error=error,
+            lease_expires_at=None,
+            finished_at=datetime.utcnow()
+        )
+    )
+    db.session.commit()
+
+
+def cancel_session_shards(session_id: int) -> int:
+    """Cancel a session's unfinished shards. The caller commits."""
+    result = db.session.execute(
+        db.update(SessionShard)
+        .where(SessionShard.session_id == session_id, SessionShard.status.in_(ACTIVE_SHARD_STATUSES))
+        .values(status='cancelled', lease_expires_at=None, finished_at=datetime.utcnow())
+    )
+    return result.rowcount
+
+
+def fail_exhausted_shards() -> list:
+    """Fail expired shards that have no attempts left; returns their session ids"""
+    now = datetime.utcnow()
+    exhausted = SessionShard.query.filter(
+        SessionShard.status == 'running',
+        SessionShard.lease_expires_at < now,
+        SessionShard.attempts >= SessionShard.max_attempts
+    ).all()
+    
+    for shard in exhausted:
+        shard.status = 'failed'
+        shard.last_error = shard.last_error or 'Lease expired on final attempt'
+        shard.results_count = _saved_results()
+        shard.finished_at = now
+    
+    db.session.commit()
+    return sorted({shard.session_id for shard in exhausted})
+
+
+def claim_session_completion(session_id: int) -> Optional[str]:
+    """Finish a session once every shard is; returns its final status to exactly one caller.
+    
+    The check and the claim are a single conditional UPDATE that also moves
+    the session to its final status, so when the last shards finish on
+    different nodes at the same moment only one of them finalises the
+    session, and a claimer that dies afterwards leaves no session running.
+    A session whose shards all failed ends in 'error', any other in
+    'completed'. Returns None to every other caller.
+    """
+    pending = db.select(SessionShard.id).where(
+        SessionShard.session_id == session_id,
+        SessionShard.status.in_(ACTIVE_SHARD_STATUSES)
+    ).exists()
+    succeeded = db.select(SessionShard.id).where(
+        SessionShard.session_id == session_id,
+        SessionShard.status != 'failed'
+    ).exists()
+    
+    result = db.session.execute(
+        db.update(SearchSession)
+        .where(
+            SearchSession.id == session_id,
+            SearchSession.status == 'running',
+            ~pending
+        )
+        .values(
+            status=db.case((succeeded, 'completed'), else_='error'),
+            completed_at=datetime.utcnow()
+        )
+    )
+    db.session.commit()
+    if result.rowcount != 1:
+        return None
+    return db.session.scalar(db.select(SearchSession.status).where(SearchSession.id == session_id))
+
+
+def session_shard_results(session_id: int) -> int:
+    """Total results found by a session's shards"""
+    return db.session.query(db.func.coalesce(db.func.sum(SessionShard.results_count), 0))\
+                     .filter_by(session_id=session_id).scalar()
+
+
+class DatabaseRateBudget:
+    """Per-service token bucket kept in the shared database.
+    
+    Every worker process and node draws from the same bucket, so a service's
+    rate limit holds for the whole cluster rather than per process. Refill
+    and take happen in one conditional UPDATE; when the bucket is empty the
+    caller sleeps until the next token is due.
+    """
+    
+    def __init__(self, burst_seconds: float = 1.0):
+        self.burst_seconds = burst_seconds
+    
+    def acquire(self, service_id: str, rate_limit: int, cancel=None):
+        """Block until a request to `service_id` is allowed.
+        
+        With a CancellationToken as `cancel`, the wait raises ScrapeCancelled
+        as soon as the token is cancelled.
+        """
+        refill = rate_limit / 60.0
+        capacity = max(1.0, refill * self.burst_seconds)
+        available_sql = (
+            'CASE WHEN tokens + (:now - updated_at) * :refill > :capacity '
+            'THEN :capacity ELSE tokens + (:now - updated_at) * :refill END'
+        )
+        
+        while True:
+            now = time.time()
+            params = {'service_id': service_id, 'now': now, 'refill': refill, 'capacity': capacity}
+            
+            # Separate connection: never commit the caller's ORM transaction
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    'INSERT INTO service_rate_budgets '
+                    '(service_id, tokens, capacity, refill_per_second, updated_at) '
+                    'VALUES (:service_id, :capacity, :capacity, :refill, :now) '
+                    'ON CONFLICT (service_id) DO NOTHING'
+                ), params)
+                
+                taken = conn.execute(text(
+                    f'UPDATE service_rate_budgets '
+                    f'SET tokens = {available_sql} - 1, updated_at = :now, '
+                    f'capacity = :capacity, refill_per_second = :refill '
+                    f'WHERE service_id = :service_id AND {available_sql} >= 1'
+                ), params).rowcount
+                
+                if taken:
+                    return
+                
+                available = conn.execute(text(
+                    f'SELECT {available_sql} FROM service_rate_budgets WHERE service_id = :service_id'
+                ), params).scalar() or 0.0
+            
+            delay = max((1.0 - available) / refill, 0.01)
+            if cancel:
+                cancel.sleep(delay)
+            else:
+                time.sleep(delay)
@@ -0,0 +1,103 @@
+import json
+import logging
+import threading
+from typing import Callable, Dict, Iterable, Tuple
+
+from src.models.scraper import SearchSession, SearchLog, SearchResult, db
+from src.models.jobs import SessionCheckpoint
+from src.utils.events import EventBus
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 1.0
+
+
+class DatabaseEventRelay:
+    """Feeds the event bus from the database for sessions run elsewhere.
+    
+    A session executed by a queue worker or another API process publishes
+    nothing to this process's bus. While streams are open, one thread reads
+    new log and result rows, checkpoint progress and status changes of all
+    watched sessions in four queries per poll, however many clients are
+    connected; sessions running in this process (`is_local`) are skipped
+    since they publish directly.
+    """
+    
+    def __init__(self, app, bus: EventBus, is_local: Callable[[int], bool],
+                 poll_seconds: float = POLL_SECONDS):
+        self.app = app
+        self.bus = bus
+        self.is_local = is_local
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = None
+        self._progress: Dict[int, Tuple[float, int]] = {}  # last progress event relayed per session
+    
+    def start(self):
+        """Start the background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='event-relay', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Ask the background thread to exit after its current poll"""
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            session_ids = [sid for sid in self.bus.watched() if not self.is_local(sid)]
+            if not session_ids:
+                continue
+            with self.app.app_context():
+                try:
+                    self.relay(session_ids)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Event relay poll failed: {e}")
+    
+    def relay(self, session_ids: Iterable[int]):
+        """Publish new logs, results, progress and status changes of the given sessions"""
+        session_ids = list(session_ids)
+        for session_id in set(self._progress) - set(session_ids):
+            del self._progress[session_id]
+        
+        # Every stream starts from a snapshot that records its last log and result ids
+        after = min(self.bus.last_log_id(sid) or 0 for sid in session_ids)
+        logs = SearchLog.query.filter(SearchLog.session_id.in_(session_ids), SearchLog.id > after)\
+                              .order_by(SearchLog.id).all()
+        for log in logs:
+            self.bus.publish_log(log.session_id, log.to_dict())
+        
+        after = min(self.bus.last_result_id(sid) or 0 for sid in session_ids)
+        results = db.session.query(*SearchResult.listing_columns())\
+                            .filter(SearchResult.session_id.in_(session_ids), SearchResult.id > after)\
+                            .order_by(SearchResult.id).all()
+        for row in results:
+            self.bus.publish_result(row.session_id, SearchResult.row_to_dict(row))
+        
+        # Checkpoints commit with every batch of results, so they give the
+        # progress of a running session before its results_count is set
+        checkpoints = {
+            session_id: (done or 0, found or 0)
+            for session_id, done, found in db.session.query(
+                SessionCheckpoint.session_id,
+                db.func.sum(db.case((SessionCheckpoint.status == 'done', 1), else_=0)),
+                db.func.sum(SessionCheckpoint.results_count)
+            ).filter(SessionCheckpoint.session_id.in_(session_ids))
+             .group_by(SessionCheckpoint.session_id)
+        }
+        
+        rows = db.session.query(SearchSession.id, SearchSession.status, SearchSession.results_count,
+                                SearchSession.services)\
+                         .filter(SearchSession.id.in_(session_ids)).all()
+        for session_id, status, results_count, services in rows:
+            if status == 'running' and session_id in checkpoints:
+                done, found = checkpoints[session_id]
+                progress = (done / max(len(json.loads(services or '[]')), 1)) * 100
+                if self._progress.get(session_id) != (progress, found):
+                    self._progress[session_id] = (progress, found)
+                    self.bus.publish(session_id, 'progress', {'progress': progress, 'results_count': found})
+            self.bus.publish_status(session_id, status, results_count=results_count)
+        db.session.commit()
@@ -0,0 +1,118 @@
+import math
+from datetime import datetime
+from typing import Any, Dict
+
+from src.models.jobs import SessionJob, SessionShard
+from src.models.scraper import SearchSession, db
+
+# Limits of 0 disable the corresponding check
+DEFAULT_CONFIG = {
+    'MAX_RUNNING_PER_USER': 2,   # sessions a user may have running at once
+    'SERVICE_CONCURRENCY': 4,    # shards running against one service, cluster-wide
+    'LOCAL_WORKERS': 8,          # in-process workers in thread execution mode
+}
+
+MIN_PRIORITY = 0
+MAX_PRIORITY = 5
+
+# Estimated wait when no session has completed yet
+DEFAULT_SESSION_SECONDS = 60
+
+# First key of the PostgreSQL advisory locks serialising one user's claims
+USER_CLAIM_LOCK = 0x5043
+
+
+def session_weight(priority: int) -> int:
+    """Share of a session relative to a priority-0 session of another user"""
+    return 1 + max(MIN_PRIORITY, min(priority or 0, MAX_PRIORITY))
+
+
+def next_fair_tag(user_id: int, priority: int = 0) -> float:
+    """Virtual finish time for a newly queued session (start-time fair queuing).
+    
+    A session starts at the later of the queue's virtual clock (the tag of
+    the most recently started job) and its user's last queued or running
+    tag, and finishes 1/weight after that. Workers serve the smallest tag
+    first, so users take turns however many sessions each of them queues,
+    and higher-priority sessions advance proportionally faster.
+    """
+    clock = db.session.query(db.func.max(SessionJob.fair_tag))\
+                      .filter(SessionJob.started_at.isnot(None)).scalar() or 0.0
+    user_last = db.session.query(db.func.max(SessionJob.fair_tag))\
+                          .filter(SessionJob.user_id == user_id,
+                                  SessionJob.status.in_(('queued', 'running'))).scalar() or 0.0
+    
+    return max(clock, user_last) + 1.0 / session_weight(priority)
+
+
+def saturated_users(max_running: int, now: datetime):
+    """Users already running `max_running` sessions, as a subquery.
+    
+    A session counts as running from the moment its job is leased, not only
+    once its own status says so. Sharded sessions, whose job finishes as
+    soon as the shards are created, count by their status.
+    
+    The count only sees claims committed before the statement embedding it
+    started; `claim_job` holds `lock_user_claims` around it so concurrent
+    claimers of one user's jobs cannot both pass it.
+    """
+    leased = db.select(SessionJob.session_id, SessionJob.user_id)\
+               .where(SessionJob.status == 'running', SessionJob.lease_expires_at >= now,
+                      SessionJob.user_id.isnot(None))
+    running = db.select(SearchSession.id, SearchSession.user_id)\
+                .where(SearchSession.status == 'running')
+    active = db.union(leased, running).subquery()
+    return db.select(active.c.user_id)\
+             .group_by(active.c.user_id)\
+             .having(db.func.count() >= max_running)
+
+
+def lock_user_claims(user_id: int):
+    """Serialise claims of `user_id`'s jobs until the transaction ends.
+    
+    SQLite runs one write transaction at a time, so this is only needed on
+    PostgreSQL, where a READ COMMITTED statement does not see a claim
+    another transaction has not committed yet. The lock is released by the
+    claimer's commit, after which the next claimer's statements see it.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:namespace, :user_id)'),
+                           {'namespace': USER_CLAIM_LOCK, 'user_id': user_id})
+
+
+def saturated_services(concurrency: int, now: datetime):
+    """Services with `concurrency` live shard leases, as a subquery"""
+    return db.select(SessionShard.service_id)\
+             .where(SessionShard.status == 'running', SessionShard.lease_expires_at >= now)\
+             .group_by(SessionShard.service_id)\
+             .having(db.func.count(SessionShard.id) >= concurrency)
+
+
+def queue_estimates() -> Dict[int, Dict[str, Any]]:
+    """Queue position and estimated wait of every queued session.
+    
+    Positions follow the fair-share order workers claim in. The wait
+    assumes the currently running sessions keep their slots busy and each
+    slot takes the recent average session duration; per-user caps are not
+    simulated, so it is an estimate.
+    """
+    queued = db.session.query(SessionJob.session_id)\
+                       .filter(SessionJob.status == 'queued',
+                               SessionJob.attempts < SessionJob.max_attempts)\
+                       .order_by(SessionJob.fair_tag, SessionJob.id).all()
+    if not queued:
+        return {}
+    
+    slots = max(SearchSession.query.filter_by(status='running').count(), 1)
+    recent = db.select(SearchSession.duration)\
+               .where(SearchSession.status == 'completed', SearchSession.duration > 0)\
+               .order_by(SearchSession.completed_at.desc()).limit(50).subquery()
+    average = db.session.query(db.func.avg(recent.c.duration)).scalar() or DEFAULT_SESSION_SECONDS
+    
+    return {
+        session_id: {
+            'queue_position': position,
+            'estimated_wait_seconds': int(math.ceil(position / slots) * average)
+        }
+        for position, (session_id,) in enumerate(queued, start=1)
+    }
@@ -0,0 +1,259 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from src.models.jobs import SessionJob, SessionShard
+from src.models.scraper import SearchSession, UserStats, db
+from src.jobs.fairshare import lock_user_claims, next_fair_tag, saturated_users
+
+ACTIVE_JOB_STATUSES = ('queued', 'running')
+
+
+def enqueue_session(session_id: int) -> Optional[SessionJob]:
+    """Queue a session for the worker pool at its fair-share position.
+    
+    Returns None if the session already has a queued or running job. The
+    caller commits.
+    """
+    existing = SessionJob.query.filter(
+        SessionJob.session_id == session_id,
+        SessionJob.status.in_(ACTIVE_JOB_STATUSES)
+    ).first()
+    if existing:
+        return None
+    
+    session = db.session.get(SearchSession, session_id)
+    if not session:
+        return None
+    
+    priority = session.priority or 0
+    job = SessionJob(
+        session_id=session_id, user_id=session.user_id, priority=priority,
+        fair_tag=next_fair_tag(session.user_id, priority)
+    )
+    db.session.add(job)
+    
+    if session.status != 'running':
+        UserStats.reopen(session)
+        session.status = 'queued'
+    
+    return job
+
+
+def claim_job(worker_id: str, lease_seconds: int = 60,
+              max_running_per_user: int = 0) -> Optional[Tuple[int, int]]:
+    """Atomically lease the next runnable job to `worker_id`.
+    
+    Queued jobs and running jobs whose lease has expired are both claimable,
+    smallest fair-share tag first (see `src.jobs.fairshare`). Queued jobs of
+    users already running `max_running_per_user` sessions wait (0 disables
+    the cap). The selection, the cap check and the lease are one UPDATE, so
+    concurrent workers (in any process) never claim the same job or claim
+    past the cap. The UPDATE re-checks that the job is still claimable, and
+    on PostgreSQL the selection skips rows another node is claiming, since
+    there the subquery does not see a concurrent claim. For the same reason
+    PostgreSQL selects the job first when the cap is on and takes its
+    user's claim lock before the UPDATE; a claim that then finds the user
+    saturated returns None and the worker polls again.
+    
+    Returns (job_id, session_id), or None when nothing is claimable.
+    """
+    now = datetime.utcnow()
+    
+    queued = SessionJob.status == 'queued'
+    if max_running_per_user:
+        queued = db.and_(queued, db.or_(
+            SessionJob.user_id.is_(None),
+            SessionJob.user_id.notin_(saturated_users(max_running_per_user, now))
+        ))
+    
+    claimable = db.and_(
+        db.or_(
+            queued,
+            db.and_(SessionJob.status == 'running', SessionJob.lease_expires_at < now)
+        ),
+        SessionJob.attempts < SessionJob.max_attempts
+    )
+    candidate = db.select(SessionJob.id).where(claimable)\
+                  .order_by(SessionJob.fair_tag, SessionJob.id).limit(1)\
+                  .with_for_update(skip_locked=True)
+    
+    if max_running_per_user and db.engine.dialect.name == 'postgresql':
+        # Lock the candidate and its user's claims first, so the UPDATE's
+        # cap check sees every claim committed for that user
+        picked = db.session.execute(candidate.add_columns(SessionJob.user_id)).first()
+        if picked is None:
+            db.session.commit()
+            return None
+        if picked.user_id is not None:
+            lock_user_claims(picked.user_id)
+        candidate = picked.id
+    else:
+        candidate = candidate.scalar_subquery()
+    
+    row = db.session.execute(
+        db.update(SessionJob)
+        .where(SessionJob.id == candidate, claimable)
+        .values(
+            status='running',
+            lease_owner=worker_id,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=SessionJob.attempts + 1,
+            started_at=now
+        )
+        .returning(SessionJob.id, SessionJob.session_id)
+    ).first()
+    db.session.commit()
+    
+    return (row.id, row.session_id) if row else None
+
+
+def renew_lease(job_id: int, worker_id: str, lease_seconds: int = 60) -> bool:
+    """Extend a held lease. Returns False if the worker no longer owns the job."""
+    result = db.session.execute(
+        db.update(SessionJob)
+        .where(
+            SessionJob.id == job_id,
+            SessionJob.lease_owner == worker_id,
+            SessionJob.status == 'running'
+        )
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def finish_job(job_id: int, worker_id: str, status: str = 'done', error: Optional[str] = None):
+    """Release a job with its final status (a cancelled job stays cancelled)"""
+    db.session.execute(
+        db.update(SessionJob)
+        .where(
+            SessionJob.id == job_id,
+            SessionJob.lease_owner == worker_id,
+            SessionJob.status == 'running'
+        )
+        .values(
+            status=status,
+            last_error=error,
+            lease_expires_at=None,
+            finished_at=datetime.utcnow()
+        )
+    )
+    db.session.commit()
+
+
+def cancel_session_jobs(session_id: int) -> int:
+    """Cancel queued or running jobs of a session. The caller commits."""
+    result = db.session.execute(
+        db.update(SessionJob)
+        .where(SessionJob.session_id == session_id, SessionJob.status.in_(ACTIVE_JOB_STATUSES))
+        .values(status='cancelled', lease_expires_at=None, finished_at=datetime.utcnow())
+    )
+    return result.rowcount
+
+
+def fail_exhausted_jobs() -> int:
+    """Mark expired jobs that have used up their attempts as failed"""
+    now = datetime.utcnow()
+    exhausted = SessionJob.query.filter(
+        SessionJob.status == 'running',
+        SessionJob.lease_expires_at < now,
+        SessionJob.attempts >= SessionJob.max_attempts
+    ).all()
+    
+    for job in exhausted:
+        job.status = 'failed'
+        job.last_error = job.last_error or 'Lease expired on final attempt'
+        job.finished_at = now
+        session = db.session.get(SearchSession, job.session_id)
+        if session and session.status in ACTIVE_JOB_STATUSES:
+            if session.status == 'running':
+                UserStats.increment(session.user_id, active_crawls=-1)
+            session.status = 'error'
+            session.completed_at = now
+    
+    db.session.commit()
+    return len(exhausted)
+
+
+def _owner_alive(lease_owner: str) -> bool:
+    """Whether the process named in a `host:pid[:suffix]` lease owner still runs.
+    
+    Only meaningful for owners on this host. The calling process counts as
+    dead: it has not claimed anything yet, so a lease under its pid was left
+    by an earlier process that had the same pid.
+    """
+    try:
+        pid = int(lease_owner.split(':')[1])
+    except (IndexError, ValueError):
+        return True
+    if pid == os.getpid():
+        return False
+    
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, owned by another user
+    return True
+
+
+def release_dead_leases() -> int:
+    """Make jobs and shards leased by dead processes on this host claimable now.
+    
+    Without this a restarted process waits for the old leases to expire
+    before resuming their sessions. Call it at startup, before this process
+    claims any work; returns the number of leases released.
+    """
+    now = datetime.utcnow()
+    released = 0
+    for model in (SessionJob, SessionShard):
+        leased = db.session.query(model.id, model.lease_owner).filter(
+            model.status == 'running',
+            model.lease_expires_at >= now,
+            model.lease_owner.like(f'{socket.gethostname()}:%')
+        ).all()
+        dead = [row.id for row in leased if not _owner_alive(row.lease_owner)]
+        if dead:
+            db.session.execute(
+                db.update(model).where(model.id.in_(dead), model.status == 'running')
+                .values(lease_expires_at=now)
+            )
+            released += len(dead)
+    
+    db.session.commit()
+    return released
+
+
+def requeue_orphaned_sessions() -> List[int]:
+    """Queue sessions left running or queued with no job or shard to finish them.
+    
+    These are sessions whose process stopped before they were in the job
+    queue, or whose work was lost otherwise. The new job resumes them from
+    their checkpoints. Returns the requeued session ids.
+    """
+    active_job = db.select(SessionJob.id).where(
+        SessionJob.session_id == SearchSession.id,
+        SessionJob.status.in_(ACTIVE_JOB_STATUSES)
+    ).exists()
+    active_shard = db.select(SessionShard.id).where(
+        SessionShard.session_id == SearchSession.id,
+        SessionShard.status.in_(ACTIVE_JOB_STATUSES)
+    ).exists()
+    orphaned = db.session.query(SearchSession.id).filter(
+        SearchSession.status.in_(ACTIVE_JOB_STATUSES), ~active_job, ~active_shard
+    ).all()
+    
+    requeued = [session_id for (session_id,) in orphaned if enqueue_session(session_id)]
+    db.session.commit()
+    return requeued
+
+
+def has_pending_jobs() -> bool:
+    """Whether any job or shard is queued or running"""
+    return any(
+        db.session.query(model.id).filter(model.status.in_(ACTIVE_JOB_STATUSES)).first()
+        for model in (SessionJob, SessionShard)
+    )
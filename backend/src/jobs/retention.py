@@ -0,0 +1,262 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.models.scraper import (
+    SearchSession, SearchResult, SearchLog, ResultTerm, RetentionPolicy, UserStats, ContentFingerprint, db
+)
+from src.models.jobs import SessionJob, SessionShard, SessionSchedule, ScheduleWatermark, SessionCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# TTLs are in days; 0 keeps rows forever
+DEFAULT_CONFIG = {
+    'RESULTS_TTL_DAYS': 0,
+    'LOGS_TTL_DAYS': 30,
+    'BATCH_SIZE': 2000,
+    'MAX_BATCHES': 50,          # per table and run, bounds the time a run can take
+    'VACUUM_PAGES': 2000,       # pages returned to the OS per incremental vacuum
+    'INTERVAL_SECONDS': 3600,
+}
+
+# table key -> (model, timestamp column, policy TTL attribute, config TTL key)
+RETAINED_TABLES = {
+    'results': (SearchResult, SearchResult.discovered_at, 'results_ttl_days', 'RESULTS_TTL_DAYS'),
+    'logs': (SearchLog, SearchLog.timestamp, 'logs_ttl_days', 'LOGS_TTL_DAYS'),
+}
+
+
+def _rehome_duplicates(doomed):
+    """Keep near-duplicate clusters whose canonical result is about to be deleted.
+    
+    `doomed` is a list or a select of result ids. The oldest surviving
+    duplicate of each such result takes over its content and fingerprint;
+    clusters with no survivor lose their fingerprint. Sessions whose
+    results are rewritten get a new `results_updated_at`, so cached
+    listings of them are not reused.
+    """
+    rewritten = db.select(SearchResult.session_id)\
+                  .where(SearchResult.duplicate_of.in_(doomed), SearchResult.id.notin_(doomed))
+    db.session.execute(
+        db.update(SearchSession).where(SearchSession.id.in_(rewritten))
+                                .values(results_updated_at=datetime.utcnow())
+    )
+    
+    heirs = db.session.query(SearchResult.duplicate_of, db.func.min(SearchResult.id))\
+                      .filter(SearchResult.duplicate_of.in_(doomed), SearchResult.id.notin_(doomed))\
+                      .group_by(SearchResult.duplicate_of).all()
+    for canonical_id, heir_id in heirs:
+        content = db.select(SearchResult.full_content).where(SearchResult.id == canonical_id).scalar_subquery()
+        db.session.execute(
+            db.update(SearchResult).where(SearchResult.id == heir_id)
+                                   .values(full_content=content, duplicate_of=None)
+        )
+        db.session.execute(
+            db.update(SearchResult).where(SearchResult.duplicate_of == canonical_id)
+                                   .values(duplicate_of=heir_id)
+        )
+        db.session.execute(
+            db.update(ContentFingerprint).where(ContentFingerprint.result_id == canonical_id)
+                                         .values(result_id=heir_id)
+        )
+    db.session.execute(db.delete(ContentFingerprint).where(ContentFingerprint.result_id.in_(doomed)))
+
+
+def _delete_result_ids(result_ids: List[int]):
+    """Delete results and their term index rows by primary key"""
+    _rehome_duplicates(result_ids)
+    db.session.execute(db.delete(ResultTerm).where(ResultTerm.result_id.in_(result_ids)))
+    db.session.execute(db.delete(SearchResult).where(SearchResult.id.in_(result_ids)))
+
+
+def _purge_batch(table: str, cutoff: datetime, batch_size: int,
+                 user_id: Optional[int] = None, exclude_users: Tuple[int, ...] = ()) -> int:
+    """Delete up to `batch_size` rows older than `cutoff` and commit.
+    
+    The batch is selected through the timestamp index and removed with
+    set-based DELETEs, so each transaction stays short and bounded no matter
+    how large the table has grown.
+    """
+    model, timestamp, _, _ = RETAINED_TABLES[table]
+    
+    query = db.session.query(model.id, model.session_id, SearchSession.user_id)\
+                      .join(SearchSession, SearchSession.id == model.session_id)\
+                      .filter(timestamp < cutoff)
+    if user_id is not None:
+        query = query.filter(SearchSession.user_id == user_id)
+    if exclude_users:
+        query = query.filter(SearchSession.user_id.notin_(exclude_users))
+    
+    rows = query.limit(batch_size).all()
+    if not rows:
+        return 0
+    
+    ids = [row_id for row_id, _, _ in rows]
+    if table == 'results':
+        _delete_result_ids(ids)
+        per_user: Dict[int, int] = {}
+        per_session: Dict[int, int] = {}
+        for _, session_id, owner in rows:
+            per_user[owner] = per_user.get(owner, 0) + 1
+            per_session[session_id] = per_session.get(session_id, 0) + 1
+        for owner, count in per_user.items():
+            UserStats.increment(owner, total_results=-count)
+        # Session counts and ETags follow the results that are left
+        for session_id, count in per_session.items():
+            remaining = db.func.coalesce(SearchSession.results_count, 0) - count
+            db.session.execute(
+                db.update(SearchSession).where(SearchSession.id == session_id).values(
+                    results_count=db.case((remaining > 0, remaining), else_=0),
+                    results_updated_at=datetime.utcnow()
+                )
+            )
+    else:
+        db.session.execute(db.delete(model).where(model.id.in_(ids)))
+    
+    db.session.commit()
+    return len(ids)
+
+
+def _purge_table(table: str, cutoff: datetime, config: Dict[str, Any], **scope) -> int:
+    """Purge a table in batches until nothing is left or MAX_BATCHES is reached"""
+    purged = 0
+    for _ in range(config['MAX_BATCHES']):
+        deleted = _purge_batch(table, cutoff, config['BATCH_SIZE'], **scope)
+        purged += deleted
+        if deleted < config['BATCH_SIZE']:
+            break
+    return purged
+
+
+def purge_expired(config: Optional[Dict[str, Any]] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+    """Delete results and logs older than their TTL.
+    
+    Users with a `RetentionPolicy` override are purged with their own TTL;
+    everyone else uses the global TTL from `config`. A TTL of 0 disables
+    purging for that table.
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    now = now or datetime.utcnow()
+    counts = {}
+    
+    policies = RetentionPolicy.query.all()
+    
+    for table, (_, _, policy_attr, config_key) in RETAINED_TABLES.items():
+        overridden = tuple(p.user_id for p in policies if getattr(p, policy_attr) is not None)
+        purged = 0
+        
+        for policy in policies:
+            ttl = getattr(policy, policy_attr)
+            if ttl:
+                cutoff = now - timedelta(days=ttl)
+                purged += _purge_table(table, cutoff, config, user_id=policy.user_id)
+        
+        if config[config_key]:
+            cutoff = now - timedelta(days=config[config_key])
+            purged += _purge_table(table, cutoff, config, exclude_users=overridden)
+        
+        counts[table] = purged
+    
+    return counts
+
+
+def delete_session_results(session_id: int) -> int:
+    """Delete a session's results and their term index rows; returns how many.
+    
+    Near-duplicate clusters rooted in these results move to a survivor
+    elsewhere. The caller commits.
+    """
+    db.session.execute(db.delete(ResultTerm).where(ResultTerm.session_id == session_id))
+    _rehome_duplicates(db.select(SearchResult.id).where(SearchResult.session_id == session_id))
+    return db.session.execute(db.delete(SearchResult).where(SearchResult.session_id == session_id)).rowcount
+
+
+def delete_session_rows(session_id: int):
+    """Delete a session and all of its child rows with set-based DELETEs.
+    
+    Unlike the ORM cascade this never loads results or logs into memory.
+    The caller commits.
+    """
+    delete_session_results(session_id)
+    db.session.execute(db.delete(SearchLog).where(SearchLog.session_id == session_id))
+    db.session.execute(db.delete(SessionJob).where(SessionJob.session_id == session_id))
+    db.session.execute(db.delete(SessionShard).where(SessionShard.session_id == session_id))
+    SessionCheckpoint.clear(session_id)
+    
+    # A template session takes its schedule along; earlier runs are kept
+    schedule_ids = db.select(SessionSchedule.id).where(SessionSchedule.session_id == session_id)
+    db.session.execute(
+        db.update(SearchSession).where(SearchSession.schedule_id.in_(schedule_ids)).values(schedule_id=None)
+    )
+    db.session.execute(db.delete(ScheduleWatermark).where(ScheduleWatermark.schedule_id.in_(schedule_ids)))
+    db.session.execute(db.delete(SessionSchedule).where(SessionSchedule.session_id == session_id))
+    
+    db.session.execute(db.delete(SearchSession).where(SearchSession.id == session_id))
+
+
+def compact(pages: int = DEFAULT_CONFIG['VACUUM_PAGES']):
+    """Return free pages to the filesystem with an incremental vacuum.
+    
+    Incremental vacuum needs `auto_vacuum = INCREMENTAL`, which SQLite only
+    applies to an existing file through a full VACUUM. That conversion runs
+    once, on the first compaction after upgrading.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    
+    connection = db.engine.raw_connection()
+    try:
+        sqlite = connection.driver_connection
+        mode = sqlite.execute('PRAGMA auto_vacuum').fetchone()[0]
+        if mode != 2:
+            logger.info('Enabling incremental auto-vacuum (one-time full VACUUM)')
+            sqlite.executescript('PRAGMA auto_vacuum = INCREMENTAL; VACUUM;')
+        else:
+            # executescript steps the pragma to completion; a plain execute
+            # would free a single page
+            sqlite.executescript(f'PRAGMA incremental_vacuum({int(pages)});')
+    finally:
+        connection.close()
+
+
+def run_retention(config: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+    """One retention pass: purge expired rows, then compact the database"""
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    counts = purge_expired(config)
+    compact(config['VACUUM_PAGES'])
+    
+    if any(counts.values()):
+        logger.info(f"Retention purged {counts['results']} results and {counts['logs']} logs")
+    return counts
+
+
+class RetentionJob:
+    """Runs `run_retention` periodically on a daemon thread"""
+    
+    def __init__(self, app, config: Optional[Dict[str, Any]] = None):
+        self.app = app
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start the background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Ask the background thread to exit after its current pass"""
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.wait(self.config['INTERVAL_SECONDS']):
+            with self.app.app_context():
+                try:
+                    run_retention(self.config)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Retention run failed: {e}")
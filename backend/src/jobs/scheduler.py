@@ -0,0 +1,237 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+
+from src.models.scraper import SearchSession, UserStats, db
+from src.models.jobs import SessionSchedule
+
+logger = logging.getLogger(__name__)
+
+MIN_INTERVAL_SECONDS = 60
+POLL_SECONDS = 15
+
+# A run that is still going when the next one comes due is not doubled up
+ACTIVE_SESSION_STATUSES = ('pending', 'queued', 'running')
+
+# (name, lowest, highest) of the five cron fields
+CRON_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day of month', 1, 31),
+    ('month', 1, 12),
+    ('day of week', 0, 6),
+)
+
+
+class CronSchedule:
+    """A five-field cron expression (minute hour day-of-month month day-of-week).
+    
+    Fields accept `*`, numbers, ranges (`1-5`), lists (`1,15`) and steps
+    (`*/10`, `0-30/5`). Day of week runs from 0 (Sunday) to 6, and 7 is also
+    accepted for Sunday. As in cron, when both day fields are restricted a
+    day matches if either of them does.
+    """
+    
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != len(CRON_FIELDS):
+            raise ValueError('cron expression must have 5 fields: minute hour day month weekday')
+        
+        self.expression = expression
+        fields = [self._parse_field(part, *spec) for part, spec in zip(parts, CRON_FIELDS)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = fields
+        self.days_restricted = parts[2] != '*'
+        self.weekdays_restricted = parts[4] != '*'
+    
+    @staticmethod
+    def _parse_field(field: str, name: str, lowest: int, highest: int) -> Set[int]:
+        """Expand one cron field into the set of values it matches"""
+        if name == 'day of week':
+            highest = 7
+        
+        values = set()
+        for part in field.split(','):
+            range_part, _, step_part = part.partition('/')
+            try:
+                step = int(step_part) if step_part else 1
+                if range_part == '*':
+                    start, end = lowest, highest
+                elif '-' in range_part:
+                    start, end = (int(value) for value in range_part.split('-', 1))
+                else:
+                    start = int(range_part)
+                    end = highest if step_part else start
+            except ValueError:
+                raise ValueError(f'invalid {name} field: {field!r}')
+            
+            if step < 1 or start < lowest or end > highest or start > end:
+                raise ValueError(f'invalid {name} field: {field!r}')
+            values.update(range(start, end + 1, step))
+        
+        if name == 'day of week' and 7 in values:
+            values.discard(7)
+            values.add(0)
+        return values
+    
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.days_restricted and self.weekdays_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+    
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment`.
+        
+        Non-matching months, days and hours are skipped whole, so this takes
+        at most a few thousand steps even for sparse expressions.
+        """
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month_start = candidate.replace(day=1, hour=0, minute=0)
+                candidate = (month_start + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        
+        raise ValueError(f'cron expression never matches: {self.expression!r}')
+
+
+def validate_schedule(interval_seconds: Optional[int], cron: Optional[str]) -> Optional[str]:
+    """Return an error message for invalid schedule settings, or None"""
+    if (interval_seconds is None) == (not cron):
+        return 'Provide exactly one of interval_seconds or cron'
+    
+    if interval_seconds is not None:
+        if isinstance(interval_seconds, bool) or not isinstance(interval_seconds, int):
+            return 'interval_seconds must be an integer'
+        if interval_seconds < MIN_INTERVAL_SECONDS:
+            return f'interval_seconds must be at least {MIN_INTERVAL_SECONDS}'
+        return None
+    
+    try:
+        CronSchedule(cron).next_after(datetime.utcnow())
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def next_run_time(schedule: SessionSchedule, after: datetime) -> datetime:
+    """When a schedule should next run, after `after`"""
+    if schedule.cron:
+        return CronSchedule(schedule.cron).next_after(after)
+    return after + timedelta(seconds=schedule.interval_seconds)
+
+
+def create_run(schedule: SessionSchedule, template: SearchSession) -> SearchSession:
+    """Add a new run session copied from the schedule's template"""
+    run = SearchSession(
+        user_id=template.user_id,
+        name=f'{template.name} (run {schedule.runs_count + 1})',
+        search_terms=template.search_terms,
+        file_types=template.file_types,
+        services=template.services,
+        settings=template.settings,
+        priority=template.priority,
+        schedule_id=schedule.id
+    )
+    db.session.add(run)
+    UserStats.increment(template.user_id, total_searches=1)
+    db.session.flush()
+    return run
+
+
+def _claim_due(schedule_id: int, due_at: datetime, next_at: datetime) -> bool:
+    """Move a due schedule to its next slot; False if another scheduler got there first"""
+    claimed = db.session.execute(
+        db.update(SessionSchedule)
+        .where(SessionSchedule.id == schedule_id,
+               SessionSchedule.enabled.is_(True),
+               SessionSchedule.next_run_at == due_at)
+        .values(next_run_at=next_at)
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def run_due_schedules(scraper_manager, now: Optional[datetime] = None, limit: int = 50) -> List[int]:
+    """Start a run for every schedule that has come due; returns the new session ids.
+    
+    Several schedulers (API process and workers) may poll the same database:
+    each due slot is claimed with a conditional UPDATE, so it starts once.
+    Slots missed while nothing was polling are not made up; the schedule
+    simply moves on to its next slot after `now`.
+    """
+    now = now or datetime.utcnow()
+    due = SessionSchedule.query.filter(
+        SessionSchedule.enabled.is_(True),
+        SessionSchedule.next_run_at <= now
+    ).order_by(SessionSchedule.next_run_at).limit(limit).all()
+    
+    started = []
+    for schedule in due:
+        if not _claim_due(schedule.id, schedule.next_run_at, next_run_time(schedule, now)):
+            continue
+        
+        template = db.session.get(SearchSession, schedule.session_id)
+        if not template:
+            continue
+        
+        previous = db.session.get(SearchSession, schedule.last_session_id) if schedule.last_session_id else None
+        if previous and previous.status in ACTIVE_SESSION_STATUSES:
+            logger.info(f"Schedule {schedule.id}: previous run {previous.id} still active, skipping")
+            continue
+        
+        run = create_run(schedule, template)
+        schedule.last_run_at = now
+        schedule.last_session_id = run.id
+        schedule.runs_count += 1
+        db.session.commit()
+        
+        if scraper_manager.start_search_session(run.id):
+            started.append(run.id)
+        else:
+            logger.warning(f"Schedule {schedule.id}: failed to start run {run.id}")
+    
+    return started
+
+
+class SessionScheduler:
+    """Runs `run_due_schedules` periodically on a daemon thread"""
+    
+    def __init__(self, app, scraper_manager, poll_seconds: int = POLL_SECONDS):
+        self.app = app
+        self.scraper_manager = scraper_manager
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start the background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='scheduler', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Ask the background thread to exit after its current poll"""
+        self._stop.set()
+    
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            with self.app.app_context():
+                try:
+                    run_due_schedules(self.scraper_manager)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Scheduler run failed: {e}")
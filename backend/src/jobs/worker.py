@@ -0,0 +1,182 @@
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from src.jobs.queue import claim_job, renew_lease, finish_job, fail_exhausted_jobs
+from src.jobs.coordinator import (
+    DatabaseRateBudget, claim_shard, renew_shard_lease, finish_shard, fail_exhausted_shards
+)
+from src.jobs.fairshare import DEFAULT_CONFIG as FAIR_SHARE_DEFAULTS
+from src.models.scraper import SearchSession, db
+
+logger = logging.getLogger(__name__)
+
+# How often a running job checks whether its session was stopped
+STOP_POLL_SECONDS = 0.5
+
+# Session statuses that end the work; a session may still read 'queued'
+# for a moment after its job was claimed
+FINAL_STATUSES = ('stopped', 'error', 'completed')
+
+
+class QueueWorker:
+    """Claims session jobs from the queue and runs them one at a time.
+    
+    A heartbeat thread renews the job's lease while the session runs and
+    watches the session row, so a stop issued by any API process reaches the
+    worker that owns the session.
+    
+    With `sharding` enabled a claimed job is only split into per-service
+    shards; workers on any node then claim and run shards individually.
+    
+    Claims follow the fair-share limits in the app's FAIR_SHARE config
+    (see `src.jobs.fairshare`). With `shared_rate_budget` every worker
+    process draws from per-service rate budgets kept in the database.
+    """
+    
+    def __init__(self, app, scraper_manager, worker_id: Optional[str] = None,
+                 lease_seconds: int = 60, poll_interval: float = 2.0,
+                 sharding: bool = False, shared_rate_budget: bool = True):
+        self.app = app
+        self.scraper_manager = scraper_manager
+        self.worker_id = worker_id or f'{socket.gethostname()}:{os.getpid()}'
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.sharding = sharding
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        
+        fair_share = {**FAIR_SHARE_DEFAULTS, **app.config.get('FAIR_SHARE', {})}
+        self.max_running_per_user = fair_share['MAX_RUNNING_PER_USER']
+        self.service_concurrency = fair_share['SERVICE_CONCURRENCY']
+        
+        if sharding or shared_rate_budget:
+            scraper_manager.use_rate_budget(DatabaseRateBudget())
+    
+    def stop(self):
+        """Exit after the current job finishes"""
+        self._stop.set()
+        self._wake.set()
+    
+    def wake(self):
+        """Cut the idle wait short, e.g. right after a job was queued"""
+        self._wake.set()
+    
+    def run_forever(self):
+        """Poll the queue until `stop` is called"""
+        logger.info(f"Worker {self.worker_id} started")
+        while not self._stop.is_set():
+            try:
+                ran = self.run_once()
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} loop error: {e}")
+                ran = False
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        logger.info(f"Worker {self.worker_id} stopped")
+    
+    def run_once(self) -> bool:
+        """Claim and run a single job or shard. Returns False when there was no work."""
+        with self.app.app_context():
+            if self.sharding:
+                for session_id in fail_exhausted_shards():
+                    self.scraper_manager.finalize_sharded_session(session_id)
+                
+                shard = claim_shard(self.worker_id, self.lease_seconds, self.service_concurrency)
+                if shard:
+                    self._run_shard(*shard)
+                    return True
+            
+            fail_exhausted_jobs()
+            claimed = claim_job(self.worker_id, self.lease_seconds, self.max_running_per_user)
+            if not claimed:
+                return False
+            
+            job_id, session_id = claimed
+            if self.sharding:
+                started = self.scraper_manager.begin_sharded_session(session_id)
+                finish_job(job_id, self.worker_id, 'done' if started else 'cancelled')
+                if started:
+                    # A resumed session may have had all its shards finished already
+                    self.scraper_manager.finalize_sharded_session(session_id)
+                return True
+            
+            logger.info(f"Worker {self.worker_id} running session {session_id} (job {job_id})")
+            renew = lambda: renew_lease(job_id, self.worker_id, self.lease_seconds)
+            
+            try:
+                with self._leased(renew, session_id, f'job-{job_id}'):
+                    self.scraper_manager.run_session_job(session_id)
+                finish_job(job_id, self.worker_id, 'done')
+            except Exception as e:
+                db.session.rollback()
+                finish_job(job_id, self.worker_id, 'failed', traceback.format_exc(limit=5))
+                logger.error(f"Session {session_id} failed in worker: {e}")
+            return True
+    
+    def _run_shard(self, shard_id: int, session_id: int, service_id: str):
+        """Run one service of a sharded session and finalise the session if it was the last"""
+        logger.info(f"Worker {self.worker_id} running {service_id} for session {session_id} (shard {shard_id})")
+        renew = lambda: renew_shard_lease(shard_id, self.worker_id, self.lease_seconds)
+        
+        try:
+            with self._leased(renew, session_id, f'shard-{shard_id}'):
+                self.scraper_manager.run_session_shard(session_id, service_id)
+            finish_shard(shard_id, self.worker_id, 'done')
+        except Exception as e:
+            db.session.rollback()
+            self.scraper_manager._log_message(session_id, 'error', service_id, f'Search failed: {str(e)}')
+            finish_shard(shard_id, self.worker_id, 'failed', error=traceback.format_exc(limit=5))
+        
+        self.scraper_manager.finalize_sharded_session(session_id)
+    
+    @contextmanager
+    def _leased(self, renew: Callable[[], bool], session_id: int, name: str):
+        """Keep a lease alive with a heartbeat thread for the duration of the block"""
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(renew, session_id, done),
+            name=f'lease-{name}', daemon=True
+        )
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            done.set()
+            heartbeat.join()
+    
+    def _heartbeat(self, renew: Callable[[], bool], session_id: int, done: threading.Event):
+        """Renew the lease and relay stop requests until the work finishes.
+        
+        The session status is checked every STOP_POLL_SECONDS, so a stop
+        issued by another process cancels the work within about a second;
+        the lease itself is only renewed every third of its duration.
+        """
+        renew_interval = max(self.lease_seconds / 3.0, 1.0)
+        next_renewal = time.monotonic() + renew_interval
+        owned = True
+        
+        with self.app.app_context():
+            while not done.wait(STOP_POLL_SECONDS):
+                try:
+                    if time.monotonic() >= next_renewal:
+                        owned = renew()
+                        next_renewal = time.monotonic() + renew_interval
+                    status = db.session.query(SearchSession.status)\
+                                       .filter_by(id=session_id).scalar()
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.warning(f"Lease renewal failed for session {session_id}: {e}")
+                    continue
+                
+                if not owned or status is None or status in FINAL_STATUSES:
+                    # Lost the lease, or the session was stopped or deleted elsewhere
+                    self.scraper_manager.cancel_session(session_id)
+                    return
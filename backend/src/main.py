@@ -9,6 +9,9 @@ from flask_cors import CORS
 # Import all models first
 from src.models.user import db, User
 from src.models.scraper import SearchSession, SearchResult, SearchLog, PastebinService, UserStats
+from src.models.jobs import SessionJob
+from src.models.schema import ensure_schema
+from src.utils.http_cache import compress_response
 
 # Import routes
 from src.routes.user import user_bp
@@ -27,27 +30,66 @@ CORS(app, origins=['http://localhost:5173', 'http://localhost:3000', 'https://sf
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(scraper_bp, url_prefix='/api')
 
+# gzip (or brotli, if installed) for large JSON responses
+app.after_request(compress_response)
+
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# The default SQLite file serves the API and workers on one host. To spread
+# workers over several nodes, point DATABASE_URL at a shared PostgreSQL
+# database (retro-hunt full-text search is only available on SQLite)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL',
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    # SQLite is shared by the API and queue worker processes; wait for locks
+    # instead of failing immediately
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
 db.init_app(app)
 
+# 'thread' runs sessions inside the API process, 'queue' hands them to
+# worker processes started with src/worker.py
+app.config['SCRAPER_EXECUTION_MODE'] = os.environ.get('SCRAPER_EXECUTION_MODE', 'thread')
+
+# Fair-share scheduling limits (0 disables a limit); LOCAL_WORKERS is the
+# number of session threads in thread execution mode
+app.config['FAIR_SHARE'] = {
+    'MAX_RUNNING_PER_USER': int(os.environ.get('FAIR_SHARE_MAX_RUNNING_PER_USER', 2)),
+    'SERVICE_CONCURRENCY': int(os.environ.get('FAIR_SHARE_SERVICE_CONCURRENCY', 4)),
+    'LOCAL_WORKERS': int(os.environ.get('SCRAPER_THREADS', 8)),
+}
+
+# Data retention (TTLs in days, 0 keeps rows forever)
+app.config['RETENTION'] = {
+    'RESULTS_TTL_DAYS': int(os.environ.get('RETENTION_RESULTS_DAYS', 0)),
+    'LOGS_TTL_DAYS': int(os.environ.get('RETENTION_LOGS_DAYS', 30)),
+    'INTERVAL_SECONDS': int(os.environ.get('RETENTION_INTERVAL_SECONDS', 3600)),
+}
+
 # Initialize database
 with app.app_context():
     db.create_all()
+    ensure_schema()
     
-    # Initialize pastebin services if not exists
+    # Initialize pastebin services if not exists; rows seeded by an earlier
+    # version pick up changes to a service's name, URL, API use or rate limit
     try:
         from src.scrapers.scraper_manager import ScraperManager
         scraper_manager = ScraperManager()
         
         for service_data in scraper_manager.get_available_services():
             existing_service = db.session.get(PastebinService, service_data['id'])
-            if not existing_service:
+            if existing_service:
+                existing_service.name = service_data['name']
+                existing_service.base_url = service_data['base_url']
+                existing_service.has_api = service_data.get('has_api', False)
+                existing_service.rate_limit = service_data['rate_limit']
+            else:
                 service = PastebinService(
                     id=service_data['id'],
                     name=service_data['name'],
-                    base_url=f"https://{service_data['id']}.com",  # Mock URL
+                    base_url=service_data['base_url'],
                     has_api=service_data.get('has_api', False),
                     rate_limit=service_data['rate_limit'],
                     status=service_data['status']
@@ -60,6 +102,37 @@ with app.app_context():
         print(f"Database initialization warning: {e}")
         db.session.rollback()
 
+if os.environ.get('RETENTION_ENABLED', 'true').lower() == 'true':
+    from src.jobs.retention import RetentionJob
+    RetentionJob(app, app.config['RETENTION']).start()
+
+# Sessions interrupted by a restart resume from their checkpoints
+if os.environ.get('RESUME_SESSIONS', 'true').lower() == 'true':
+    from src.routes.scraper import scraper_manager
+    with app.app_context():
+        try:
+            resumed = scraper_manager.resume_interrupted_sessions(app)
+            if resumed:
+                print(f"Requeued {len(resumed)} interrupted search sessions")
+        except Exception as e:
+            print(f"Session resume warning: {e}")
+            db.session.rollback()
+
+# Matching, scoring and type detection of fetched pastes in worker
+# processes instead of the GIL-bound feed threads (0 keeps them in-process)
+app.config['MATCH_PROCESSES'] = int(os.environ.get('MATCH_PROCESSES', 0))
+if app.config['MATCH_PROCESSES'] > 0:
+    from src.scrapers.match_pool import MatchPool
+    from src.routes.scraper import scraper_manager
+    scraper_manager.use_match_pool(MatchPool(app.config['MATCH_PROCESSES']))
+
+# Recurring session schedules; due runs are claimed atomically, so several
+# processes may run the scheduler against one database
+if os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true':
+    from src.jobs.scheduler import SessionScheduler
+    from src.routes.scraper import scraper_manager
+    SessionScheduler(app, scraper_manager).start()
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -0,0 +1,149 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'search_results_fts'
+
+# Minimum query length the trigram tokenizer can match
+MIN_QUERY_LENGTH = 3
+
+# External-content FTS5 index over stored pastes. The trigram tokenizer makes
+# every MATCH a case-insensitive substring search, which is what indicator
+# hunting needs (partial keys, hostnames, hashes).
+_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, full_content,
+        content='search_results', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_results_fts_ai AFTER INSERT ON search_results BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, title, full_content)
+        VALUES (new.id, new.title, new.full_content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_results_fts_ad AFTER DELETE ON search_results BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, full_content)
+        VALUES ('delete', old.id, old.title, old.full_content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS search_results_fts_au AFTER UPDATE OF title, full_content ON search_results BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, title, full_content)
+        VALUES ('delete', old.id, old.title, old.full_content);
+        INSERT INTO {FTS_TABLE} (rowid, title, full_content)
+        VALUES (new.id, new.title, new.full_content);
+    END""",
+]
+
+
+def fulltext_available() -> bool:
+    """Return True when the FTS5 index over search results exists"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    
+    row = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': FTS_TABLE}
+    ).first()
+    return row is not None
+
+
+def install_fulltext_index():
+    """Create the FTS5 index and the triggers that keep it in sync.
+    
+    The index is populated from existing results the first time it is
+    created. SQLite builds without FTS5, or older than 3.35 (the trigram
+    tokenizer and materialised CTEs used by search_history), are logged and
+    left without retro-hunt support.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    if db.engine.dialect.dbapi.sqlite_version_info < (3, 35):
+        logger.warning(f"Full-text index unavailable: SQLite {db.engine.dialect.dbapi.sqlite_version} is older than 3.35")
+        return
+    
+    created = not fulltext_available()
+    try:
+        # A savepoint, so a failure only undoes this and not the rest of ensure_schema
+        with db.session.begin_nested():
+            for statement in _FTS_DDL:
+                db.session.execute(text(statement))
+            if created:
+                db.session.execute(text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as e:
+        logger.warning(f"Full-text index unavailable: {e}")
+
+
+def quote_fts_query(query: str) -> str:
+    """Quote user input as a single FTS5 string, i.e. a literal substring"""
+    return '"' + query.replace('"', '""') + '"'
+
+
+def search_history(user_id: int, query: str, limit: int = 50, offset: int = 0,
+                   session_id: Optional[int] = None, service: Optional[str] = None,
+                   raw: bool = False) -> List[Dict[str, Any]]:
+    """Search all stored pastes of a user, best matches first.
+    
+    By default `query` is matched as a literal substring; with `raw=True` it
+    is passed through as an FTS5 query (AND/OR/NOT, phrases, column filters).
+    Each hit carries a highlighted snippet and its bm25 rank (lower is better).
+    Near-duplicates stored through `duplicate_of` match on their canonical
+    copy's content.
+    """
+    filters = ''
+    params = {
+        'query': query if raw else quote_fts_query(query),
+        'user_id': user_id,
+        'limit': limit,
+        'offset': offset,
+    }
+    
+    if session_id is not None:
+        filters += ' AND r.session_id = :session_id'
+        params['session_id'] = session_id
+    if service:
+        filters += ' AND r.service = :service'
+        params['service'] = service
+    
+    # Near-duplicates are stored without content and hit through their
+    # canonical copy's row. A paste matching by its own title and through
+    # its canonical copy is listed once, with its best rank and the content
+    # snippet. FTS5 functions cannot be aggregated, hence the materialised CTE.
+    rows = db.session.execute(text(f"""
+        WITH hits AS MATERIALIZED (
+            SELECT rowid AS id,
+                   snippet({FTS_TABLE}, 1, '«', '»', '…', 64) AS snippet,
+                   bm25({FTS_TABLE}) AS rank
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH :query
+        )
+        SELECT r.id, r.session_id, r.paste_id, r.url, r.title, r.service,
+               r.file_type, r.discovered_at, r.file_size,
+               max(hits.snippet) AS snippet, min(hits.rank) AS rank
+        FROM hits
+        JOIN search_results r ON r.id = hits.id OR r.duplicate_of = hits.id
+        JOIN search_sessions s ON s.id = r.session_id
+        WHERE s.user_id = :user_id{filters}
+        GROUP BY r.id
+        ORDER BY rank
+        LIMIT :limit OFFSET :offset
+    """).columns(discovered_at=db.DateTime), params).mappings().all()
+    
+    return [
+        {
+            'id': row['id'],
+            'session_id': row['session_id'],
+            'paste_id': row['paste_id'],
+            'url': row['url'],
+            'title': row['title'],
+            'service': row['service'],
+            'file_type': row['file_type'],
+            'discovered_at': row['discovered_at'].isoformat() if row['discovered_at'] else None,
+            'file_size': row['file_size'],
+            'snippet': row['snippet'],
+            'rank': row['rank'],
+        }
+        for row in rows
+    ]
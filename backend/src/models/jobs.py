@@ -0,0 +1,299 @@
+import json
+from typing import Optional
+
+from src.models.user import db
+from datetime import datetime
+
+class SessionJob(db.Model):
+    """A search session waiting for, or being run by, a queue worker.
+    
+    Workers claim jobs with a time-bounded lease and keep renewing it while
+    the session runs. A job whose lease expires (the worker died or was
+    redeployed) becomes claimable again until `max_attempts` is reached.
+    """
+    __tablename__ = 'session_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, nullable=True)  # owner of the session, for per-user caps
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, done, failed, cancelled
+    priority = db.Column(db.Integer, default=0, nullable=False)
+    fair_tag = db.Column(db.Float, default=0.0, nullable=False)  # virtual finish time, see src.jobs.fairshare
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    lease_owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    enqueued_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.Index('ix_session_jobs_fair_claim', 'status', 'fair_tag', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<SessionJob {self.id} session={self.session_id} {self.status}>'
+    
+    def to_dict(self):
+        """Converts object attributes to a dictionary."""
+        return {
+            'id': self.id,
+            'session_id': self.session_id,
+            'status': self.status,
+            'priority': self.priority,
+            'fair_tag': self.fair_tag,
+            'attempts': self.attempts,
+            'lease_owner': self.lease_owner,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'last_error': self.last_error,
+            'enqueued_at': self.enqueued_at.isoformat() if self.enqueued_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class SessionShard(db.Model):
+    """One service's share of a session, claimable by any worker node.
+    
+    Sharded sessions are split into one shard per service; workers lease
+    shards independently, so a session's services run in parallel across
+    processes and machines.
+    """
+    __tablename__ = 'session_shards'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), nullable=False, index=True)
+    service_id = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, done, failed, cancelled
+    fair_tag = db.Column(db.Float, default=0.0, nullable=False)  # inherited from the session's job
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    lease_owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    results_count = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'service_id', name='uq_session_shards_session_service'),
+        db.Index('ix_session_shards_fair_claim', 'status', 'fair_tag', 'id'),
+        db.Index('ix_session_shards_service', 'service_id', 'status'),
+    )
+    
+    def __repr__(self):
+        return f'<SessionShard {self.session_id}/{self.service_id} {self.status}>'
+    
+    def to_dict(self):
+        """Converts object attributes to a dictionary."""
+        return {
+            'id': self.id,
+            'session_id': self.session_id,
+            'service_id': self.service_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'lease_owner': self.lease_owner,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'results_count': self.results_count,
+            'last_error': self.last_error,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ServiceRateBudget(db.Model):
+    """Token bucket shared by every worker that talks to a service"""
+    __tablename__ = 'service_rate_budgets'
+    
+    service_id = db.Column(db.String(50), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    capacity = db.Column(db.Float, nullable=False)
+    refill_per_second = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)  # unix timestamp of the last refill
+    
+    def __repr__(self):
+        return f'<ServiceRateBudget {self.service_id}: {self.tokens:.2f}/{self.capacity:.2f}>'
+
+class SessionSchedule(db.Model):
+    """Recurring runs of a template session.
+    
+    Each run is a copy of the template session, started whenever
+    `next_run_at` comes due. The schedule is either a fixed interval or a
+    five-field cron expression (evaluated in UTC).
+    """
+    __tablename__ = 'session_schedules'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    interval_seconds = db.Column(db.Integer, nullable=True)
+    cron = db.Column(db.String(100), nullable=True)
+    enabled = db.Column(db.Boolean, default=True, nullable=False)
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+    last_session_id = db.Column(db.Integer, nullable=True)
+    runs_count = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_session_schedules_due', 'enabled', 'next_run_at'),
+    )
+    
+    def __repr__(self):
+        return f'<SessionSchedule {self.id} session={self.session_id}>'
+    
+    def to_dict(self):
+        """Converts object attributes to a dictionary."""
+        return {
+            'id': self.id,
+            'session_id': self.session_id,
+            'user_id': self.user_id,
+            'interval_seconds': self.interval_seconds,
+            'cron': self.cron,
+            'enabled': self.enabled,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_session_id': self.last_session_id,
+            'runs_count': self.runs_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ScheduleWatermark(db.Model):
+    """How far a schedule's runs have scanned a service.
+    
+    `high_water` is the newest item timestamp (unix seconds) a completed run
+    looked at; the next run skips anything older, and anything at that
+    timestamp whose key is in `boundary_keys`.
+    """
+    __tablename__ = 'schedule_watermarks'
+    
+    schedule_id = db.Column(db.Integer, db.ForeignKey('session_schedules.id'), primary_key=True)
+    service_id = db.Column(db.String(50), primary_key=True)
+    high_water = db.Column(db.Float, nullable=False)
+    boundary_keys = db.Column(db.Text, nullable=True)  # JSON list of item keys scanned at high_water
+    
+    def __repr__(self):
+        return f'<ScheduleWatermark {self.schedule_id}/{self.service_id}: {self.high_water}>'
+    
+    @classmethod
+    def for_schedule(cls, schedule_id: int) -> dict:
+        """Map of service id to high-water mark"""
+        rows = db.session.query(cls.service_id, cls.high_water).filter_by(schedule_id=schedule_id)
+        return {service_id: high_water for service_id, high_water in rows}
+    
+    def keys(self) -> set:
+        return set(json.loads(self.boundary_keys)) if self.boundary_keys else set()
+    
+    @classmethod
+    def advance(cls, schedule_id: int, service_id: str, high_water: float, boundary_keys: set):
+        """Raise a service's mark to `high_water`; it never moves backwards.
+        
+        `boundary_keys` replaces the stored keys when the mark moves or stays
+        put: a run started at the mark scanned on from its keys, so it holds
+        all of them. A single upsert, so runs finishing concurrently on
+        several workers cannot lose each other's progress. The caller commits.
+        """
+        db.session.execute(db.text(
+            'INSERT INTO schedule_watermarks (schedule_id, service_id, high_water, boundary_keys) '
+            'VALUES (:schedule_id, :service_id, :high_water, :boundary_keys) '
+            'ON CONFLICT (schedule_id, service_id) DO UPDATE SET high_water = '
+            'CASE WHEN excluded.high_water > schedule_watermarks.high_water '
+            'THEN excluded.high_water ELSE schedule_watermarks.high_water END, boundary_keys = '
+            'CASE WHEN excluded.high_water >= schedule_watermarks.high_water '
+            'THEN excluded.boundary_keys ELSE schedule_watermarks.boundary_keys END'
+        ), {'schedule_id': schedule_id, 'service_id': service_id, 'high_water': high_water,
+            'boundary_keys': json.dumps(sorted(boundary_keys))})
+
+class SessionCheckpoint(db.Model):
+    """Progress of one service within a session, for resuming after a restart.
+    
+    Results are persisted in batches while a service is scanned, and every
+    batch commits together with the checkpoint: the keys it evaluated are
+    added as SessionScannedKey rows and `results_count` counts the results
+    already stored, so a resumed run neither refetches those items nor
+    duplicates results.
+    """
+    __tablename__ = 'session_checkpoints'
+    
+    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), primary_key=True)
+    service_id = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), default='running', nullable=False)  # running, done
+    scanned_count = db.Column(db.Integer, default=0, nullable=False)
+    results_count = db.Column(db.Integer, default=0, nullable=False)
+    high_water = db.Column(db.Float, nullable=True)  # scan cursor of a scheduled run
+    boundary_keys = db.Column(db.Text, nullable=True)  # JSON list of item keys scanned at high_water
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SessionCheckpoint {self.session_id}/{self.service_id} {self.status}>'
+    
+    @classmethod
+    def open(cls, session_id: int, service_id: str) -> 'SessionCheckpoint':
+        """The service's checkpoint, created empty on first use. The caller commits."""
+        checkpoint = db.session.get(cls, (session_id, service_id))
+        if checkpoint is None:
+            checkpoint = cls(session_id=session_id, service_id=service_id,
+                             status='running', scanned_count=0, results_count=0)
+            db.session.add(checkpoint)
+        return checkpoint
+    
+    @classmethod
+    def clear(cls, session_id: int):
+        """Delete a session's checkpoints and scanned keys. The caller commits."""
+        db.session.execute(db.delete(SessionScannedKey).where(SessionScannedKey.session_id == session_id))
+        db.session.execute(db.delete(cls).where(cls.session_id == session_id))
+    
+    def keys(self) -> set:
+        return set(db.session.scalars(
+            db.select(SessionScannedKey.key).where(
+                SessionScannedKey.session_id == self.session_id,
+                SessionScannedKey.service_id == self.service_id
+            )
+        ))
+    
+    def boundary(self) -> set:
+        return set(json.loads(self.boundary_keys)) if self.boundary_keys else set()
+    
+    def record(self, scanned_keys: set, results_count: int, high_water: Optional[float] = None,
+               boundary_keys: Optional[set] = None):
+        """Add a persisted batch: the keys scanned since the last batch and the new results"""
+        if scanned_keys:
+            db.session.execute(
+                db.insert(SessionScannedKey),
+                [{'session_id': self.session_id, 'service_id': self.service_id, 'key': key}
+                 for key in scanned_keys]
+            )
+            self.scanned_count += len(scanned_keys)
+        self.results_count += results_count
+        if high_water is not None:
+            self.high_water = high_water
+            self.boundary_keys = json.dumps(sorted(boundary_keys or ()))
+    
+    def finish(self):
+        """Mark the service searched; a finished service is never rescanned"""
+        self.status = 'done'
+        db.session.execute(db.delete(SessionScannedKey).where(
+            SessionScannedKey.session_id == self.session_id,
+            SessionScannedKey.service_id == self.service_id
+        ))
+    
+    def to_dict(self):
+        """Converts object attributes to a dictionary."""
+        return {
+            'session_id': self.session_id,
+            'service_id': self.service_id,
+            'status': self.status,
+            'scanned_count': self.scanned_count,
+            'results_count': self.results_count,
+            'high_water': self.high_water,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class SessionScannedKey(db.Model):
+    """An item a session already evaluated on one service, see SessionCheckpoint"""
+    __tablename__ = 'session_scanned_keys'
+    
+    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), primary_key=True)
+    service_id = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(500), primary_key=True)
@@ -0,0 +1,120 @@
+from sqlalchemy import inspect, text
+from src.models.user import db
+from src.models.fulltext import install_fulltext_index
+
+# Columns added to existing tables after their first release. db.create_all()
+# only creates missing tables, so databases created by older versions get
+# these columns added in place.
+ADDED_COLUMNS = {
+    'search_sessions': [
+        ('schedule_id', 'INTEGER'),
+        ('priority', 'INTEGER DEFAULT 0'),
+        ('results_updated_at', 'TIMESTAMP'),
+    ],
+    'session_jobs': [
+        ('user_id', 'INTEGER'),
+        ('fair_tag', 'FLOAT NOT NULL DEFAULT 0.0'),
+    ],
+    'search_results': [
+        ('duplicate_of', 'INTEGER'),
+        ('detections', 'TEXT'),
+        ('match_offsets', 'TEXT'),
+        ('decoded_from', 'TEXT'),
+    ],
+    'schedule_watermarks': [
+        ('boundary_keys', 'TEXT'),
+    ],
+    'session_checkpoints': [
+        ('boundary_keys', 'TEXT'),
+    ],
+    'session_shards': [
+        ('fair_tag', 'FLOAT NOT NULL DEFAULT 0.0'),
+    ],
+    'user_stats': [
+        ('completed_searches', 'INTEGER DEFAULT 0'),
+        ('success_rate_total', 'FLOAT DEFAULT 0.0'),
+    ],
+}
+
+# Indexes declared on the models that create_all() will not add to old tables
+ADDED_INDEXES = [
+    'CREATE UNIQUE INDEX IF NOT EXISTS ix_user_stats_user_id ON user_stats (user_id)',
+    'CREATE INDEX IF NOT EXISTS ix_search_results_session_id ON search_results (session_id)',
+    'CREATE INDEX IF NOT EXISTS ix_search_results_discovered_at ON search_results (discovered_at)',
+    'CREATE INDEX IF NOT EXISTS ix_search_results_duplicate_of ON search_results (duplicate_of)',
+    'CREATE INDEX IF NOT EXISTS ix_search_logs_session_id ON search_logs (session_id)',
+    'CREATE INDEX IF NOT EXISTS ix_search_logs_timestamp ON search_logs (timestamp)',
+    'CREATE INDEX IF NOT EXISTS ix_search_sessions_schedule_id ON search_sessions (schedule_id)',
+    'CREATE INDEX IF NOT EXISTS ix_session_jobs_fair_claim ON session_jobs (status, fair_tag, id)',
+    'CREATE INDEX IF NOT EXISTS ix_session_shards_fair_claim ON session_shards (status, fair_tag, id)',
+    'CREATE INDEX IF NOT EXISTS ix_session_shards_service ON session_shards (service_id, status)',
+]
+
+
+def _add_missing_columns():
+    """Add columns from ADDED_COLUMNS that an existing table lacks"""
+    inspector = inspect(db.engine)
+    added = set()
+    
+    for table, columns in ADDED_COLUMNS.items():
+        if not inspector.has_table(table):
+            continue
+        
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for name, ddl in columns:
+            if name not in existing:
+                db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+                added.add((table, name))
+    
+    return added
+
+
+def _backfill_result_terms():
+    """Index matched terms of results stored before result_terms existed"""
+    indexed = db.session.execute(text('SELECT 1 FROM result_terms LIMIT 1')).first()
+    stored = db.session.execute(text('SELECT 1 FROM search_results LIMIT 1')).first()
+    if indexed or not stored:
+        return
+    
+    if db.engine.dialect.name == 'postgresql':
+        elements = 'json_array_elements_text(search_results.matched_terms::json) AS je(value)'
+    else:
+        elements = 'json_each(search_results.matched_terms) AS je'
+    
+    # SQLite needs a WHERE clause before ON CONFLICT in INSERT ... SELECT
+    db.session.execute(text(f"""
+        INSERT INTO terms (term)
+        SELECT DISTINCT lower(trim(je.value))
+        FROM search_results, {elements}
+        WHERE trim(je.value) != ''
+        ON CONFLICT (term) DO NOTHING
+    """))
+    db.session.execute(text(f"""
+        INSERT INTO result_terms (result_id, term_id, session_id)
+        SELECT search_results.id, terms.id, search_results.session_id
+        FROM search_results, {elements}
+        JOIN terms ON terms.term = lower(trim(je.value))
+        WHERE true
+        ON CONFLICT (result_id, term_id) DO NOTHING
+    """))
+
+
+def ensure_schema():
+    """Upgrade an existing database in place after db.create_all()"""
+    if db.engine.dialect.name == 'sqlite':
+        # WAL lets queue workers write while the API keeps reading
+        db.session.execute(text('PRAGMA journal_mode=WAL'))
+    
+    added = _add_missing_columns()
+    _backfill_result_terms()
+    
+    if any(table == 'user_stats' for table, _ in added):
+        # Old rows lack the running totals needed for incremental updates;
+        # dropping them makes the dashboard rebuild each user's aggregate once.
+        db.session.execute(text('DELETE FROM user_stats'))
+    
+    for statement in ADDED_INDEXES:
+        db.session.execute(text(statement))
+    
+    install_fulltext_index()
+    db.session.commit()
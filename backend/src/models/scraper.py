@@ -1,4 +1,5 @@
 from src.models.user import db
+from src.utils.simhash import BANDS, MAX_DISTANCE, NearDuplicateIndex, bands, from_signed, hamming, probes, to_signed
 from datetime import datetime
 import json
 
@@ -19,6 +20,10 @@ class SearchSession(db.Model):
     duration = db.Column(db.Integer, default=0)  # in seconds
     success_rate = db.Column(db.Float, default=0.0)
     settings = db.Column(db.Text, nullable=True)  # JSON for advanced settings
+    priority = db.Column(db.Integer, default=0)  # 0-5, larger gets a bigger share of the workers
+    schedule_id = db.Column(db.Integer, nullable=True, index=True)  # set on runs of a SessionSchedule
+    # Bumped when stored results are rewritten in place (e.g. by retention), for ETags
+    results_updated_at = db.Column(db.DateTime, nullable=True)
     
     # Relationships
     results = db.relationship('SearchResult', backref='session', lazy=True, cascade='all, delete-orphan')
@@ -54,14 +59,16 @@ class SearchSession(db.Model):
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'duration': self.duration,
             'success_rate': self.success_rate,
-            'settings': json.loads(self.settings) if self.settings else {}
+            'settings': json.loads(self.settings) if self.settings else {},
+            'priority': self.priority or 0,
+            'schedule_id': self.schedule_id
         }
 
 class SearchResult(db.Model):
     __tablename__ = 'search_results'
     
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), nullable=False, index=True)
     paste_id = db.Column(db.String(100), nullable=False)
     url = db.Column(db.String(500), nullable=False)
     title = db.Column(db.String(200), nullable=True)
@@ -70,9 +77,25 @@ class SearchResult(db.Model):
     file_type = db.Column(db.String(20), nullable=True)
     matched_terms = db.Column(db.Text, nullable=False)  # JSON array of matched terms
     service = db.Column(db.String(50), nullable=False)
-    discovered_at = db.Column(db.DateTime, default=datetime.utcnow)
+    discovered_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     relevance_score = db.Column(db.Float, default=0.0)
     file_size = db.Column(db.Integer, default=0)
+    # Canonical result of the near-duplicate cluster this paste belongs to;
+    # full_content is stored only there (see ContentFingerprint)
+    duplicate_of = db.Column(db.Integer, nullable=True, index=True)
+    detections = db.Column(db.Text, nullable=True)  # JSON {detector: hits} from secret detection
+    match_offsets = db.Column(db.Text, nullable=True)  # JSON {term: [[start, end], ...]} of the first hits
+    decoded_from = db.Column(db.Text, nullable=True)  # JSON ['base64+gzip', ...] when hits were in decoded payloads
+    
+    # Normalised copy of matched_terms used for per-term lookups
+    term_links = db.relationship('ResultTerm', lazy=True, cascade='all, delete-orphan')
+    
+    # Fields of to_dict(), in order; listings can select a subset with `fields=`
+    LISTING_FIELDS = (
+        'id', 'session_id', 'paste_id', 'url', 'title', 'content_preview', 'file_type',
+        'matched_terms', 'service', 'discovered_at', 'relevance_score', 'file_size', 'duplicate_of',
+        'detections', 'match_offsets', 'decoded_from'
+    )
     
     def __repr__(self):
         return f'<SearchResult {self.paste_id}>'
@@ -91,18 +114,251 @@ class SearchResult(db.Model):
             'service': self.service,
             'discovered_at': self.discovered_at.isoformat() if self.discovered_at else None,
             'relevance_score': self.relevance_score,
-            'file_size': self.file_size
+            'file_size': self.file_size,
+            'duplicate_of': self.duplicate_of,
+            'detections': json.loads(self.detections) if self.detections else {},
+            'match_offsets': json.loads(self.match_offsets) if self.match_offsets else {},
+            'decoded_from': json.loads(self.decoded_from) if self.decoded_from else []
         }
+    
+    @classmethod
+    def content_column(cls):
+        """full_content, read from the canonical result for near-duplicates"""
+        canonical = db.aliased(cls)
+        stored = db.select(canonical.full_content).where(canonical.id == cls.duplicate_of).scalar_subquery()
+        return db.func.coalesce(cls.full_content, stored).label('full_content')
+    
+    @classmethod
+    def listing_columns(cls, fields=None) -> list:
+        """Columns for the requested to_dict() fields (all of them by default).
+        
+        Raises ValueError naming any unknown field.
+        """
+        if not fields:
+            fields = cls.LISTING_FIELDS
+        unknown = [field for field in fields if field not in cls.LISTING_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        
+        # Keep to_dict() order and drop repeats
+        return [getattr(cls, field) for field in cls.LISTING_FIELDS if field in fields]
+    
+    @staticmethod
+    def row_to_dict(row, loads=json.loads) -> dict:
+        """Serialise a row selected with `listing_columns` like to_dict() would"""
+        data = dict(row._mapping)
+        if 'matched_terms' in data:
+            data['matched_terms'] = loads(data['matched_terms']) if data['matched_terms'] else []
+        if 'detections' in data:
+            data['detections'] = loads(data['detections']) if data['detections'] else {}
+        if 'match_offsets' in data:
+            data['match_offsets'] = loads(data['match_offsets']) if data['match_offsets'] else {}
+        if 'decoded_from' in data:
+            data['decoded_from'] = loads(data['decoded_from']) if data['decoded_from'] else []
+        if data.get('discovered_at') is not None:
+            data['discovered_at'] = data['discovered_at'].isoformat()
+        return data
+
+class ContentFingerprint(db.Model):
+    """SimHash of a stored paste: the canonical copy of a near-duplicate cluster.
+    
+    The 64-bit fingerprint is split into four 16-bit bands, each indexed
+    together with the user. Fingerprints within MAX_DISTANCE bits are at
+    most one bit apart on at least one band, so the candidates for a new
+    paste come from indexed lookups of each band and its one-bit neighbours
+    (see `simhash.probes`) and are confirmed by Hamming distance. Clusters
+    are per user: a paste is only linked to copies its owner already holds.
+    """
+    __tablename__ = 'content_fingerprints'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    simhash = db.Column(db.BigInteger, nullable=False)  # signed 64-bit
+    band_0 = db.Column(db.Integer, nullable=False)
+    band_1 = db.Column(db.Integer, nullable=False)
+    band_2 = db.Column(db.Integer, nullable=False)
+    band_3 = db.Column(db.Integer, nullable=False)
+    result_id = db.Column(db.Integer, db.ForeignKey('search_results.id'), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    result = db.relationship('SearchResult')
+    
+    __table_args__ = tuple(
+        db.Index(f'ix_content_fingerprints_band_{i}', 'user_id', f'band_{i}') for i in range(BANDS)
+    )
+    
+    def __repr__(self):
+        return f'<ContentFingerprint {self.id} result={self.result_id}>'
+    
+    @classmethod
+    def create(cls, user_id, fingerprint, result):
+        """A new cluster whose canonical copy is `result`"""
+        return cls(user_id=user_id, simhash=to_signed(fingerprint), result=result,
+                   **{f'band_{i}': band for i, band in enumerate(bands(fingerprint))})
+    
+    @classmethod
+    def find(cls, user_id, fingerprint):
+        """The user's closest cluster within MAX_DISTANCE bits, or None"""
+        # One indexed (user_id, band_i) lookup per band
+        lookups = [
+            db.select(cls.id, cls.simhash).where(cls.user_id == user_id, getattr(cls, f'band_{i}').in_(keys))
+            for i, keys in enumerate(probes(fingerprint))
+        ]
+        candidates = db.session.execute(db.union(*lookups)).all()
+        best, best_distance = None, MAX_DISTANCE + 1
+        for candidate_id, value in candidates:
+            distance = hamming(fingerprint, from_signed(value))
+            if distance < best_distance:
+                best, best_distance = candidate_id, distance
+        return db.session.get(cls, best) if best is not None else None
+    
+    @classmethod
+    def index_for(cls, user_id):
+        """An in-memory index of all the user's clusters"""
+        rows = db.session.query(cls.simhash).filter(cls.user_id == user_id).all()
+        return NearDuplicateIndex(from_signed(value) for value, in rows)
+
+class Term(db.Model):
+    """A distinct search term, shared by every session and result that uses it"""
+    __tablename__ = 'terms'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(500), nullable=False, unique=True, index=True)
+    
+    def __repr__(self):
+        return f'<Term {self.term}>'
+    
+    @staticmethod
+    def normalise(term):
+        """Terms are matched case-insensitively, so they are stored lower-cased"""
+        return term.strip().lower()
+    
+    @classmethod
+    def ids_for(cls, terms):
+        """Return a {normalised term: id} map, creating any terms not seen before."""
+        wanted = {cls.normalise(term) for term in terms if term and term.strip()}
+        if not wanted:
+            return {}
+        
+        ids = dict(db.session.query(cls.term, cls.id).filter(cls.term.in_(wanted)).all())
+        missing = wanted - ids.keys()
+        if missing:
+            # Another session may insert the same term concurrently
+            db.session.execute(
+                db.text('INSERT INTO terms (term) VALUES (:term) ON CONFLICT (term) DO NOTHING'),
+                [{'term': term} for term in missing]
+            )
+            ids.update(db.session.query(cls.term, cls.id).filter(cls.term.in_(missing)).all())
+        return ids
+
+class ResultTerm(db.Model):
+    """Join between results and the terms they matched.
+    
+    `session_id` is denormalised from the result so that "all hits for term X
+    in session Y" and per-term counts are served by one composite index.
+    """
+    __tablename__ = 'result_terms'
+    
+    result_id = db.Column(db.Integer, db.ForeignKey('search_results.id'), primary_key=True)
+    term_id = db.Column(db.Integer, db.ForeignKey('terms.id'), primary_key=True)
+    session_id = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_result_terms_session_term', 'session_id', 'term_id'),
+        db.Index('ix_result_terms_term', 'term_id'),
+    )
+    
+    def __repr__(self):
+        return f'<ResultTerm result={self.result_id} term={self.term_id}>'
+
+class ServiceCorpusStats(db.Model):
+    """Size of the corpus a service's sessions have scanned, for BM25.
+    
+    `docs` counts paste evaluations and `total_length` their characters, so
+    `total_length / docs` is the average paste length. Both only grow, by
+    the deltas `record` applies as sessions persist their batches.
+    """
+    __tablename__ = 'service_corpus_stats'
+    
+    service_id = db.Column(db.String(50), primary_key=True)
+    docs = db.Column(db.Integer, nullable=False, default=0)
+    total_length = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<ServiceCorpusStats {self.service_id} docs={self.docs}>'
+    
+    @classmethod
+    def totals(cls, service_id):
+        """(docs, total_length) scanned on a service so far"""
+        stats = db.session.get(cls, service_id)
+        return (stats.docs, stats.total_length) if stats else (0, 0)
+    
+    @classmethod
+    def record(cls, service_id, observation):
+        """Add a session's `CorpusObservation` to the service's statistics.
+        
+        Upserts relative to the stored counts, so sessions scanning the same
+        service concurrently never lose each other's deltas. The caller
+        commits.
+        """
+        if not observation.docs:
+            return
+        db.session.execute(db.text(
+            'INSERT INTO service_corpus_stats (service_id, docs, total_length) '
+            'VALUES (:service_id, :docs, :total_length) '
+            'ON CONFLICT (service_id) DO UPDATE SET '
+            'docs = service_corpus_stats.docs + excluded.docs, '
+            'total_length = service_corpus_stats.total_length + excluded.total_length'
+        ), {'service_id': service_id, 'docs': observation.docs, 'total_length': observation.total_length})
+        
+        checked, matches = {}, {}
+        for term, count in observation.checked.items():
+            key = Term.normalise(term)
+            checked[key] = checked.get(key, 0) + count
+            matches[key] = matches.get(key, 0) + observation.matches.get(term, 0)
+        ids = Term.ids_for(checked)
+        if ids:
+            db.session.execute(db.text(
+                'INSERT INTO term_stats (service_id, term_id, docs, matches) '
+                'VALUES (:service_id, :term_id, :docs, :matches) '
+                'ON CONFLICT (service_id, term_id) DO UPDATE SET '
+                'docs = term_stats.docs + excluded.docs, matches = term_stats.matches + excluded.matches'
+            ), [{'service_id': service_id, 'term_id': term_id, 'docs': checked[term],
+                 'matches': matches[term]} for term, term_id in ids.items()])
+
+class TermStats(db.Model):
+    """Document frequency of a term on a service: of the `docs` pastes
+    checked for it, `matches` contained it"""
+    __tablename__ = 'term_stats'
+    
+    service_id = db.Column(db.String(50), primary_key=True)
+    term_id = db.Column(db.Integer, db.ForeignKey('terms.id'), primary_key=True)
+    docs = db.Column(db.Integer, nullable=False, default=0)
+    matches = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<TermStats {self.service_id} term={self.term_id} {self.matches}/{self.docs}>'
+    
+    @classmethod
+    def counts_for(cls, service_id, terms):
+        """{normalised term: (docs, matches)} for those of `terms` seen on a service"""
+        wanted = {Term.normalise(term) for term in terms if term and term.strip()}
+        if not wanted:
+            return {}
+        rows = db.session.query(Term.term, cls.docs, cls.matches)\
+                         .join(Term, Term.id == cls.term_id)\
+                         .filter(cls.service_id == service_id, Term.term.in_(wanted)).all()
+        return {term: (docs, matches) for term, docs, matches in rows}
 
 class SearchLog(db.Model):
     __tablename__ = 'search_logs'
     
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey('search_sessions.id'), nullable=False, index=True)
     level = db.Column(db.String(10), nullable=False)  # info, warn, error, success
     service = db.Column(db.String(50), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     def __repr__(self):
         return f'<SearchLog {self.level}: {self.message[:50]}>'
@@ -118,6 +374,31 @@ class SearchLog(db.Model):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
         }
 
+class RetentionPolicy(db.Model):
+    """Per-user override of the global retention TTLs.
+    
+    A NULL TTL falls back to the application default; 0 keeps rows forever.
+    """
+    __tablename__ = 'retention_policies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True, index=True)
+    results_ttl_days = db.Column(db.Integer, nullable=True)
+    logs_ttl_days = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RetentionPolicy user_id={self.user_id}>'
+    
+    def to_dict(self):
+        """Converts object attributes to a dictionary."""
+        return {
+            'user_id': self.user_id,
+            'results_ttl_days': self.results_ttl_days,
+            'logs_ttl_days': self.logs_ttl_days,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
 class PastebinService(db.Model):
     __tablename__ = 'pastebin_services'
     
@@ -149,19 +430,91 @@ class PastebinService(db.Model):
         }
 
 class UserStats(db.Model):
+    """Per-user dashboard aggregate.
+
+    Counters are maintained incrementally by `increment` as sessions are
+    created, started, finished and deleted, so reading the dashboard is a
+    single indexed lookup instead of a scan over the user's history.
+    """
     __tablename__ = 'user_stats'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True, index=True)
     total_searches = db.Column(db.Integer, default=0)
     total_results = db.Column(db.Integer, default=0)
     active_crawls = db.Column(db.Integer, default=0)
     success_rate = db.Column(db.Float, default=0.0)
+    completed_searches = db.Column(db.Integer, default=0)
+    success_rate_total = db.Column(db.Float, default=0.0)  # sum of completed sessions' success rates
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
         return f'<UserStats user_id={self.user_id}>'
     
+    @classmethod
+    def increment(cls, user_id, total_searches=0, total_results=0, active_crawls=0,
+                  completed_searches=0, success_rate_total=0.0):
+        """Apply counter deltas to a user's aggregate in one UPDATE statement.
+        
+        The update is expressed relative to the stored values so concurrent
+        session threads never overwrite each other's changes. The caller owns
+        the transaction and commits it together with the state change that
+        caused the delta. Users without a stats row are skipped; their
+        aggregate is built from scratch by `rebuild` on first read.
+        """
+        active = cls.active_crawls + active_crawls
+        completed = cls.completed_searches + completed_searches
+        rate_total = cls.success_rate_total + success_rate_total
+        
+        db.session.execute(
+            db.update(cls)
+            .where(cls.user_id == user_id)
+            .values(
+                total_searches=cls.total_searches + total_searches,
+                total_results=cls.total_results + total_results,
+                active_crawls=db.case((active > 0, active), else_=0),
+                completed_searches=completed,
+                success_rate_total=rate_total,
+                success_rate=db.case((completed > 0, rate_total / completed), else_=0.0),
+                last_updated=datetime.utcnow()
+            )
+        )
+    
+    @classmethod
+    def reopen(cls, session):
+        """Take a completed session's run out of its owner's aggregate.
+        
+        Called before the session leaves 'completed' to run again; its next
+        completion adds the new run back. The caller commits.
+        """
+        if session.status == 'completed':
+            cls.increment(
+                session.user_id, completed_searches=-1, success_rate_total=-(session.success_rate or 0.0)
+            )
+    
+    @classmethod
+    def rebuild(cls, user_id):
+        """Recompute a user's aggregate from the session and result tables."""
+        stats = cls.query.filter_by(user_id=user_id).first()
+        if not stats:
+            stats = cls(user_id=user_id)
+            db.session.add(stats)
+        
+        session_ids = db.select(SearchSession.id).where(SearchSession.user_id == user_id)
+        completed = db.session.query(
+            db.func.count(SearchSession.id),
+            db.func.coalesce(db.func.sum(SearchSession.success_rate), 0.0)
+        ).filter_by(user_id=user_id, status='completed').one()
+        
+        stats.total_searches = SearchSession.query.filter_by(user_id=user_id).count()
+        stats.total_results = SearchResult.query.filter(SearchResult.session_id.in_(session_ids)).count()
+        stats.active_crawls = SearchSession.query.filter_by(user_id=user_id, status='running').count()
+        stats.completed_searches = completed[0]
+        stats.success_rate_total = float(completed[1])
+        stats.success_rate = stats.success_rate_total / stats.completed_searches if stats.completed_searches else 0.0
+        stats.last_updated = datetime.utcnow()
+        return stats
+    
     def to_dict(self):
         """Converts object attributes to a dictionary."""
         return {
@@ -173,4 +526,3 @@ class UserStats(db.Model):
             'success_rate': self.success_rate,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None
         }
-
@@ -1,13 +1,37 @@
 import json
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, Response, current_app, request, jsonify, session
 from datetime import datetime
+from sqlalchemy.exc import OperationalError
 from src.models.user import User, db
-from src.models.scraper import SearchSession, SearchResult, SearchLog, UserStats
+from src.models.scraper import (
+    SearchSession, SearchResult, SearchLog, UserStats, Term, ResultTerm, RetentionPolicy
+)
+from src.models.jobs import SessionSchedule, ScheduleWatermark
+from src.models.fulltext import MIN_QUERY_LENGTH, fulltext_available, search_history
+from src.jobs.retention import delete_session_rows
+from src.jobs.scheduler import next_run_time, validate_schedule
+from src.jobs.fairshare import MAX_PRIORITY, MIN_PRIORITY, queue_estimates
 from src.scrapers.scraper_manager import ScraperManager
+from src.scrapers.detectors import DETECTOR_NAMES
+from src.scrapers.query import Query, QuerySyntaxError
+from src.utils.events import FINAL_STATUSES, format_sse
+from src.utils import serialization
+from src.utils.http_cache import (
+    conditional_response, make_etag, session_cache_control, session_etag
+)
+from src.utils.columnar_export import (
+    COLUMNAR_FORMATS, archive_filename, columnar_export_available, export_session_bytes
+)
 
 scraper_bp = Blueprint('scraper', __name__)
 scraper_manager = ScraperManager()
 
+# Comment lines sent on idle streams so proxies keep the connection open
+STREAM_KEEPALIVE_SECONDS = 15
+
+# The service list only changes with a deploy
+SERVICES_CACHE_CONTROL = 'public, max-age=3600'
+
 # Mock authentication for demo purposes
 def get_current_user():
     # In a real app, this would validate JWT tokens or session cookies
@@ -23,6 +47,17 @@ def create_demo_user():
         db.session.commit()
     return user
 
+def with_queue_estimates(sessions):
+    """Serialise sessions, adding queue position and estimated wait to queued ones"""
+    estimates = queue_estimates() if any(s.status == 'queued' for s in sessions) else {}
+    
+    serialised = []
+    for session in sessions:
+        data = session.to_dict()
+        data.update(estimates.get(session.id, {'queue_position': None, 'estimated_wait_seconds': None}))
+        serialised.append(data)
+    return serialised
+
 @scraper_bp.route('/auth/login', methods=['POST'])
 def login():
     """Handles user login and returns a mock JWT token."""
@@ -52,8 +87,11 @@ def get_user():
 @scraper_bp.route('/services', methods=['GET'])
 def get_services():
     """Returns a list of available pastebin services."""
-    services = scraper_manager.get_available_services()
-    return jsonify(services)
+    payload = scraper_manager.available_services_json()
+    return conditional_response(
+        make_etag(payload), lambda: Response(payload, mimetype='application/json'),
+        SERVICES_CACHE_CONTROL
+    )
 
 @scraper_bp.route('/services/test', methods=['POST'])
 def test_services():
@@ -107,7 +145,7 @@ def get_sessions():
     )
     
     return jsonify({
-        'sessions': [session.to_dict() for session in sessions.items],
+        'sessions': with_queue_estimates(sessions.items),
         'total': sessions.total,
         'pages': sessions.pages,
         'current_page': page
@@ -119,23 +157,43 @@ def create_session():
     user = get_current_user()
     data = request.get_json()
     
-    # Validate required fields
+    # Validate required fields; a query replaces the search terms and secret
+    # detection can run without either
+    settings = data.get('settings') or {}
     required_fields = ['name', 'search_terms', 'services']
+    if settings.get('query') or settings.get('detectSecrets'):
+        required_fields.remove('search_terms')
     for field in required_fields:
         if not data.get(field):
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
+    search_terms = data.get('search_terms') or []
+    if settings.get('query'):
+        if not isinstance(settings['query'], str):
+            return jsonify({'error': 'settings.query must be a string'}), 400
+        try:
+            search_terms = Query(settings['query']).terms
+        except QuerySyntaxError as e:
+            return jsonify({'error': f'Invalid query: {e}'}), 400
+    
+    priority = data.get('priority', 0)
+    if isinstance(priority, bool) or not isinstance(priority, int) \
+            or not MIN_PRIORITY <= priority <= MAX_PRIORITY:
+        return jsonify({'error': f'priority must be an integer from {MIN_PRIORITY} to {MAX_PRIORITY}'}), 400
+    
     # Create session
     session = SearchSession(
         user_id=user.id,
         name=data['name'],
-        search_terms=json.dumps(data['search_terms']),
+        search_terms=json.dumps(search_terms),
         file_types=json.dumps(data.get('file_types', [])),
         services=json.dumps(data['services']),
-        settings=json.dumps(data.get('settings', {}))
+        settings=json.dumps(data.get('settings', {})),
+        priority=priority
     )
     
     db.session.add(session)
+    UserStats.increment(user.id, total_searches=1)
     db.session.commit()
     
     return jsonify(session.to_dict()), 201
@@ -149,7 +207,7 @@ def get_session(session_id):
     if not session:
         return jsonify({'error': 'Session not found'}), 404
     
-    return jsonify(session.to_dict())
+    return jsonify(with_queue_estimates([session])[0])
 
 @scraper_bp.route('/sessions/<int:session_id>/start', methods=['POST'])
 def start_session(session_id):
@@ -160,7 +218,7 @@ def start_session(session_id):
     if not session:
         return jsonify({'error': 'Session not found'}), 404
     
-    if session.status == 'running':
+    if session.status in ('running', 'queued'):
         return jsonify({'error': 'Session already running'}), 400
     
     # Start the session
@@ -193,9 +251,15 @@ def get_session_results(session_id):
     
     This function handles GET requests to fetch search results associated with a
     given session ID. It checks if the session exists and belongs to the current
-    user. The function supports filtering by service and file type through query
-    parameters, orders the results by relevance, and paginates them based on
-    request parameters.
+    user. The function supports filtering by service, file type and matched
+    term through query parameters, orders the results by relevance, and
+    paginates them based on request parameters. The term filter is answered
+    from the `result_terms` index rather than by scanning `matched_terms`.
+    A comma-separated `fields` parameter selects which result fields are
+    returned; only those columns are read from the database. With
+    `duplicates=hide`, near-duplicates of another result (`duplicate_of`
+    set) are left out so each reposted paste is listed once, and
+    `detector` keeps results in which that secret detector fired.
     
     Args:
         session_id (int): The ID of the search session for which results are requested.
@@ -216,6 +280,15 @@ def get_session_results(session_id):
     per_page = request.args.get('per_page', 50, type=int)
     service = request.args.get('service')
     file_type = request.args.get('file_type')
+    term = request.args.get('term')
+    fields = request.args.get('fields')
+    hide_duplicates = request.args.get('duplicates') == 'hide'
+    detector = request.args.get('detector')
+    
+    try:
+        columns = SearchResult.listing_columns(fields.split(',') if fields else None)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Build query
     query = SearchResult.query.filter_by(session_id=session_id)
@@ -226,20 +299,59 @@ def get_session_results(session_id):
     if file_type:
         query = query.filter(SearchResult.file_type == file_type)
     
+    if hide_duplicates:
+        query = query.filter(SearchResult.duplicate_of.is_(None))
+    
+    if detector:
+        if detector not in DETECTOR_NAMES:
+            return jsonify({'error': f'Unknown detector: {detector}'}), 400
+        # Detector names contain '_', a LIKE wildcard
+        pattern = detector.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(SearchResult.detections.like(f'%"{pattern}":%', escape='\\'))
+    
+    if term:
+        query = query.join(ResultTerm, ResultTerm.result_id == SearchResult.id)\
+                     .join(Term, Term.id == ResultTerm.term_id)\
+                     .filter(ResultTerm.session_id == session_id,
+                             Term.term == Term.normalise(term))
+    
     # Order by relevance score (highest first)
     query = query.order_by(SearchResult.relevance_score.desc())
     
-    # Paginate
-    results = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    def build():
+        # Paginate
+        results = query.with_entities(*columns).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+        
+        return serialization.json_response({
+            'results': [SearchResult.row_to_dict(row, serialization.loads) for row in results.items],
+            'total': results.total,
+            'pages': results.pages,
+            'current_page': page
+        })
     
-    return jsonify({
-        'results': [result.to_dict() for result in results.items],
-        'total': results.total,
-        'pages': results.pages,
-        'current_page': page
-    })
+    etag = session_etag(session, 'results', request.query_string.decode())
+    return conditional_response(etag, build, session_cache_control(session))
+
+@scraper_bp.route('/sessions/<int:session_id>/terms', methods=['GET'])
+def get_session_terms(session_id):
+    """Return the number of results per matched term for a session."""
+    user = get_current_user()
+    session = SearchSession.query.filter_by(id=session_id, user_id=user.id).first()
+    
+    if not session:
+        return jsonify({'error': 'Session not found'}), 404
+    
+    hits = db.func.count(ResultTerm.result_id)
+    rows = db.session.query(Term.term, hits)\
+                     .join(ResultTerm, ResultTerm.term_id == Term.id)\
+                     .filter(ResultTerm.session_id == session_id)\
+                     .group_by(Term.term)\
+                     .order_by(hits.desc())\
+                     .all()
+    
+    return jsonify([{'term': term, 'count': count} for term, count in rows])
 
 @scraper_bp.route('/sessions/<int:session_id>/logs', methods=['GET'])
 def get_session_logs(session_id):
@@ -255,6 +367,157 @@ def get_session_logs(session_id):
     
     return jsonify(logs)
 
+@scraper_bp.route('/sessions/<int:session_id>/stream', methods=['GET'])
+def stream_session(session_id):
+    """Push a session's logs, progress, results and status as Server-Sent Events.
+    
+    The first message is a `snapshot` with the session and its recent logs;
+    after that `log`, `progress`, `result` and `status` events are sent as
+    they happen. A client reconnecting with `Last-Event-ID` (or the
+    `last_event_id` query parameter) receives only the events it missed, or
+    a new snapshot when they are no longer buffered. The stream ends after
+    the session reaches a final status; reconnecting to a finished session
+    returns 204, which stops EventSource from retrying.
+    """
+    user = get_current_user()
+    session = SearchSession.query.filter_by(id=session_id, user_id=user.id).first()
+    
+    if not session:
+        return jsonify({'error': 'Session not found'}), 404
+    
+    bus = scraper_manager.events
+    after = bus.parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    replay = bus.since(session_id, after) if after is not None else None
+    finished = session.status in FINAL_STATUSES or any(
+        item.event == 'status' and item.data['status'] in FINAL_STATUSES for item in replay or ()
+    )
+    
+    shown_log_id = 0  # logs up to this id are in the snapshot
+    if replay is None:
+        # First connection, or the missed events are gone: start from the
+        # database. Events are followed from before the logs are read, so
+        # none is lost in between; logs published in between are in the
+        # snapshot too and are skipped when they come round.
+        after = bus.last_seq()
+        logs = scraper_manager.get_session_logs(session_id, request.args.get('limit', 50, type=int))
+        shown_log_id = max((log['id'] for log in logs), default=0)
+        bus.note_log_id(session_id, shown_log_id)
+        # Results stored before the snapshot are not streamed again by the relay
+        newest = db.session.query(db.func.max(SearchResult.id))\
+                           .filter(SearchResult.session_id == session_id).scalar()
+        bus.note_result_id(session_id, newest or 0)
+        opening = [format_sse(bus.event_id(after), 'snapshot', {
+            'session': with_queue_estimates([session])[0],
+            'logs': logs
+        })]
+    elif not replay and finished:
+        return '', 204
+    else:
+        opening = [format_sse(bus.event_id(item.seq), item.event, item.data) for item in replay]
+        after = replay[-1].seq if replay else after
+    
+    if finished:
+        return Response(opening, mimetype='text/event-stream')
+    
+    scraper_manager.ensure_event_relay(current_app._get_current_object())
+    
+    def generate():
+        with bus.watch(session_id):
+            yield from opening
+            cursor = after
+            while True:
+                events = bus.wait(session_id, cursor, STREAM_KEEPALIVE_SECONDS)
+                if not events:
+                    yield ': keepalive\n\n'
+                    continue
+                for item in events:
+                    cursor = item.seq
+                    if item.event == 'log' and item.data['id'] <= shown_log_id:
+                        continue
+                    yield format_sse(bus.event_id(item.seq), item.event, item.data)
+                    if item.event == 'status' and item.data['status'] in FINAL_STATUSES:
+                        return
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # let nginx pass events through unbuffered
+    })
+
+@scraper_bp.route('/sessions/<int:session_id>/schedule', methods=['GET'])
+def get_session_schedule(session_id):
+    """Return the recurring schedule of a session."""
+    user = get_current_user()
+    schedule = SessionSchedule.query.filter_by(session_id=session_id, user_id=user.id).first()
+    
+    if not schedule:
+        return jsonify({'error': 'Schedule not found'}), 404
+    
+    return jsonify(schedule.to_dict())
+
+@scraper_bp.route('/sessions/<int:session_id>/schedule', methods=['PUT'])
+def set_session_schedule(session_id):
+    """Run a session on a schedule: {"interval_seconds": 300} or {"cron": "*/5 * * * *"}.
+    
+    Every run is a new session copied from this one. Runs resume where the
+    previous run stopped, so each only scans pastes published since.
+    """
+    user = get_current_user()
+    session = SearchSession.query.filter_by(id=session_id, user_id=user.id).first()
+    
+    if not session:
+        return jsonify({'error': 'Session not found'}), 404
+    
+    if session.schedule_id:
+        return jsonify({'error': 'A scheduled run cannot itself be scheduled'}), 400
+    
+    data = request.get_json() or {}
+    interval_seconds = data.get('interval_seconds')
+    cron = (data.get('cron') or '').strip() or None
+    
+    error = validate_schedule(interval_seconds, cron)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    schedule = SessionSchedule.query.filter_by(session_id=session_id).first()
+    if not schedule:
+        schedule = SessionSchedule(session_id=session_id, user_id=user.id)
+        db.session.add(schedule)
+    
+    schedule.interval_seconds = interval_seconds
+    schedule.cron = cron
+    schedule.enabled = bool(data.get('enabled', True))
+    schedule.next_run_at = next_run_time(schedule, datetime.utcnow())
+    db.session.commit()
+    
+    return jsonify(schedule.to_dict())
+
+@scraper_bp.route('/sessions/<int:session_id>/schedule', methods=['DELETE'])
+def delete_session_schedule(session_id):
+    """Stop running a session on a schedule; earlier runs are kept."""
+    user = get_current_user()
+    schedule = SessionSchedule.query.filter_by(session_id=session_id, user_id=user.id).first()
+    
+    if not schedule:
+        return jsonify({'error': 'Schedule not found'}), 404
+    
+    db.session.execute(
+        db.update(SearchSession).where(SearchSession.schedule_id == schedule.id).values(schedule_id=None)
+    )
+    db.session.execute(db.delete(ScheduleWatermark).where(ScheduleWatermark.schedule_id == schedule.id))
+    db.session.delete(schedule)
+    db.session.commit()
+    
+    return jsonify({'message': 'Schedule deleted successfully'})
+
+@scraper_bp.route('/schedules', methods=['GET'])
+def get_schedules():
+    """List the current user's recurring schedules."""
+    user = get_current_user()
+    schedules = SessionSchedule.query.filter_by(user_id=user.id)\
+                                     .order_by(SessionSchedule.next_run_at).all()
+    
+    return jsonify([schedule.to_dict() for schedule in schedules])
+
 @scraper_bp.route('/sessions/<int:session_id>/delete', methods=['DELETE'])
 def delete_session(session_id):
     """Delete a search session by ID."""
@@ -265,56 +528,126 @@ def delete_session(session_id):
         return jsonify({'error': 'Session not found'}), 404
     
     # Stop session if running
-    if session.status == 'running':
+    if session.status in ('running', 'queued'):
         scraper_manager.stop_search_session(session_id)
+        db.session.refresh(session)
+    
+    # Take the session's contribution out of the dashboard aggregate
+    results_count = SearchResult.query.filter_by(session_id=session_id).count()
+    completed = session.status == 'completed'
+    UserStats.increment(
+        user.id,
+        total_searches=-1,
+        total_results=-results_count,
+        active_crawls=-1 if session.status == 'running' else 0,
+        completed_searches=-1 if completed else 0,
+        success_rate_total=-(session.success_rate or 0.0) if completed else 0.0
+    )
     
-    # Delete session (cascade will delete results and logs)
-    db.session.delete(session)
+    # Delete the session and its results and logs without loading them
+    delete_session_rows(session_id)
     db.session.commit()
     
     return jsonify({'message': 'Session deleted successfully'})
 
-@scraper_bp.route('/dashboard/stats', methods=['GET'])
-def get_dashboard_stats():
-    """Retrieve and update dashboard statistics for the current user."""
+@scraper_bp.route('/retrohunt', methods=['GET'])
+def retrohunt():
+    """Search the content of every paste captured by the user's past sessions.
+    
+    Queries the FTS5 trigram index maintained alongside `search_results`, so a
+    new indicator can be checked against history without re-scraping.
+    
+    Args:
+        q (str): Substring to look for (at least three characters).
+        raw (bool): Treat `q` as an FTS5 query instead of a literal substring.
+        session_id (int): Restrict the search to one session, if provided.
+        service (str): Restrict the search to one service, if provided.
+        page (int): The page number of the results to retrieve, defaults to 1.
+        per_page (int): The number of hits per page, defaults to 50.
+    
+    Returns:
+        A JSON response with ranked hits, each including a highlighted snippet.
+    """
     user = get_current_user()
     
-    # Get or create user stats
-    stats = UserStats.query.filter_by(user_id=user.id).first()
-    if not stats:
-        stats = UserStats(user_id=user.id)
-        db.session.add(stats)
-        db.session.commit()
+    query = request.args.get('q', '').strip()
+    raw = request.args.get('raw', 'false').lower() == 'true'
+    page = request.args.get('page', 1, type=int)
+    per_page = max(1, min(request.args.get('per_page', 50, type=int), 500))
+    
+    if len(query) < MIN_QUERY_LENGTH:
+        return jsonify({'error': f'Query must be at least {MIN_QUERY_LENGTH} characters'}), 400
+    
+    if not fulltext_available():
+        return jsonify({'error': 'Full-text index not available'}), 501
+    
+    try:
+        hits = search_history(
+            user.id, query,
+            limit=per_page,
+            offset=(max(page, 1) - 1) * per_page,
+            session_id=request.args.get('session_id', type=int),
+            service=request.args.get('service'),
+            raw=raw
+        )
+    except OperationalError as e:
+        db.session.rollback()
+        return jsonify({'error': f'Invalid query: {e.orig}'}), 400
     
-    # Calculate current stats
-    total_searches = SearchSession.query.filter_by(user_id=user.id).count()
-    total_results = db.session.query(SearchResult)\
-                             .join(SearchSession)\
-                             .filter(SearchSession.user_id == user.id)\
-                             .count()
+    return jsonify({
+        'query': query,
+        'results': hits,
+        'current_page': page
+    })
+
+@scraper_bp.route('/retention', methods=['GET'])
+def get_retention_policy():
+    """Return the current user's retention overrides."""
+    user = get_current_user()
+    policy = RetentionPolicy.query.filter_by(user_id=user.id).first()
     
-    active_crawls = SearchSession.query.filter_by(
-        user_id=user.id, status='running'
-    ).count()
+    if not policy:
+        return jsonify({'user_id': user.id, 'results_ttl_days': None, 'logs_ttl_days': None})
     
-    # Calculate success rate
-    completed_sessions = SearchSession.query.filter_by(
-        user_id=user.id, status='completed'
-    ).all()
+    return jsonify(policy.to_dict())
+
+@scraper_bp.route('/retention', methods=['PUT'])
+def update_retention_policy():
+    """Set the current user's retention TTLs (days; null uses the default, 0 keeps forever)."""
+    user = get_current_user()
+    data = request.get_json() or {}
     
-    if completed_sessions:
-        avg_success_rate = sum(s.success_rate for s in completed_sessions) / len(completed_sessions)
-    else:
-        avg_success_rate = 0.0
-    
-    # Update stats
-    stats.total_searches = total_searches
-    stats.total_results = total_results
-    stats.active_crawls = active_crawls
-    stats.success_rate = avg_success_rate
-    stats.last_updated = datetime.utcnow()
+    for field in ('results_ttl_days', 'logs_ttl_days'):
+        value = data.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 0):
+            return jsonify({'error': f'{field} must be a non-negative integer or null'}), 400
+    
+    policy = RetentionPolicy.query.filter_by(user_id=user.id).first()
+    if not policy:
+        policy = RetentionPolicy(user_id=user.id)
+        db.session.add(policy)
+    
+    policy.results_ttl_days = data.get('results_ttl_days')
+    policy.logs_ttl_days = data.get('logs_ttl_days')
     db.session.commit()
     
+    return jsonify(policy.to_dict())
+
+@scraper_bp.route('/dashboard/stats', methods=['GET'])
+def get_dashboard_stats():
+    """Retrieve dashboard statistics for the current user.
+    
+    `UserStats` is kept up to date as sessions are created, run and deleted,
+    so this is a single indexed read. The aggregate is only computed from the
+    session tables the first time a user opens the dashboard.
+    """
+    user = get_current_user()
+    
+    stats = UserStats.query.filter_by(user_id=user.id).first()
+    if not stats:
+        stats = UserStats.rebuild(user.id)
+        db.session.commit()
+    
     return jsonify(stats.to_dict())
 
 @scraper_bp.route('/dashboard/recent-sessions', methods=['GET'])
@@ -334,13 +667,17 @@ def export_session_results(session_id):
     """Exports session results based on specified format.
     
     This function retrieves a search session by its ID and the current user, then
-    exports the session results in either JSON or CSV format. If the session is not
-    found, it returns a 404 error. Currently, only JSON export is implemented; CSV
-    export returns a 501 Not Implemented status. Unsupported formats result in a
-    400 Bad Request.
+    exports the session results in JSON, Arrow IPC or Parquet format. If the
+    session is not found, it returns a 404 error. Columnar formats (`arrow`,
+    `parquet`) are read column-wise straight from SQL and need pyarrow; without
+    it they return 501, as does CSV export. Unsupported formats result in a 400
+    Bad Request.
     
     Args:
         session_id (int): The ID of the search session to export results for.
+        format (str): `json` (default), `arrow`, `parquet` or `csv`.
+        include_content (bool): Include `full_content` in columnar archives.
+        fields (str): Comma-separated result fields for JSON exports.
     """
     user = get_current_user()
     session = SearchSession.query.filter_by(id=session_id, user_id=user.id).first()
@@ -349,14 +686,39 @@ def export_session_results(session_id):
         return jsonify({'error': 'Session not found'}), 404
     
     format_type = request.args.get('format', 'json')
-    
-    results = SearchResult.query.filter_by(session_id=session_id).all()
+    etag = session_etag(session, 'export', request.query_string.decode())
+    cache_control = session_cache_control(session)
+    
+    if format_type in COLUMNAR_FORMATS:
+        if not columnar_export_available():
+            return jsonify({'error': 'Columnar export requires pyarrow'}), 501
+        
+        include_content = request.args.get('include_content', 'false').lower() == 'true'
+        return conditional_response(etag, lambda: Response(
+            export_session_bytes(session, format_type, include_content),
+            mimetype=COLUMNAR_FORMATS[format_type][0],
+            headers={
+                'Content-Disposition': f'attachment; filename={archive_filename(session, format_type)}'
+            }
+        ), cache_control)
     
     if format_type == 'json':
-        return jsonify({
-            'session': session.to_dict(),
-            'results': [result.to_dict() for result in results]
-        })
+        fields = request.args.get('fields')
+        try:
+            columns = SearchResult.listing_columns(fields.split(',') if fields else None)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        def build():
+            rows = db.session.execute(
+                db.select(*columns).where(SearchResult.session_id == session_id)
+            )
+            return serialization.json_response({
+                'session': session.to_dict(),
+                'results': [SearchResult.row_to_dict(row, serialization.loads) for row in rows]
+            })
+        
+        return conditional_response(etag, build, cache_control)
     elif format_type == 'csv':
         # In a real app, generate CSV content
         return jsonify({'error': 'CSV export not implemented yet'}), 501
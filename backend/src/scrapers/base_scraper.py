@@ -1,11 +1,55 @@
 import time
 import requests
-import re
+import socket
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
-from urllib.parse import urljoin, urlparse
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterable, Optional
+from urllib.parse import urljoin
 import logging
 
+from .cancellation import CancellationToken, ScrapeCancelled
+from .file_types import classify as classify_file_type, matches_file_types
+from .html_text import html_to_text
+from .matcher import CompiledMatcher, PasteDocument
+from .snippets import keyword_in_context
+
+# (connect, read) timeouts in seconds
+REQUEST_TIMEOUT = (5, 30)
+
+class ScanCursor:
+    """High-water mark of a recurring search on one service.
+    
+    Items older than `since` were already scanned by an earlier run and are
+    skipped without being fetched; `high_water` tracks the newest item seen
+    so far and becomes the next run's `since`. Several items can share a
+    timestamp, so the keys scanned at the mark (`boundary_keys`) travel
+    with it: items at `since` are scanned unless the earlier run already
+    did, and are neither missed nor matched twice.
+    """
+    
+    def __init__(self, since: Optional[float] = None, boundary_keys: Iterable[str] = ()):
+        self.since = since
+        self.seen_at_since = set(boundary_keys) if since is not None else set()
+        self.high_water = since
+        self.boundary_keys = set(self.seen_at_since)
+    
+    def wants(self, watermark: Optional[float], key: Optional[str] = None) -> bool:
+        """Whether an item with this watermark still needs scanning"""
+        if watermark is None or self.since is None or watermark > self.since:
+            return True
+        return watermark == self.since and key not in self.seen_at_since
+    
+    def advance(self, watermark: Optional[float], key: Optional[str] = None):
+        """Record that an item with this watermark was scanned"""
+        if watermark is None:
+            return
+        if self.high_water is None or watermark > self.high_water:
+            self.high_water = watermark
+            self.boundary_keys = set()
+        if watermark == self.high_water and key is not None:
+            self.boundary_keys.add(key)
+
 class BaseScraper(ABC):
     """Base class for all pastebin scrapers"""
     
@@ -14,15 +58,36 @@ class BaseScraper(ABC):
         self.name = name
         self.base_url = base_url
         self.rate_limit = rate_limit  # requests per minute
+        self.has_api = True  # items are listed through an API rather than scraped from pages
         self.last_request_time = 0
+        self.rate_budget = None  # shared limiter with acquire(service_id, rate_limit); per-instance if None
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         self.logger = logging.getLogger(f'scraper.{service_id}')
+        self._local = threading.local()  # cancellation token of the calling thread
+    
+    @contextmanager
+    def cancellable(self, cancel: Optional[CancellationToken]):
+        """Make requests issued by this thread inside the block honour `cancel`"""
+        previous = getattr(self._local, 'cancel', None)
+        self._local.cancel = cancel
+        try:
+            yield
+        finally:
+            self._local.cancel = previous
     
-    def _rate_limit(self):
-        """Enforce rate limiting between requests"""
+    def _current_cancel(self) -> Optional[CancellationToken]:
+        return getattr(self._local, 'cancel', None)
+    
+    def _rate_limit(self, cancel: Optional[CancellationToken] = None):
+        """Enforce rate limiting between requests; the wait ends early if `cancel` fires"""
+        if self.rate_budget is not None:
+            self.rate_budget.acquire(self.service_id, self.rate_limit, cancel=cancel)
+            self.last_request_time = time.time()
+            return
+        
         current_time = time.time()
         time_since_last = current_time - self.last_request_time
         min_interval = 60.0 / self.rate_limit  # seconds between requests
@@ -30,126 +95,240 @@ class BaseScraper(ABC):
         if time_since_last < min_interval:
             sleep_time = min_interval - time_since_last
             self.logger.info(f"Rate limiting: sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
+            if cancel:
+                cancel.sleep(sleep_time)
+            else:
+                time.sleep(sleep_time)
         
         self.last_request_time = time.time()
     
-    def _make_request(self, url: str, **kwargs) -> Optional[requests.Response]:
-        """Make a rate-limited HTTP request"""
-        self._rate_limit()
+    def _make_request(self, url: str, cancel: Optional[CancellationToken] = None,
+                      **kwargs) -> Optional[requests.Response]:
+        """Make a rate-limited HTTP request.
+        
+        With a cancellation token (passed in, or set for this thread through
+        `cancellable`) cancelling aborts the rate-limit wait and the body
+        download, and ScrapeCancelled is raised.
+        """
+        cancel = cancel or self._current_cancel()
+        self._rate_limit(cancel)
+        if cancel:
+            cancel.raise_if_cancelled()
         
         try:
-            response = self.session.get(url, timeout=30, **kwargs)
+            response = self.session.get(url, timeout=REQUEST_TIMEOUT, stream=True, **kwargs)
+            remove = cancel.on_cancel(lambda: self._abort_response(response)) if cancel else None
+            try:
+                response.content  # download the body; aborting the socket ends this early
+            finally:
+                if remove:
+                    remove()
+                if cancel and cancel.cancelled:
+                    response.close()
             response.raise_for_status()
             return response
-        except requests.RequestException as e:
+        except Exception as e:
+            if cancel and cancel.cancelled:
+                raise ScrapeCancelled()
+            if not isinstance(e, requests.RequestException):
+                raise
             self.logger.error(f"Request failed for {url}: {e}")
             return None
     
-    def _extract_text_content(self, html: str) -> str:
-        """Extract text content from HTML, removing tags"""
-        # Simple HTML tag removal - in production, use BeautifulSoup
-        text = re.sub(r'<[^>]+>', '', html)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
-    
-    def _calculate_relevance_score(self, content: str, search_terms: List[str]) -> float:
-        """Calculate relevance score based on term frequency and positioning"""
-        if not content or not search_terms:
-            return 0.0
-        
-        content_lower = content.lower()
-        total_score = 0.0
-        
-        for term in search_terms:
-            term_lower = term.lower()
-            count = content_lower.count(term_lower)
-            if count > 0:
-                # Base score for presence
-                score = min(count * 10, 50)  # Cap at 50 points per term
-                
-                # Bonus for early appearance
-                first_pos = content_lower.find(term_lower)
-                if first_pos != -1:
-                    position_bonus = max(0, 20 - (first_pos / len(content) * 20))
-                    score += position_bonus
-                
-                total_score += score
-        
-        # Normalize to 0-100 scale
-        return min(total_score, 100.0)
-    
-    def _matches_file_type(self, content: str, url: str, file_types: List[str]) -> bool:
-        """Check if content matches any of the specified file types"""
-        if not file_types:
-            return True  # No filter means accept all
-        
-        # Check URL extension
-        parsed_url = urlparse(url)
-        path = parsed_url.path.lower()
-        for file_type in file_types:
-            if path.endswith(f'.{file_type}'):
-                return True
-        
-        # Check content patterns for common file types
-        content_lower = content.lower()
-        
-        for file_type in file_types:
-            if file_type == 'json' and ('{' in content and '}' in content):
-                return True
-            elif file_type == 'xml' and ('<' in content and '>' in content):
-                return True
-            elif file_type == 'py' and ('def ' in content or 'import ' in content):
-                return True
-            elif file_type == 'js' and ('function' in content or 'var ' in content or 'const ' in content):
-                return True
-            elif file_type == 'sql' and ('select ' in content_lower or 'insert ' in content_lower):
-                return True
-            elif file_type == 'php' and '<?php' in content_lower:
-                return True
-        
-        return False
-    
-    def _contains_search_terms(self, content: str, search_terms: List[str], regex_mode: bool = False) -> List[str]:
-        """Check if content contains any search terms and return matched terms"""
-        if not content or not search_terms:
-            return []
-        
-        matched_terms = []
-        content_lower = content.lower()
-        
-        for term in search_terms:
-            if regex_mode:
-                try:
-                    if re.search(term, content, re.IGNORECASE):
-                        matched_terms.append(term)
-                except re.error:
-                    # Fall back to simple string search if regex is invalid
-                    if term.lower() in content_lower:
-                        matched_terms.append(term)
-            else:
-                if term.lower() in content_lower:
-                    matched_terms.append(term)
+    @staticmethod
+    def _abort_response(response: requests.Response):
+        """Interrupt a body download blocked in another thread.
         
-        return matched_terms
+        Shutting the socket down wakes the blocked read; closing the response
+        here instead would wait for the reader's buffer lock.
+        """
+        fp = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+        sock = getattr(getattr(fp, 'raw', None), '_sock', None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+    
+    def _extract_text_content(self, html: str) -> str:
+        """Extract the text of an HTML page (see `html_text.HtmlTextExtractor`)"""
+        return html_to_text(html)
+    
+    def _matches_file_type(self, file_type: str, file_types: List[str]) -> bool:
+        """Check if a classified paste passes the file type filter (see `file_types.classify`)"""
+        return matches_file_types(file_type, file_types)
+    
+    def _detection_score(self, detections: Dict[str, int]) -> float:
+        """Relevance points for secret detector hits: 25 per kind, up to 50"""
+        return min(25.0 * len(detections), 50.0)
     
-    @abstractmethod
     def search(self, search_terms: List[str], file_types: List[str] = None, 
-               max_results: int = 100, **kwargs) -> List[Dict[str, Any]]:
+               max_results: int = 100, cursor: Optional[ScanCursor] = None,
+               cancel: Optional[CancellationToken] = None,
+               **kwargs) -> List[Dict[str, Any]]:
         """
         Search for pastes containing the specified terms
         
+        Lists recent items, fetches each one and evaluates it against the
+        compiled search criteria. Concurrent sessions should go through
+        `ServiceFeed` instead, which fetches each item once for all of them.
+        
         Args:
             search_terms: List of terms to search for
             file_types: List of file types to filter by (optional)
             max_results: Maximum number of results to return
-            **kwargs: Additional search parameters
+            cursor: Skip items an earlier run already scanned (optional)
+            cancel: Stop early, abandoning in-flight requests (optional)
+            **kwargs: Additional search parameters (session settings)
         
         Returns:
             List of dictionaries containing paste information
         """
+        matcher = CompiledMatcher.from_settings(search_terms, file_types, kwargs)
+        results = []
+        
+        try:
+            with self.cancellable(cancel):
+                self._scan(matcher, max_results, cursor, results)
+        except ScrapeCancelled:
+            self.logger.info(f"Search cancelled after {len(results)} matches")
+        except Exception as e:
+            self.logger.error(f"Search failed: {e}")
+        
+        return results
+    
+    def _scan(self, matcher: CompiledMatcher, max_results: int,
+              cursor: Optional[ScanCursor], results: List[Dict[str, Any]]):
+        """List, fetch and evaluate items, appending matches to `results`"""
+        for item in self.list_items(self.listing_limit(max_results)):
+            if len(results) >= max_results:
+                break
+            
+            watermark = self.item_watermark(item)
+            key = self.item_key(item)
+            if cursor and not cursor.wants(watermark, key):
+                continue
+            
+            content = self.fetch_item_content(item)
+            if cursor:
+                cursor.advance(watermark, key)
+            if not content:
+                continue
+            
+            result = self.evaluate(item, PasteDocument(content), matcher)
+            if result:
+                results.append(result)
+                self.logger.info(f"Found match in {self.item_key(item)}: {len(result['matched_terms'])} terms")
+    
+    def listing_limit(self, max_results: int) -> int:
+        """How many recent items to list in order to find `max_results` matches"""
+        return max_results * 2
+    
+    @abstractmethod
+    def list_items(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        List recently published items (pastes, or files of a gist)
+        
+        Args:
+            limit: Maximum number of items to list
+        
+        Returns:
+            Item metadata dictionaries, newest first
+        """
+        pass
+    
+    @abstractmethod
+    def item_key(self, item: Dict[str, Any]) -> str:
+        """Stable identifier of a listed item, used as its paste_id"""
+        pass
+    
+    def item_watermark(self, item: Dict[str, Any]) -> Optional[float]:
+        """Publication time of a listed item as a unix timestamp.
+        
+        Used as the high-water mark of recurring searches; services without
+        a usable timestamp return None and are always scanned in full.
+        """
+        return None
+    
+    @abstractmethod
+    def fetch_item_content(self, item: Dict[str, Any]) -> Optional[str]:
+        """Fetch the raw content of a listed item, or None if unavailable"""
+        pass
+    
+    def evaluator_spec(self) -> tuple:
+        """(module, class name, constructor args) from which a worker process
+        rebuilds this scraper to run `evaluate` (see `MatchPool`)"""
+        return (type(self).__module__, type(self).__qualname__, ())
+    
+    def evaluate(self, item: Dict[str, Any], document: PasteDocument,
+                 matcher: CompiledMatcher) -> Optional[Dict[str, Any]]:
+        """
+        Match a fetched item against a session's criteria
+        
+        Results are built the same way for every service; scrapers describe
+        their items through `result_url`, `result_title`, `file_type_hints`
+        and `result_created_at`.
+        
+        Args:
+            item: Item metadata from `list_items`
+            document: The item's content
+            matcher: The session's compiled search criteria
+        
+        Returns:
+            A result dictionary if the item matches, otherwise None
+        """
+        content = document.content
+        
+        # Check if content or a payload decoded from it matches search terms or holds a known secret
+        hits, detections, decoded_from = matcher.inspect(document)
+        matched_terms = list(hits)
+        if not matched_terms and not detections:
+            return None
+        
+        # Check file type filter
+        file_type = classify_file_type(content, **self.file_type_hints(item))
+        if not self._matches_file_type(file_type, matcher.file_types):
+            return None
+        
+        # Calculate relevance score
+        relevance_score = min(matcher.score(document, hits) + self._detection_score(detections), 100.0)
+        spans = matcher.spans(document, hits)
+        
+        return {
+            'paste_id': self.item_key(item),
+            'url': self.result_url(item),
+            'title': self.result_title(item),
+            'content_preview': keyword_in_context(content, spans),
+            'full_content': content,
+            'file_type': file_type,
+            'matched_terms': matched_terms,
+            'match_offsets': spans,
+            'detections': detections,
+            'decoded_from': decoded_from,
+            'service': self.name,
+            'relevance_score': relevance_score,
+            'file_size': len(content.encode('utf-8')),
+            'simhash': document.simhash if content else None,
+            'created_at': self.result_created_at(item)
+        }
+    
+    @abstractmethod
+    def result_url(self, item: Dict[str, Any]) -> str:
+        """Link to a listed item, shown with its result"""
         pass
     
+    def result_title(self, item: Dict[str, Any]) -> str:
+        """Title shown with an item's result"""
+        return item.get('title') or item.get('filename') or 'Untitled'
+    
+    def file_type_hints(self, item: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """The syntax and file name the service gives for an item (see `file_types.classify`)"""
+        return {'syntax': item.get('syntax'), 'filename': item.get('filename')}
+    
+    def result_created_at(self, item: Dict[str, Any]) -> Any:
+        """Publication time of an item as the service reports it"""
+        return item.get('date')
+    
     @abstractmethod
     def get_paste_content(self, paste_id: str) -> Optional[str]:
         """
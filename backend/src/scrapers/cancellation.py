@@ -0,0 +1,74 @@
+import threading
+from typing import Callable, List, Optional
+
+
+class ScrapeCancelled(BaseException):
+    """Raised inside scraper code when its cancellation token fires.
+    
+    Derives from BaseException, like asyncio.CancelledError, so the broad
+    `except Exception` handlers around individual requests do not swallow
+    it and the whole scrape unwinds.
+    """
+
+
+class CancellationToken:
+    """Cooperative cancellation signal for one search session.
+    
+    Blocking waits in scraper code go through `wait` so they return as soon
+    as the token is cancelled, and callbacks registered with `on_cancel`
+    (for example closing an in-flight HTTP response) run on `cancel`.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def cancel(self):
+        """Cancel the token and run the registered callbacks once"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep up to `timeout` seconds; returns True if cancelled meanwhile"""
+        return self._event.wait(timeout)
+    
+    def sleep(self, seconds: float):
+        """Sleep for `seconds`, raising ScrapeCancelled if cancelled meanwhile"""
+        if self._event.wait(seconds):
+            raise ScrapeCancelled()
+    
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise ScrapeCancelled()
+    
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run `callback` on cancellation (immediately if already cancelled).
+        
+        Returns a function that unregisters the callback.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                
+                def remove():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return remove
+        
+        callback()
+        return lambda: None
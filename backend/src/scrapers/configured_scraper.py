@@ -0,0 +1,142 @@
+import html
+import re
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from urllib.parse import quote
+from .base_scraper import BaseScraper
+from .html_text import element_content, html_to_text
+from .service_configs import SERVICE_CONFIGS
+
+ITEM_FIELDS = ('key', 'title', 'date', 'syntax', 'filename')
+
+class ConfiguredScraper(BaseScraper):
+    """Scraper for a service described by an entry of SERVICE_CONFIGS.
+    
+    The listing page or endpoint is parsed with the service's compiled
+    item pattern (or JSON field mapping), raw content is fetched from its
+    URL template and HTML pages are reduced to text with `html_to_text`.
+    Listing, fetching and evaluation then go through the same shared feed
+    and match pool as the hand-written scrapers.
+    """
+    
+    def __init__(self, service_id: str):
+        self.config = SERVICE_CONFIGS[service_id]
+        super().__init__(
+            service_id=service_id,
+            name=self.config['name'],
+            base_url=self.config['base_url'],
+            rate_limit=self.config['rate_limit']
+        )
+        self.has_api = self.config.get('has_api', False)
+        self._item_pattern = re.compile(self.config['item_pattern']) \
+            if self.config.get('item_pattern') else None
+        self._content_pattern = re.compile(self.config['content_pattern']) \
+            if self.config.get('content_pattern') else None
+        self._content_element = re.compile(self.config['content_element']) \
+            if self.config.get('content_element') else None
+    
+    def evaluator_spec(self) -> tuple:
+        """Workers rebuild the scraper from its service id"""
+        return (type(self).__module__, type(self).__qualname__, (self.service_id,))
+    
+    def listing_limit(self, max_results: int) -> int:
+        """Twice the results wanted, up to what one listing returns"""
+        limit = max_results * 2
+        cap = self.config.get('max_listing')
+        return min(limit, cap) if cap else limit
+    
+    def list_items(self, limit: int) -> List[Dict[str, Any]]:
+        """Recent pastes from the service's listing, newest first"""
+        try:
+            response = self._make_request(self.config['listing_url'].format(limit=limit))
+            if not response:
+                return []
+            
+            if self.config.get('listing_format') == 'json':
+                items = self._json_items(response.json())
+            else:
+                items = [self._html_item(match) for match in self._item_pattern.finditer(response.text)]
+        except Exception as e:
+            self.logger.error(f"Failed to list recent pastes: {e}")
+            return []
+        
+        # Listing pages often link a paste more than once
+        unique = {}
+        for item in items:
+            if item.get('key') and item['key'] not in unique:
+                unique[item['key']] = item
+        return list(unique.values())[:limit]
+    
+    def _json_items(self, data: Any) -> List[Dict[str, Any]]:
+        for step in self.config.get('items_path', ()):
+            data = data.get(step) if isinstance(data, dict) else None
+        if not isinstance(data, list):
+            return []
+        
+        fields = self.config['fields']
+        items = []
+        for record in data:
+            if isinstance(record, dict):
+                item = {name: record.get(field) for name, field in fields.items()}
+                item['key'] = str(item['key']) if item.get('key') is not None else None
+                items.append(item)
+        return items
+    
+    def _html_item(self, match: re.Match) -> Dict[str, Any]:
+        found = match.groupdict()
+        item = {name: found[name] for name in ITEM_FIELDS if found.get(name)}
+        if 'title' in item:
+            item['title'] = html.unescape(item['title']).strip()
+        return item
+    
+    def item_key(self, item: Dict[str, Any]) -> str:
+        """Paste key taken from the listing"""
+        return item['key']
+    
+    def item_watermark(self, item: Dict[str, Any]) -> Optional[float]:
+        """Listed date, if the listing has one (unix seconds or ISO 8601)"""
+        date = item.get('date')
+        if date is None:
+            return None
+        try:
+            return float(date)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.fromisoformat(str(date).replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+    
+    def fetch_item_content(self, item: Dict[str, Any]) -> Optional[str]:
+        """Raw content of a listed paste"""
+        return self.get_paste_content(item['key'])
+    
+    def result_url(self, item: Dict[str, Any]) -> str:
+        """The service's page for the paste"""
+        return self.config['paste_url'].format(key=quote(item['key'], safe=''))
+    
+    def get_paste_content(self, paste_id: str) -> Optional[str]:
+        """Get the raw content of a paste, extracting it from its page if needed"""
+        try:
+            response = self._make_request(self.config['raw_url'].format(key=quote(paste_id, safe='')))
+            if not response or response.status_code != 200:
+                return None
+            if self.config.get('content_format') != 'html':
+                return response.text
+            
+            page = response.text
+            if self._content_pattern:
+                match = self._content_pattern.search(page)
+                if not match:
+                    return None
+                page = match.group('content')
+            elif self._content_element:
+                match = self._content_element.search(page)
+                if not match:
+                    return None
+                page = element_content(page, match)
+            return html_to_text(page) or None
+        
+        except Exception as e:
+            self.logger.error(f"Failed to get paste content for {paste_id}: {e}")
+            return None
@@ -0,0 +1,209 @@
+import base64
+import binascii
+import re
+import time
+import zlib
+from typing import List, NamedTuple, Optional
+
+# Shorter runs are identifiers, hashes and words more often than payloads
+MIN_BASE64_CHARS = 24
+MIN_HEX_CHARS = 32
+
+# Hard limits per paste, shared by every layer decoded from it
+MAX_CANDIDATES = 64                   # encoded spans looked at
+MAX_ENCODED_CHARS = 4 * 1024 * 1024   # of one span; longer spans are decoded from their start
+MAX_DECODED_BYTES = 4 * 1024 * 1024   # produced in total, decompression included
+MAX_DEPTH = 4                         # decoding steps in a chain, e.g. base64 -> gzip -> base64 -> gzip
+MAX_SECONDS = 0.25                    # wall-clock budget
+
+# Decompression runs in steps of this many output bytes, and text is scanned
+# for candidates in windows of about this many characters, checking the
+# budget in between
+INFLATE_STEP = 256 * 1024
+SCAN_STEP = 64 * 1024
+
+# Share of printable characters decoded bytes need to count as text
+MIN_PRINTABLE = 0.95
+PRINTABLE_SAMPLE = 4096
+
+# Runs of hex digits and of the base64 alphabet (either variant). Base64
+# may be wrapped over lines of WRAPPED_LINE characters or more. The
+# lookbehind skips positions inside a run, so the scan stays linear in
+# word-heavy pastes; a wrapped line is captured by a lookahead and matched
+# by reference, so a long run without line breaks is not backtracked
+# through one character at a time. A hex run of odd length is not hex and
+# is matched again as base64 (see _BASE64).
+WRAPPED_LINE = 60
+_BASE64_RUN = (r'(?:(?=(?P<line>[A-Za-z0-9+/_-]{%d,}))(?P=line)\r?\n)+[A-Za-z0-9+/_-]*={0,2}'
+               r'|[A-Za-z0-9+/_-]{%d,}={0,2}' % (WRAPPED_LINE, MIN_BASE64_CHARS))
+_CANDIDATE = re.compile(
+    r'(?<![A-Za-z0-9+/_=-])(?:'
+    r'(?P<hex>[0-9a-fA-F]{%d,})(?![A-Za-z0-9+/_=-])'
+    r'|(?P<base64>%s)'
+    r')' % (MIN_HEX_CHARS, _BASE64_RUN))
+_BASE64 = re.compile(_BASE64_RUN)
+# Characters no candidate contains; scan windows end at one
+_SEPARATOR = re.compile(r'[^A-Za-z0-9+/_=\r\n-]')
+_NOT_ALPHA = re.compile(r'[0-9+/_-]')
+_WRAPPING = re.compile(r'\s+')
+
+
+class DecodedLayer(NamedTuple):
+    """Text decoded from an encoded span of a paste"""
+    encoding: str  # the decoding steps, outermost first, e.g. 'base64+gzip'
+    start: int     # the encoded span in the paste (for nested layers, the outermost one)
+    end: int
+    text: str
+
+
+class _Budget:
+    __slots__ = ('deadline', 'candidates', 'decoded_bytes')
+    
+    def __init__(self):
+        self.deadline = time.monotonic() + MAX_SECONDS
+        self.candidates = MAX_CANDIDATES
+        self.decoded_bytes = MAX_DECODED_BYTES
+    
+    def timed_out(self) -> bool:
+        return time.monotonic() > self.deadline
+    
+    def exhausted(self) -> bool:
+        return self.candidates <= 0 or self.decoded_bytes <= 0 or self.timed_out()
+
+
+def decode_layers(content: str) -> List[DecodedLayer]:
+    """Text hidden in a paste as base64 or hex, possibly gzip/zlib-compressed.
+    
+    Candidate spans are found with one regex scan, then decoded within the
+    limits above: once the candidates, output bytes or time run out the
+    layers decoded so far are returned. Decoded text is scanned again, so
+    nested encodings are peeled off up to MAX_DEPTH steps. Spans that do
+    not decode to text are ignored.
+    """
+    layers: List[DecodedLayer] = []
+    if content:
+        _scan(content, '', None, 0, _Budget(), layers)
+    return layers
+
+
+def _scan(text: str, chain: str, span: Optional[tuple], depth: int, budget: _Budget,
+          layers: List[DecodedLayer]):
+    """Decode the candidates in `text`, a window at a time while the budget lasts.
+    
+    Windows end at a character no candidate contains, so none is split.
+    """
+    position = 0
+    while position < len(text):
+        if budget.exhausted():
+            return
+        separator = _SEPARATOR.search(text, min(position + SCAN_STEP, len(text)))
+        end = separator.end() if separator else len(text)
+        for match in _CANDIDATE.finditer(text, position, end):
+            if budget.exhausted():
+                return
+            kind = 'hex' if match.group('hex') else 'base64'
+            if kind == 'hex' and len(match.group()) % 2:
+                match = _BASE64.match(text, match.start(), end)
+                kind = 'base64'
+            encoded = match.group()
+            if kind == 'base64' and not _NOT_ALPHA.search(encoded):
+                continue  # a long word, not base64
+            budget.candidates -= 1
+            
+            data = _decode(kind, encoded)
+            if not data:
+                continue
+            outer = span or match.span()
+            _peel(data, f'{chain}+{kind}' if chain else kind, outer, depth + 1, budget, layers)
+        position = end
+
+
+def _peel(data: bytes, chain: str, span: tuple, depth: int, budget: _Budget, layers: List[DecodedLayer]):
+    """Decompress `data` if it is compressed, then keep it if it is text"""
+    if depth < MAX_DEPTH:
+        compression = _compression(data)
+        if compression:
+            data = _inflate(data, compression, budget)
+            if not data:
+                return
+            chain = f'{chain}+{compression}'
+            depth += 1
+    
+    budget.decoded_bytes -= len(data)
+    if budget.timed_out():
+        return
+    text = _as_text(data)
+    if text is None:
+        return
+    layers.append(DecodedLayer(chain, span[0], span[1], text))
+    if depth < MAX_DEPTH:
+        _scan(text, chain, span, depth, budget, layers)
+
+
+def _decode(kind: str, encoded: str) -> Optional[bytes]:
+    if kind == 'hex':
+        encoded = encoded[:MAX_ENCODED_CHARS - MAX_ENCODED_CHARS % 2]
+        return bytes.fromhex(encoded)
+    
+    encoded = _WRAPPING.sub('', encoded).rstrip('=')
+    if ('-' in encoded or '_' in encoded) and ('+' in encoded or '/' in encoded):
+        return None  # mixes both alphabets
+    encoded = encoded[:MAX_ENCODED_CHARS - MAX_ENCODED_CHARS % 4]
+    if len(encoded) % 4 == 1:
+        encoded = encoded[:-1]  # not valid base64 as a whole; decode what is
+    encoded += '=' * (-len(encoded) % 4)
+    try:
+        if '-' in encoded or '_' in encoded:
+            return base64.urlsafe_b64decode(encoded)
+        return base64.b64decode(encoded, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def _compression(data: bytes) -> Optional[str]:
+    if data[:2] == b'\x1f\x8b':
+        return 'gzip'
+    if len(data) >= 2 and data[0] & 0x0f == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+        return 'zlib'
+    return None
+
+
+def _inflate(data: bytes, compression: str, budget: _Budget) -> Optional[bytes]:
+    """Decompress at most the remaining output budget, checking the time between steps.
+    
+    A stream that would inflate past the budget (a decompression bomb) is
+    cut off there; the part inflated so far is still returned.
+    """
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS if compression == 'gzip' else zlib.MAX_WBITS)
+    chunks = []
+    produced = 0
+    pending = data
+    try:
+        while pending and not inflater.eof:
+            room = min(INFLATE_STEP, budget.decoded_bytes - produced)
+            if room <= 0 or budget.timed_out():
+                break
+            chunk = inflater.decompress(pending, room)
+            chunks.append(chunk)
+            produced += len(chunk)
+            pending = inflater.unconsumed_tail
+            if not chunk and pending:
+                break
+    except zlib.error:
+        pass  # corrupt or truncated: keep what inflated cleanly
+    return b''.join(chunks) or None
+
+
+def _as_text(data: bytes) -> Optional[str]:
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A span cut off at a limit may end inside a character
+        if e.start < len(data) - 3:
+            return None
+        text = data[:e.start].decode('utf-8')
+    sample = text[:PRINTABLE_SAMPLE]
+    if not sample.strip():
+        return None
+    printable = sum(1 for char in sample if char.isprintable() or char in '\t\n\r')
+    return text if printable >= MIN_PRINTABLE * len(sample) else None
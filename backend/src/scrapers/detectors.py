@@ -0,0 +1,154 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Pattern, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; entropy is computed per token without it
+    np = None
+
+# Known credential formats: detector name -> (literals every match
+# contains, pattern). A substring check for the literals rules most
+# detectors out at C speed; the remaining ones are compiled into one
+# alternation with a named group each and the paste is scanned once.
+KEY_PATTERNS = {
+    'aws_access_key': (('AKIA', 'ASIA'), r'\b(?:AKIA|ASIA)[0-9A-Z]{16}\b'),
+    'github_token': (('gh', 'github_pat_'), r'\b(?:gh[pousr]_[A-Za-z0-9]{36}|github_pat_[A-Za-z0-9_]{82})\b'),
+    'gitlab_token': (('glpat-',), r'\bglpat-[A-Za-z0-9_-]{20}\b'),
+    'slack_token': (('xox',), r'\bxox[abposr]-[A-Za-z0-9-]{10,72}\b'),
+    'stripe_key': (('_live_',), r'\b(?:sk|rk)_live_[0-9A-Za-z]{24,99}\b'),
+    'google_api_key': (('AIza',), r'\bAIza[0-9A-Za-z_-]{35}\b'),
+    'sendgrid_key': (('SG.',), r'\bSG\.[A-Za-z0-9_-]{22}\.[A-Za-z0-9_-]{43}\b'),
+    'twilio_key': (('SK',), r'\bSK[0-9a-f]{32}\b'),
+    'private_key': (('PRIVATE KEY',),
+                    r'-----BEGIN (?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY(?: BLOCK)?-----'),
+    'jwt': (('eyJ',), r'\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}'),
+}
+
+HIGH_ENTROPY = 'high_entropy_token'
+DETECTOR_NAMES = (*KEY_PATTERNS, HIGH_ENTROPY)
+
+# Whole tokens of base64/base64url/hex characters are entropy candidates
+_CANDIDATE = re.compile(r'(?<![A-Za-z0-9+/=_-])[A-Za-z0-9+/=_-]{20,128}(?![A-Za-z0-9+/=_-])')
+BATCH_TOKENS = 4096  # bounds the histogram array to 4096 x 256 counts
+
+# Bits per character a candidate needs. Short tokens cannot reach the
+# base64 threshold, so it scales down with length (see _threshold).
+BASE64_ENTROPY = 4.5
+HEX_ENTROPY = 3.0
+SHORT_TOKEN_RATIO = 0.85
+
+@lru_cache(maxsize=256)
+def _key_formats(names: FrozenSet[str]) -> Pattern:
+    """One alternation over the given detectors, in KEY_PATTERNS order"""
+    return re.compile('|'.join(f'(?P<{name}>{pattern})'
+                               for name, (_, pattern) in KEY_PATTERNS.items() if name in names))
+
+
+_HEX_CHARS = b'0123456789abcdefABCDEF'
+_DIGITS = b'0123456789'
+_LETTERS = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+if np is not None:
+    def _table(chars: bytes) -> 'np.ndarray':
+        table = np.zeros(256, dtype=bool)
+        table[np.frombuffer(chars, dtype=np.uint8)] = True
+        return table
+    
+    _IS_HEX = _table(_HEX_CHARS)
+    _IS_DIGIT = _table(_DIGITS)
+    _IS_LETTER = _table(_LETTERS)
+
+
+def _threshold(length: int, is_hex: bool) -> float:
+    if is_hex:
+        return HEX_ENTROPY
+    return min(BASE64_ENTROPY, SHORT_TOKEN_RATIO * math.log2(length))
+
+
+def _high_entropy_batch(tokens: List[str]) -> int:
+    """Count high-entropy tokens, computing all their entropies at once.
+    
+    The tokens are concatenated into one byte array. A single bincount over
+    (token, byte) pairs yields every token's character histogram, and the
+    entropies and character-class checks follow as array operations, with
+    logarithms taken only over the characters that occur.
+    """
+    count = len(tokens)
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=count)
+    data = np.frombuffer(''.join(tokens).encode('ascii'), dtype=np.uint8)
+    owners = np.repeat(np.arange(count, dtype=np.int64), lengths)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    
+    histograms = np.bincount(owners * 256 + data, minlength=count * 256)
+    present = np.flatnonzero(histograms)
+    token_of = present // 256
+    probabilities = histograms[present] / lengths[token_of]
+    entropy = np.bincount(token_of, weights=-probabilities * np.log2(probabilities), minlength=count)
+    
+    is_hex = np.logical_and.reduceat(_IS_HEX[data], starts)
+    thresholds = np.where(is_hex, HEX_ENTROPY,
+                          np.minimum(BASE64_ENTROPY, SHORT_TOKEN_RATIO * np.log2(lengths)))
+    # Secrets mix letters and digits; identifiers and prose-like tokens rarely do
+    mixed = np.logical_or.reduceat(_IS_DIGIT[data], starts) & np.logical_or.reduceat(_IS_LETTER[data], starts)
+    return int(np.count_nonzero((entropy >= thresholds) & mixed))
+
+
+def _high_entropy_python(tokens: List[str]) -> int:
+    found = 0
+    for token in tokens:
+        if not (any(c.isdigit() for c in token) and any(c.isalpha() for c in token)):
+            continue
+        length = len(token)
+        entropy = -sum(n / length * math.log2(n / length) for n in Counter(token).values())
+        is_hex = all(c in '0123456789abcdefABCDEF' for c in token)
+        if entropy >= _threshold(length, is_hex):
+            found += 1
+    return found
+
+
+def count_high_entropy(tokens: List[str]) -> int:
+    """Number of tokens whose Shannon entropy marks them as likely secrets"""
+    if np is None:
+        return _high_entropy_python(tokens)
+    return sum(_high_entropy_batch(tokens[i:i + BATCH_TOKENS])
+               for i in range(0, len(tokens), BATCH_TOKENS))
+
+
+def _unclaimed_tokens(content: str, claimed: List[Tuple[int, int]]) -> List[str]:
+    """Entropy candidates that do not overlap a span in `claimed` (sorted, disjoint)"""
+    tokens = []
+    index = 0
+    for match in _CANDIDATE.finditer(content):
+        start, end = match.span()
+        while index < len(claimed) and claimed[index][1] <= start:
+            index += 1
+        if index < len(claimed) and claimed[index][0] < end:
+            continue
+        tokens.append(match.group())
+    return tokens
+
+
+def detect_secrets(content: str) -> Dict[str, int]:
+    """Credentials found in a paste, as {detector name: number of hits}.
+    
+    A token matched by a key format is not scored for entropy as well, so
+    each secret counts towards one detector only.
+    """
+    found: Dict[str, int] = {}
+    claimed: List[Tuple[int, int]] = []
+    candidates = frozenset(name for name, (literals, _) in KEY_PATTERNS.items()
+                           if any(literal in content for literal in literals))
+    if candidates:
+        for match in _key_formats(candidates).finditer(content):
+            found[match.lastgroup] = found.get(match.lastgroup, 0) + 1
+            claimed.append(match.span())
+    
+    tokens = _unclaimed_tokens(content, claimed) if claimed else _CANDIDATE.findall(content)
+    if tokens:
+        high_entropy = count_high_entropy(tokens)
+        if high_entropy:
+            found[HIGH_ENTROPY] = high_entropy
+    return found
@@ -0,0 +1,240 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+FILE_TYPES = ('txt', 'json', 'py', 'js', 'php', 'sql', 'xml', 'html', 'css', 'java', 'cpp', 'c', 'sh')
+
+# Only the start and the end of a paste are looked at, so classifying a
+# 10 MB dump costs the same as a short snippet
+HEAD_CHARS = 4096
+TAIL_CHARS = 1024
+
+# A type needs at least this much signature weight to beat plain text
+MIN_SCORE = 4
+
+MAX_CACHED_DECISIONS = 8192
+
+# Service hints, tried before the content: file name extensions (gists) ...
+EXTENSIONS = {
+    'txt': 'txt', 'text': 'txt', 'log': 'txt',
+    'json': 'json',
+    'py': 'py', 'pyw': 'py',
+    'js': 'js', 'mjs': 'js', 'cjs': 'js', 'jsx': 'js',
+    'php': 'php',
+    'sql': 'sql',
+    'xml': 'xml', 'xsd': 'xml', 'svg': 'xml',
+    'html': 'html', 'htm': 'html',
+    'css': 'css',
+    'java': 'java',
+    'cpp': 'cpp', 'cc': 'cpp', 'cxx': 'cpp', 'hpp': 'cpp',
+    'c': 'c', 'h': 'c',
+    'sh': 'sh', 'bash': 'sh', 'zsh': 'sh',
+}
+
+# ... and syntax or language names (Pastebin's `syntax`, a gist file's
+# `language`). Pastebin's default "text" says nothing and is not listed.
+SYNTAX_HINTS = {
+    'json': 'json',
+    'python': 'py',
+    'javascript': 'js',
+    'php': 'php',
+    'sql': 'sql', 'mysql': 'sql', 'postgresql': 'sql', 'plsql': 'sql', 'tsql': 'sql',
+    'xml': 'xml',
+    'html': 'html', 'html4strict': 'html', 'html5': 'html',
+    'css': 'css',
+    'java': 'java', 'java5': 'java',
+    'cpp': 'cpp', 'c++': 'cpp', 'cpp-qt': 'cpp',
+    'c': 'c',
+    'bash': 'sh', 'shell': 'sh',
+}
+
+# (file type, weight, where, literals, pattern). `head` patterns must match
+# at the start of the paste (after leading whitespace), `tail` ones at its
+# end, `body` ones anywhere in the window. A pattern only runs if one of its
+# literals occurs in the lower-cased window, which rules most of them out
+# at C speed. Case-insensitive `body` patterns are searched in that
+# lower-cased copy instead, which the regex engine scans faster than it
+# applies (?i). A leading \b would stop the engine from skipping ahead to
+# the pattern's possible first characters, so it is checked on each match
+# instead (see `_search`). Each signature counts once; the type with the
+# most weight wins, earlier types winning ties. Scoring stops early once
+# no other type can catch up with the leader.
+SIGNATURES = [
+    ('php', 10, 'head', ('<?php',), r'<\?php\b'),
+    ('html', 10, 'head', ('<!doctype', '<html'), r'(?i)<!doctype\s+html|<html[\s>]'),
+    ('xml', 10, 'head', ('<?xml',), r'<\?xml\s'),
+    ('sh', 10, 'head', ('#!',), r'#!\s*/(?:usr/)?bin/(?:env\s+)?(?:ba|z|k|da)?sh\b'),
+    ('py', 10, 'head', ('#!',), r'#!\s*/(?:usr/)?bin/(?:env\s+)?python'),
+    ('js', 10, 'head', ('#!',), r'#!\s*/(?:usr/)?bin/(?:env\s+)?node\b'),
+    ('json', 3, 'head', ('{', '['), r'[\[{]\s*(?:"|[\]}]|-?\d|true\b|false\b|null\b|[\[{])'),
+    ('json', 2, 'tail', ('}', ']'), r'[\]}]\s*\Z'),
+    ('json', 3, 'body', ('"',), r'"[^"\n]{1,200}"\s*:\s*(?:"|-?\d|\[|\{|true\b|false\b|null\b)'),
+    ('html', 4, 'body', ('<',), r'(?i)<(?:head|body|div|span|script|table|meta|link|p)[\s>]'),
+    ('html', 2, 'body', ('</',), r'(?i)</(?:div|p|a|span|body|html)>'),
+    ('xml', 2, 'head', ('<',), r'<[A-Za-z_][\w:.-]*[\s>/]'),
+    ('xml', 2, 'tail', ('>',), r'>\s*\Z'),
+    ('php', 3, 'body', ('$',), r'\$\w+\s*(?:=|->)'),
+    ('php', 2, 'body', ('$',), r'\b(?:echo|function|require_once|foreach)\b.*\$\w+'),
+    ('py', 4, 'body', ('def ',), r'(?m)^[ \t]*def \w+\s*\(.*\)\s*(?:->.*)?:[ \t]*$'),
+    ('py', 3, 'body', ('import ',), r'(?m)^(?:from [\w.]+ )?import \w[\w.]*(?: as \w+)?(?:, *\w+)*[ \t]*$'),
+    ('py', 2, 'body', ('class ', '__name__', 'elif ', 'print('),
+     r'(?m)^[ \t]*(?:class \w+(?:\(.*\))?:|if __name__ == |elif |print\()'),
+    ('py', 1, 'body', ('self.',), r'\bself\.\w'),
+    ('java', 5, 'body', ('public',), r'\bpublic\s+(?:static\s+)?(?:final\s+)?(?:class|interface|enum|void)\b'),
+    ('java', 3, 'body', ('import java',), r'(?m)^import java(?:x)?\.'),
+    ('java', 2, 'body', ('system.', 'string[]'), r'System\.(?:out|err)\.print|\bString\[\]'),
+    ('cpp', 4, 'body', ('#include',), r'(?m)^#include\s*<(?:iostream|vector|string|map|memory|algorithm)>'),
+    ('cpp', 4, 'body', ('template',), r'\btemplate\s*<\s*(?:typename|class)\b'),
+    ('cpp', 3, 'body', ('std::',), r'\bstd::'),
+    ('cpp', 2, 'body', ('cout', 'cin', 'namespace'), r'\b(?:cout|cin)\s*(?:<<|>>)|\bnamespace\s+\w'),
+    ('c', 4, 'body', ('#include',), r'(?m)^#include\s*<\w+\.h>'),
+    ('c', 2, 'body', ('printf', 'malloc', 'free', 'sizeof'), r'\b(?:printf|malloc|free|sizeof)\s*\('),
+    ('c', 2, 'body', ('main',), r'\bint\s+main\s*\('),
+    ('js', 3, 'body', ('function',), r'\bfunction\s*\w*\s*\([^)]*\)\s*\{'),
+    ('js', 3, 'body', ('const', 'let', 'var'), r'\b(?:const|let|var)\s+[\w$]+\s*='),
+    ('js', 2, 'body', ('=>', 'console.', 'document.', 'window.', 'require(', 'module.exports'),
+     r'=>\s*[{(\w]|\b(?:console\.log|document\.|window\.|require\(|module\.exports)'),
+    ('sql', 5, 'body', ('select', 'insert', 'create', 'update', 'delete', 'alter', 'drop'),
+     r'(?i)\b(?:select\s+(?:distinct\s+)?[\w*.,\s()]+?\s+from|insert\s+into|create\s+table'
+     r'|update\s+\w+\s+set|delete\s+from|alter\s+table|drop\s+table)\b'),
+    ('sql', 2, 'body', ('where', 'values', 'primary', 'varchar', 'join', 'group'),
+     r'(?i)\b(?:where|values|primary\s+key|varchar|inner\s+join|group\s+by)\b'),
+    ('css', 5, 'body', ('{',), r'(?m)^[ \t]*[\w.#:*\[\]="\'>+~-][\w.#:*\[\]="\'>+~, \t-]*\{\s*[\w-]+\s*:\s*[^;{}]+;'),
+    ('css', 2, 'body', ('@media', '@import', '@font-face', '!important'), r'@media\b|@import\b|@font-face\b|!important\b'),
+    ('sh', 3, 'body', ('echo', 'export', 'sudo', 'apt', 'yum', 'cd ', 'chmod', 'chown', 'curl', 'wget', 'mkdir'),
+     r'(?m)^[ \t]*(?:echo|export|sudo|apt-get|apt|yum|cd|chmod|chown|curl|wget|mkdir)\s'),
+    ('sh', 2, 'body', ('fi', 'done', 'esac', 'then', '${'), r'(?m)\n[ \t]*(?:fi|done|esac)[ \t]*$|then(?<=\Wthen)$|\$\{\w+\}'),
+]
+
+_WORD = re.compile(r'\w')
+
+
+def _compile(file_type: str, weight: int, where: str, literals: tuple, pattern: str):
+    if where == 'body' and pattern.startswith('(?i)'):
+        where, pattern = 'lower', pattern[len('(?i)'):]
+    bounded = where != 'head' and pattern.startswith(r'\b')
+    if bounded:
+        pattern = pattern[len(r'\b'):]
+    return file_type, weight, where, literals, re.compile(pattern), bounded
+
+
+_COMPILED = [_compile(*signature) for signature in SIGNATURES]
+_PRIORITY = {file_type: rank for rank, file_type in enumerate(dict.fromkeys(s[0] for s in SIGNATURES))}
+
+
+def _remaining_weights():
+    """For each signature, the weight each type can still gain from it onwards
+    (types with nothing left are omitted)"""
+    remaining, totals = [], dict.fromkeys(_PRIORITY, 0)
+    for file_type, weight, *_ in reversed(SIGNATURES):
+        totals[file_type] += weight
+        remaining.append(tuple((t, left) for t, left in totals.items() if left))
+    return remaining[::-1]
+
+
+_REMAINING = _remaining_weights()
+
+_decisions: 'OrderedDict[bytes, str]' = OrderedDict()
+_decisions_lock = threading.Lock()
+
+
+def type_from_hints(syntax: Optional[str] = None, filename: Optional[str] = None) -> Optional[str]:
+    """File type named by a file name extension or a syntax/language hint, if any"""
+    if filename and '.' in filename:
+        file_type = EXTENSIONS.get(filename.rsplit('.', 1)[1].lower())
+        if file_type:
+            return file_type
+    if syntax:
+        return SYNTAX_HINTS.get(syntax.strip().lower())
+    return None
+
+
+def _search(pattern: re.Pattern, text: str, bounded: bool) -> bool:
+    """Whether `pattern` occurs in `text`, at a word boundary if `bounded`"""
+    found = pattern.search(text)
+    while bounded and found and found.start() and _WORD.match(text, found.start() - 1):
+        found = pattern.search(text, found.start() + 1)
+    return found is not None
+
+
+def _decided(scores: dict, best: str, remaining: tuple) -> bool:
+    """Whether `best` wins however the remaining signatures score"""
+    top = scores[best]
+    for file_type, left in remaining:
+        if file_type == best:
+            continue
+        reachable = scores.get(file_type, 0) + left
+        if reachable > top or (reachable == top and _PRIORITY[file_type] < _PRIORITY[best]):
+            return False
+    return True
+
+
+def _classify_window(head: str, tail: str) -> str:
+    window = f'{head}\n{tail}' if tail else head
+    lowered = window.lower()
+    end = tail or head
+    start = head.lstrip()
+    scores = {}
+    best = None  # the leader once it has MIN_SCORE
+    for index, (file_type, weight, where, literals, pattern, bounded) in enumerate(_COMPILED):
+        if best and _decided(scores, best, _REMAINING[index]):
+            break
+        if not any(literal in lowered for literal in literals):
+            continue
+        if where == 'head':
+            found = pattern.match(start) is not None
+        elif where == 'tail':
+            found = _search(pattern, end, bounded)
+        elif where == 'lower':
+            found = _search(pattern, lowered, bounded)
+        else:
+            found = _search(pattern, window, bounded)
+        if found:
+            scores[file_type] = scores.get(file_type, 0) + weight
+            leader = min(scores, key=lambda file_type: (-scores[file_type], _PRIORITY[file_type]))
+            best = leader if scores[leader] >= MIN_SCORE else None
+    return best or 'txt'
+
+
+def classify(content: str, syntax: Optional[str] = None, filename: Optional[str] = None) -> str:
+    """File type of a paste, one of FILE_TYPES.
+    
+    Service hints decide if they name a known type. Otherwise the paste is
+    scored against the signature table over its first HEAD_CHARS and last
+    TAIL_CHARS characters. Decisions are cached by a hash of that window,
+    so reposts and pastes shared by several sessions are classified once.
+    """
+    file_type = type_from_hints(syntax, filename)
+    if file_type:
+        return file_type
+    if not content:
+        return 'txt'
+    
+    head = content[:HEAD_CHARS]
+    tail = content[-TAIL_CHARS:] if len(content) > HEAD_CHARS else ''
+    key = hashlib.blake2b(f'{head}\0{tail}'.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    with _decisions_lock:
+        file_type = _decisions.get(key)
+        if file_type is not None:
+            _decisions.move_to_end(key)
+            return file_type
+    
+    file_type = _classify_window(head, tail)
+    with _decisions_lock:
+        _decisions[key] = file_type
+        if len(_decisions) > MAX_CACHED_DECISIONS:
+            _decisions.popitem(last=False)
+    return file_type
+
+
+def matches_file_types(file_type: str, file_types: Iterable[str]) -> bool:
+    """Whether a classified paste passes a session's file type filter (empty accepts all)"""
+    wanted = [wanted.lower().lstrip('.') for wanted in file_types]
+    return not wanted or file_type in wanted
+
+
+def clear_cache():
+    with _decisions_lock:
+        _decisions.clear()
@@ -15,69 +15,56 @@ class GistScraper(BaseScraper):
         )
         self.api_base = 'https://api.github.com/gists'
     
-    def search(self, search_terms: List[str], file_types: List[str] = None, 
-               max_results: int = 100, **kwargs) -> List[Dict[str, Any]]:
-        """Search GitHub Gists using the API"""
-        results = []
-        
+    def listing_limit(self, max_results: int) -> int:
+        """Gists are listed three times over since most files will not match"""
+        return min(max_results * 3, 300)
+    
+    def list_items(self, limit: int) -> List[Dict[str, Any]]:
+        """Files of recent public gists, one item per file"""
+        # GitHub Gist API doesn't have search, so we get recent public gists
+        # and filter them locally
+        items = []
+        for gist_info in self._get_recent_gists(limit=limit):
+            for filename, file_info in gist_info.get('files', {}).items():
+                items.append({'gist': gist_info, 'filename': filename, 'file': file_info})
+        return items
+    
+    def item_key(self, item: Dict[str, Any]) -> str:
+        """Gist id and filename, as used for paste_id"""
+        return f"{item['gist']['id']}#{item['filename']}"
+    
+    def item_watermark(self, item: Dict[str, Any]) -> Optional[float]:
+        """Last update of the gist; edited gists are scanned again"""
+        updated_at = item['gist'].get('updated_at')
+        if not updated_at:
+            return None
         try:
-            # GitHub Gist API doesn't have search, so we get recent public gists
-            # and filter them locally
-            gists = self._get_recent_gists(limit=min(max_results * 3, 300))
-            
-            for gist_info in gists:
-                if len(results) >= max_results:
-                    break
-                
-                # Process each file in the gist
-                for filename, file_info in gist_info.get('files', {}).items():
-                    if len(results) >= max_results:
-                        break
-                    
-                    content = file_info.get('content', '')
-                    if not content:
-                        # Try to fetch content if truncated
-                        content = self._get_file_content(file_info.get('raw_url', ''))
-                        if not content:
-                            continue
-                    
-                    # Check if content matches search terms
-                    matched_terms = self._contains_search_terms(
-                        content, search_terms, kwargs.get('regex_mode', False)
-                    )
-                    
-                    if not matched_terms:
-                        continue
-                    
-                    # Check file type filter
-                    file_type = self._detect_file_type_from_filename(filename)
-                    if not self._matches_file_type(content, filename, file_types):
-                        continue
-                    
-                    # Calculate relevance score
-                    relevance_score = self._calculate_relevance_score(content, search_terms)
-                    
-                    result = {
-                        'paste_id': f"{gist_info['id']}#{filename}",
-                        'url': gist_info['html_url'],
-                        'title': gist_info.get('description') or filename,
-                        'content_preview': content[:500] + '...' if len(content) > 500 else content,
-                        'full_content': content,
-                        'file_type': file_type,
-                        'matched_terms': matched_terms,
-                        'service': self.name,
-                        'relevance_score': relevance_score,
-                        'file_size': len(content.encode('utf-8')),
-                        'created_at': gist_info.get('created_at')
-                    }
-                    
-                    results.append(result)
-                    self.logger.info(f"Found match in gist {gist_info['id']}/{filename}: {len(matched_terms)} terms")
-        
-        except Exception as e:
-            self.logger.error(f"Search failed: {e}")
-        
-        return results
+            return datetime.fromisoformat(updated_at.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+    
+    def fetch_item_content(self, item: Dict[str, Any]) -> Optional[str]:
+        """Inline file content, or the raw file if the API truncated it"""
+        content = item['file'].get('content', '')
+        if not content:
+            content = self._get_file_content(item['file'].get('raw_url', ''))
+        return content or None
+    
+    def result_url(self, item: Dict[str, Any]) -> str:
+        """Page of the gist the file belongs to"""
+        return item['gist']['html_url']
+    
+    def result_title(self, item: Dict[str, Any]) -> str:
+        """Gist description, or the file name if there is none"""
+        return item['gist'].get('description') or item['filename']
+    
+    def file_type_hints(self, item: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """GitHub's language for the file and its name"""
+        return {'syntax': item['file'].get('language'), 'filename': item['filename']}
+    
+    def result_created_at(self, item: Dict[str, Any]) -> Optional[str]:
+        """Creation time of the gist (ISO 8601)"""
+        return item['gist'].get('created_at')
     
     def _get_recent_gists(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get recent public gists from GitHub API"""
@@ -158,11 +145,3 @@ class GistScraper(BaseScraper):
         except Exception as e:
             self.logger.error(f"Failed to get gist content for {paste_id}: {e}")
             return None
-    
-    def _detect_file_type_from_filename(self, filename: str) -> str:
-        """Detect file type from filename extension"""
-        if '.' in filename:
-            extension = filename.split('.')[-1].lower()
-            return extension
-        return 'txt'
-
@@ -0,0 +1,185 @@
+import html
+import re
+from typing import List
+
+# Elements whose content is never page text; dropped with everything inside
+SKIPPED_TAGS = ('script', 'style', 'noscript', 'template')
+
+# Elements that start a new line of text where they open or close
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+    'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main',
+    'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'td', 'textarea', 'th', 'thead', 'title',
+    'tr', 'ul',
+})
+
+# Elements whose whitespace is kept as written: the raw paste on most sites
+PRESERVED_TAGS = frozenset({'pre', 'textarea'})
+
+# Comments and skipped elements; unterminated ones run to the end of the
+# input. Tag bodies stop at the next '<', so stray '<' characters in
+# malformed markup are read as text in linear time.
+_DROPPED = re.compile(
+    r'<(?:!--.*?(?P<comment_end>-->|\Z)'
+    r'|(?P<skip>' + '|'.join(SKIPPED_TAGS) + r')\b[^<>]*>.*?(?P<skip_end></(?P=skip)\s*>|\Z))',
+    re.S | re.I)
+_PRESERVED_TAG = re.compile(r'<(/?)(?:' + '|'.join(sorted(PRESERVED_TAGS)) + r')\b[^<>]*>', re.I)
+_BR_TAG = re.compile(r'<br\b[^<>]*>', re.I)
+_BLOCK_TAG = re.compile(r'</?(?:' + '|'.join(sorted(BLOCK_TAGS - PRESERVED_TAGS)) + r')\b[^<>]*>', re.I)
+_OTHER_TAG = re.compile(r'</?[a-zA-Z][^<>]*>|<[!?][^<>]*>')
+
+# Line break markers left in the text until it is normalised: a block
+# boundary and a <br>. A run of markers makes one line break, or two if it
+# holds two <br> or more.
+_BLOCK_MARK = '\0'
+_BR_MARK = '\1'
+_MARKS = str.maketrans('', '', _BLOCK_MARK + _BR_MARK)
+_MARK_RUN = re.compile(r'[\x00\x01]{2,}')
+
+_TAG_NAME = re.compile(r'<([a-zA-Z][\w:-]*)')
+
+# Any entity other than the ones html.escape produces
+_OTHER_ENTITY = re.compile(r'&(?!(?:amp|lt|gt|quot|#39|#x27);)')
+
+# Longest entity reference that may be split between two chunks
+MAX_ENTITY = 32
+
+
+def unescape(text: str) -> str:
+    """html.unescape, with the entities HTML escaping produces replaced at C speed.
+    
+    Escaped paste content is full of &lt; &gt; &amp; &quot; and &#39;, and
+    html.unescape calls back into Python for every one of them.
+    """
+    if _OTHER_ENTITY.search(text):
+        return html.unescape(text)
+    return (text.replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"')
+            .replace('&#39;', "'").replace('&#x27;', "'").replace('&amp;', '&'))
+
+
+class HtmlTextExtractor:
+    """Incremental HTML to text conversion in a single pass over the markup.
+    
+    Script, style and comment content is dropped, entities are decoded and
+    block elements become line breaks. Whitespace is collapsed except inside
+    <pre> and <textarea>. Markup can be fed in chunks as it is downloaded;
+    an incomplete tag, comment, script or entity at the end of a chunk is
+    held back until the next one completes it. Text between tags is cleaned
+    up a stretch at a time (up to the next <pre>/<textarea> boundary) rather
+    than piece by piece, so most of the work runs in C.
+    """
+    
+    def __init__(self):
+        self._buffer = ''
+        self._stretch: List[str] = []  # raw text and markers since the last boundary
+        self._preserve = 0             # depth of open <pre>/<textarea> elements
+        self._out: List[str] = []
+    
+    def feed(self, chunk: str):
+        self._buffer += _clean(chunk)
+        self._consume(final=False)
+    
+    def close(self) -> str:
+        """Convert what is left and return the text of the whole document"""
+        self._consume(final=True)
+        self._end_stretch()
+        return ''.join(self._out).strip()
+    
+    def _safe_end(self) -> int:
+        """Where the complete part of a partially received buffer ends"""
+        buffer = self._buffer
+        tag_start = buffer.rfind('<')
+        tag_end = buffer.rfind('>')
+        if tag_start > tag_end:
+            return tag_start
+        entity = buffer.rfind('&', max(len(buffer) - MAX_ENTITY, tag_end + 1))
+        if entity != -1 and ';' not in buffer[entity:]:
+            return entity
+        return len(buffer)
+    
+    def _consume(self, final: bool):
+        buffer = self._buffer
+        end = len(buffer) if final else self._safe_end()
+        kept = []
+        pos = 0
+        for match in _DROPPED.finditer(buffer, 0, end):
+            if not final and (match.group('comment_end') == '' or match.group('skip_end') == ''):
+                end = match.start()  # the closing part has not arrived yet
+                break
+            kept.append(buffer[pos:match.start()])
+            pos = match.end()
+        kept.append(buffer[pos:end])
+        self._buffer = buffer[end:]
+        
+        text = ''.join(kept)
+        if '<' not in text:
+            self._stretch.append(text)
+            return
+        parts = _PRESERVED_TAG.split(text)
+        for i in range(0, len(parts), 2):
+            if i:
+                # A <pre>/<textarea> boundary ends the stretch (parts[i - 1] is '/' on closing tags)
+                self._stretch.append(_BLOCK_MARK)
+                self._end_stretch()
+                self._preserve = max(self._preserve - 1, 0) if parts[i - 1] else self._preserve + 1
+            part = parts[i]
+            if '<' in part:
+                part = _OTHER_TAG.sub('', _BLOCK_TAG.sub(_BLOCK_MARK, _BR_TAG.sub(_BR_MARK, part)))
+            self._stretch.append(part)
+    
+    def _end_stretch(self):
+        text = ''.join(self._stretch)
+        self._stretch = []
+        if '&' in text:
+            text = unescape(text)
+        if self._preserve:
+            text = text.replace(_BLOCK_MARK, '\n').replace(_BR_MARK, '\n')
+        else:
+            text = ' '.join(text.split())  # the markers are not whitespace
+            for mark in (_BLOCK_MARK, _BR_MARK):
+                text = text.replace(' ' + mark, mark).replace(mark + ' ', mark)
+            text = _MARK_RUN.sub(_line_breaks, text)
+            text = text.replace(_BLOCK_MARK, '\n').replace(_BR_MARK, '\n')
+        if text:
+            self._out.append(text)
+
+
+def _line_breaks(run: re.Match) -> str:
+    return '\n\n' if run.group().count(_BR_MARK) > 1 else '\n'
+
+
+def _clean(markup: str) -> str:
+    """Drop the control characters used as line break markers"""
+    if _BLOCK_MARK in markup or _BR_MARK in markup:
+        return markup.translate(_MARKS)
+    return markup
+
+
+def element_content(markup: str, opening: re.Match) -> str:
+    """Markup inside the element whose opening tag `opening` matched.
+    
+    The content runs to the element's own closing tag: nested elements of
+    the same name are counted (those in comments, scripts and styles aside),
+    so an inner </div> doesn't end an outer <div>. An element that is never
+    closed runs to the end of the markup.
+    """
+    name = _TAG_NAME.match(opening.group()).group(1)
+    tags = re.compile(_DROPPED.pattern + r'|<(?P<close>/?)' + re.escape(name) + r'\b[^<>]*>', re.S | re.I)
+    depth = 1
+    for match in tags.finditer(markup, opening.end()):
+        if match.group('close') is None:
+            continue  # a comment or skipped element
+        if match.group('close'):
+            depth -= 1
+            if not depth:
+                return markup[opening.end():match.start()]
+        elif not match.group().endswith('/>'):
+            depth += 1
+    return markup[opening.end():]
+
+
+def html_to_text(markup: str) -> str:
+    """Text of an HTML document or fragment (see HtmlTextExtractor)"""
+    extractor = HtmlTextExtractor()
+    extractor._buffer = _clean(markup)
+    return extractor.close()
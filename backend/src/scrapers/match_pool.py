@@ -0,0 +1,176 @@
+import importlib
+import logging
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+from .base_scraper import BaseScraper
+from .matcher import CompiledMatcher, PasteDocument
+
+logger = logging.getLogger(__name__)
+
+# Pastes at least this large reach the workers through a shared memory
+# segment instead of being pickled into the task
+SHARED_MEMORY_BYTES = 1024 * 1024
+
+# Worker-side caches: scrapers rebuilt from their spec and compiled matchers
+MAX_CACHED_MATCHERS = 256
+_scrapers: Dict[tuple, BaseScraper] = {}
+_matchers: Dict[tuple, CompiledMatcher] = {}
+
+
+def _warm_up() -> bool:
+    return True
+
+
+def _scraper(spec: tuple) -> BaseScraper:
+    scraper = _scrapers.get(spec)
+    if scraper is None:
+        module, qualname, args = spec
+        scraper_class = getattr(importlib.import_module(module), qualname)
+        scraper = _scrapers[spec] = scraper_class(*args)
+    return scraper
+
+
+def _matcher(spec: tuple) -> CompiledMatcher:
+    matcher = _matchers.get(spec)
+    if matcher is None:
+        if len(_matchers) >= MAX_CACHED_MATCHERS:
+            _matchers.clear()
+        matcher = _matchers[spec] = CompiledMatcher.from_spec(spec)
+    return matcher
+
+
+def _load_content(ref: tuple) -> str:
+    kind, payload, size = ref
+    if kind == 'bytes':
+        return payload.decode('utf-8')
+    segment = shared_memory.SharedMemory(name=payload)
+    try:
+        return bytes(segment.buf[:size]).decode('utf-8')
+    finally:
+        segment.close()
+
+
+def _evaluate(scraper_spec: tuple, item: Dict[str, Any], content_ref: tuple,
+              matcher_specs: List[tuple]) -> Tuple[List[Optional[Dict[str, Any]]], tuple]:
+    """Worker entry point: evaluate one paste for several matchers.
+    
+    Results come back without `full_content`, which the parent already
+    holds; `MatchPool.results` puts it back. What was found out about the
+    terms on the way comes back too, so the parent need not look again.
+    """
+    scraper = _scraper(scraper_spec)
+    document = PasteDocument(_load_content(content_ref))
+    results = []
+    for spec in matcher_specs:
+        result = scraper.evaluate(item, document, _matcher(spec))
+        if result is not None and 'full_content' in result:
+            result = {**result, 'full_content': None}
+        results.append(result)
+    return results, document.known_terms()
+
+
+@contextmanager
+def _main_script_hidden():
+    """Keep spawned workers from re-running the entry script (e.g. main.py).
+    
+    Spawn imports the parent's `__main__` by path in every child, which for
+    the API would create the app and start its background threads again.
+    The workers only need this module.
+    """
+    main = sys.modules.get('__main__')
+    path = getattr(main, '__file__', None)
+    if path is None or getattr(main, '__spec__', None) is not None:
+        yield
+        return
+    del main.__file__
+    try:
+        yield
+    finally:
+        main.__file__ = path
+
+
+class MatchPool:
+    """Runs `BaseScraper.evaluate` in worker processes.
+    
+    Matching, relevance scoring and type detection are pure CPU work and in
+    the feed's pump thread they share one GIL with the network I/O. With a
+    pool, each fetched paste becomes one task that evaluates it for every
+    waiting session's matcher, while the pump goes on fetching. Workers keep
+    the compiled matchers and the scrapers they need, rebuilt from
+    picklable specs, so a task carries only the item, the content (as bytes,
+    or the name of a shared memory segment for large pastes) and the
+    matcher specs; the hit records returned omit the content.
+    
+    Processes are started on first use.
+    """
+    
+    def __init__(self, processes: int, max_pending: Optional[int] = None,
+                 shared_memory_bytes: int = SHARED_MEMORY_BYTES):
+        self.processes = processes
+        self.max_pending = max_pending or processes * 4
+        self.shared_memory_bytes = shared_memory_bytes
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _started(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                executor = ProcessPoolExecutor(max_workers=self.processes,
+                                               mp_context=multiprocessing.get_context('spawn'))
+                # Non-fork pools launch every process on the first submit
+                with _main_script_hidden():
+                    executor.submit(_warm_up).result()
+                self._executor = executor
+                logger.info(f"Match pool started with {self.processes} processes")
+            return self._executor
+    
+    def submit(self, scraper: BaseScraper, item: Dict[str, Any], document: PasteDocument,
+               matchers: List[CompiledMatcher]) -> Future:
+        """Evaluate a paste for each matcher; the future yields one result (or None) per matcher"""
+        executor = self._started()
+        data = document.content.encode('utf-8')
+        segment = None
+        if len(data) >= self.shared_memory_bytes:
+            segment = shared_memory.SharedMemory(create=True, size=len(data))
+            segment.buf[:len(data)] = data
+            content_ref = ('shm', segment.name, len(data))
+        else:
+            content_ref = ('bytes', data, len(data))
+        
+        try:
+            future = executor.submit(_evaluate, scraper.evaluator_spec(), item, content_ref,
+                                     [matcher.spec() for matcher in matchers])
+        except Exception:
+            if segment is not None:
+                _release(segment)
+            raise
+        if segment is not None:
+            future.add_done_callback(lambda _: _release(segment))
+        return future
+    
+    @staticmethod
+    def results(future: Future, document: PasteDocument) -> List[Optional[Dict[str, Any]]]:
+        """Results of a finished `submit`, with the content restored"""
+        results, terms = future.result()
+        document.remember_terms(*terms)
+        for result in results:
+            if result is not None and 'full_content' in result:
+                result['full_content'] = document.content
+        return results
+    
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _release(segment: shared_memory.SharedMemory):
+    segment.close()
+    segment.unlink()
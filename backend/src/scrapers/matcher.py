@@ -0,0 +1,297 @@
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.simhash import simhash
+from .decoding import DecodedLayer, decode_layers
+from .detectors import detect_secrets
+from .query import MAX_SPANS, Query, TermProbe, match_probability
+from .relevance import Bm25Scorer
+
+_WORD = re.compile(r'\S+')
+
+
+class PasteDocument:
+    """A fetched paste shared by every matcher that looks at it.
+    
+    Derived forms of the content (the lower-cased copy, what is known about
+    each term, word boundaries, the SimHash fingerprint and the secret
+    detector hits) are computed once and reused, however many sessions
+    match against it. Terms are keyed as in `TermProbe`. Payloads decoded
+    from the content (`layers`) are documents of their own.
+    """
+    
+    __slots__ = ('content', '_lower', '_simhash', '_secrets', '_present', '_counts', '_offsets', '_spans',
+                 '_words', '_layers')
+    
+    def __init__(self, content: str):
+        self.content = content
+        self._lower = None
+        self._simhash = None
+        self._secrets = None
+        self._present = {}  # key -> whether the term occurs
+        self._counts = {}   # key -> occurrences
+        self._offsets = {}  # key -> (start, end) of the occurrences
+        self._spans = {}    # key -> (start, end) of the first few occurrences
+        self._words = None
+        self._layers = None
+    
+    @property
+    def lower(self) -> str:
+        """Lower-cased content, computed on first use"""
+        if self._lower is None:
+            self._lower = self.content.lower()
+        return self._lower
+    
+    def contains(self, key: tuple, search) -> bool:
+        """Whether a term occurs, found by `search(self)` the first time `key` is asked for"""
+        present = self._present.get(key)
+        if present is None:
+            present = self._present[key] = bool(search(self))
+            if not present:
+                self._counts[key] = 0
+                self._offsets[key] = []
+        return present
+    
+    def count(self, key: tuple, compute) -> int:
+        """Occurrences of a term, computed by `compute(self)` the first time `key` is asked for"""
+        count = self._counts.get(key)
+        if count is None:
+            count = self._counts[key] = compute(self)
+            self._present[key] = count > 0
+        return count
+    
+    def offsets(self, key: tuple, compute) -> List[Tuple[int, int]]:
+        """(start, end) of a term's occurrences, computed by `compute(self)` on first use"""
+        offsets = self._offsets.get(key)
+        if offsets is None:
+            offsets = self._offsets[key] = compute(self)
+            self._counts[key] = len(offsets)
+            self._present[key] = bool(offsets)
+        return offsets
+    
+    def spans(self, key: tuple, compute) -> List[Tuple[int, int]]:
+        """Where a term's first occurrences are, computed by `compute(self)` on first use"""
+        spans = self._spans.get(key)
+        if spans is None:
+            spans = self._spans[key] = compute(self) if self._present.get(key) is not False else []
+        return spans
+    
+    def checked(self, key: tuple) -> Optional[bool]:
+        """Whether a term occurs, if anyone has looked yet"""
+        return self._present.get(key)
+    
+    def word_index(self, offset: int) -> int:
+        """Number of the word at `offset` in the lower-cased content"""
+        if self._words is None:
+            self._words = [match.start() for match in _WORD.finditer(self.lower)]
+        return bisect_right(self._words, offset) - 1
+    
+    def known_terms(self) -> Tuple[Dict[tuple, bool], Dict[tuple, int]]:
+        """What has been found out about terms so far: (presence, counts)"""
+        return dict(self._present), dict(self._counts)
+    
+    def remember_terms(self, present: Dict[tuple, bool], counts: Dict[tuple, int]):
+        """Adopt what was found out about terms elsewhere (e.g. by a match pool worker)"""
+        for key, found in present.items():
+            self._present.setdefault(key, found)
+        for key, count in counts.items():
+            self._counts.setdefault(key, count)
+    
+    @property
+    def simhash(self) -> int:
+        """Near-duplicate fingerprint, computed on first use"""
+        if self._simhash is None:
+            self._simhash = simhash(self.content)
+        return self._simhash
+    
+    @property
+    def secrets(self) -> Dict[str, int]:
+        """Credential detector hits, {detector: count}, computed on first use"""
+        if self._secrets is None:
+            self._secrets = detect_secrets(self.content)
+        return self._secrets
+    
+    @property
+    def layers(self) -> List[Tuple[DecodedLayer, 'PasteDocument']]:
+        """Text decoded from base64/hex/compressed spans (see `decoding.py`), computed on first use"""
+        if self._layers is None:
+            self._layers = [(layer, PasteDocument(layer.text)) for layer in decode_layers(self.content)]
+        return self._layers
+
+
+class CompiledMatcher:
+    """A session's search criteria, compiled once and applied to many pastes.
+    
+    Literal terms are lower-cased up front and regex terms compiled once, so
+    matching a paste costs one pass per term over the shared
+    `PasteDocument` instead of re-preparing the terms for every paste. The
+    pass counts occurrences, which the document keeps for other sessions
+    with the same term and which feed the BM25 `scorer`.
+    A paste matches when it contains any of the terms. Literal terms match
+    as case-insensitive substrings; in `regex_mode` a term is a
+    case-insensitive regular expression, and one that does not compile is
+    searched for as a literal instead.
+    
+    With a `query` (see `query.py`) a paste must satisfy it instead, and
+    the search terms are the query's non-negated terms. The query plan is
+    ordered by the term statistics of the scorer, and terms are only
+    counted once a paste matches. With `detect_secrets`, the built-in
+    credential detectors (see `detectors.py`) run as well and a paste
+    matches on either. With `decode_payloads`, `inspect` also matches the
+    text decoded from encoded spans of a paste.
+    """
+    
+    def __init__(self, search_terms: List[str], file_types: Optional[List[str]] = None,
+                 regex_mode: bool = False, detect_secrets: bool = False,
+                 scorer: Optional[Bm25Scorer] = None, query: Optional[str] = None,
+                 decode_payloads: bool = True):
+        self.query = Query(query) if query else None
+        self.search_terms = self.query.terms if self.query else list(search_terms or [])
+        self.file_types = list(file_types or [])
+        self.regex_mode = regex_mode
+        self.detect_secrets = detect_secrets
+        self.decode_payloads = decode_payloads
+        
+        if self.query:
+            self._probes = self.query.positive
+        else:
+            self._probes = []
+            for term in self.search_terms:
+                if regex_mode:
+                    try:
+                        self._probes.append(TermProbe.regex(term, term))
+                        continue
+                    except re.error:
+                        pass  # invalid regex: fall back to a substring search
+                if term:
+                    self._probes.append(TermProbe.literal(term))
+        self.scorer = scorer or Bm25Scorer()
+    
+    @property
+    def all_terms(self) -> List[str]:
+        """Every term the matcher may look for, including negated query terms"""
+        if self.query:
+            return [probe.term for probe in self.query.probes.values()]
+        return [probe.term for probe in self._probes]
+    
+    @property
+    def scorer(self) -> Bm25Scorer:
+        return self._scorer
+    
+    @scorer.setter
+    def scorer(self, scorer: Bm25Scorer):
+        self._scorer = scorer
+        if self.query:
+            self.query.plan(lambda term: match_probability(scorer.term_idf(term)))
+    
+    @classmethod
+    def from_settings(cls, search_terms: List[str], file_types: Optional[List[str]],
+                      settings: Dict[str, Any]) -> 'CompiledMatcher':
+        """Build a matcher from a session's search terms, file types and settings"""
+        regex_mode = settings.get('regexMode', settings.get('regex_mode', False))
+        detect = settings.get('detectSecrets', settings.get('detect_secrets', False))
+        decode = settings.get('decodePayloads', settings.get('decode_payloads', True))
+        return cls(search_terms, file_types, regex_mode=bool(regex_mode), detect_secrets=bool(detect),
+                   query=settings.get('query') or None, decode_payloads=bool(decode))
+    
+    def spec(self) -> tuple:
+        """Picklable, hashable description from which `from_spec` rebuilds the matcher"""
+        return (tuple(self.search_terms), tuple(self.file_types), self.regex_mode,
+                self.detect_secrets, self.query.text if self.query else None, self.scorer.spec(),
+                self.decode_payloads)
+    
+    @classmethod
+    def from_spec(cls, spec: tuple) -> 'CompiledMatcher':
+        search_terms, file_types, regex_mode, detect, query, scorer, decode = spec
+        return cls(list(search_terms), list(file_types), regex_mode=regex_mode,
+                   detect_secrets=detect, scorer=Bm25Scorer.from_spec(scorer), query=query,
+                   decode_payloads=decode)
+    
+    def hits(self, document: PasteDocument) -> Dict[str, int]:
+        """Occurrences of each search term found in a paste, {term: count}, in term order.
+        
+        With a query, {} unless the paste satisfies it.
+        """
+        if not document.content:
+            return {}
+        if self.query and not self.query.matches(document):
+            return {}
+        
+        hits = {}
+        for probe in self._probes:
+            count = probe.count(document)
+            if count:
+                hits[probe.term] = count
+        return hits
+    
+    def inspect(self, document: PasteDocument) -> Tuple[Dict[str, int], Dict[str, int], List[str]]:
+        """Term hits, secret detector hits and the encodings that hid any of them.
+        
+        Each payload decoded from the paste is matched as a paste of its own
+        (a query must hold within one layer) and its hits are added to the
+        paste's. The encodings, e.g. ['base64+gzip'], are those of the layers
+        that had hits; [] if everything was found in the paste as posted.
+        """
+        hits = self.hits(document)
+        detections = self.detect(document)
+        decoded_from = []
+        if not self.decode_payloads or not document.content:
+            return hits, detections, decoded_from
+        
+        for layer, layer_document in document.layers:
+            layer_hits = self.hits(layer_document)
+            layer_detections = self.detect(layer_document)
+            if not layer_hits and not layer_detections:
+                continue
+            if layer.encoding not in decoded_from:
+                decoded_from.append(layer.encoding)
+            for term, count in layer_hits.items():
+                hits[term] = hits.get(term, 0) + count
+            detections = dict(detections)
+            for detector, count in layer_detections.items():
+                detections[detector] = detections.get(detector, 0) + count
+        
+        if decoded_from:
+            hits = {probe.term: hits[probe.term] for probe in self._probes if probe.term in hits}
+        return hits, detections, decoded_from
+    
+    def spans(self, document: PasteDocument, hits: Dict[str, int]) -> Dict[str, List[Tuple[int, int]]]:
+        """{term: [(start, end), ...]} of the first occurrences of the terms in `hits`.
+        
+        A term only found in decoded payloads is given the spans of the
+        encoded text it was decoded from.
+        """
+        spans = {}
+        for probe in self._probes:
+            if probe.term not in hits:
+                continue
+            spans[probe.term] = probe.spans(document)
+            if not spans[probe.term] and self.decode_payloads:
+                encoded = [(layer.start, layer.end) for layer, layer_document in document.layers
+                           if layer_document.checked(probe.key)]
+                spans[probe.term] = list(dict.fromkeys(encoded))[:MAX_SPANS]
+        return spans
+    
+    def checked(self, document: PasteDocument) -> Dict[str, bool]:
+        """{term: found} for the terms already looked for in a paste, without looking further"""
+        checked = {}
+        for probe in (self.query.probes.values() if self.query else self._probes):
+            found = document.checked(probe.key)
+            if found is not None:
+                checked[probe.term] = found
+        return checked
+    
+    def match(self, document: PasteDocument) -> List[str]:
+        """Return the search terms found in a paste"""
+        return list(self.hits(document))
+    
+    def score(self, document: PasteDocument, hits: Dict[str, int]) -> float:
+        """BM25 relevance (0-100) of a paste from the hits `hits()` returned for it"""
+        return self.scorer.score(hits, len(document.content), self.search_terms)
+    
+    def detect(self, document: PasteDocument) -> Dict[str, int]:
+        """Secret detector hits in a paste, or {} when detection is off"""
+        if not self.detect_secrets or not document.content:
+            return {}
+        return document.secrets
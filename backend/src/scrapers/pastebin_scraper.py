@@ -15,60 +15,32 @@ class PastebinScraper(BaseScraper):
         )
         self.api_base = 'https://scrape.pastebin.com/api_scraping.php'
     
-    def search(self, search_terms: List[str], file_types: List[str] = None, 
-               max_results: int = 100, **kwargs) -> List[Dict[str, Any]]:
-        """Search Pastebin using their scraping API and recent pastes"""
-        results = []
-        
+    def listing_limit(self, max_results: int) -> int:
+        """The scraping API returns at most 250 recent pastes"""
+        return min(max_results * 2, 250)
+    
+    def list_items(self, limit: int) -> List[Dict[str, Any]]:
+        """Recent pastes from Pastebin's scraping API"""
+        return self._get_recent_pastes(limit=limit)
+    
+    def item_key(self, item: Dict[str, Any]) -> str:
+        """Pastebin paste key"""
+        return item['key']
+    
+    def item_watermark(self, item: Dict[str, Any]) -> Optional[float]:
+        """The scraping API's `date` field (unix seconds)"""
         try:
-            # Get recent pastes from Pastebin's scraping API
-            recent_pastes = self._get_recent_pastes(limit=min(max_results * 2, 250))
-            
-            for paste_info in recent_pastes:
-                if len(results) >= max_results:
-                    break
-                
-                # Get paste content
-                content = self.get_paste_content(paste_info['key'])
-                if not content:
-                    continue
-                
-                # Check if content matches search terms
-                matched_terms = self._contains_search_terms(
-                    content, search_terms, kwargs.get('regex_mode', False)
-                )
-                
-                if not matched_terms:
-                    continue
-                
-                # Check file type filter
-                if not self._matches_file_type(content, paste_info.get('syntax', ''), file_types):
-                    continue
-                
-                # Calculate relevance score
-                relevance_score = self._calculate_relevance_score(content, search_terms)
-                
-                result = {
-                    'paste_id': paste_info['key'],
-                    'url': f"https://pastebin.com/{paste_info['key']}",
-                    'title': paste_info.get('title', 'Untitled'),
-                    'content_preview': content[:500] + '...' if len(content) > 500 else content,
-                    'full_content': content,
-                    'file_type': self._detect_file_type(content, paste_info.get('syntax', '')),
-                    'matched_terms': matched_terms,
-                    'service': self.name,
-                    'relevance_score': relevance_score,
-                    'file_size': len(content.encode('utf-8')),
-                    'created_at': paste_info.get('date')
-                }
-                
-                results.append(result)
-                self.logger.info(f"Found match in paste {paste_info['key']}: {len(matched_terms)} terms")
-        
-        except Exception as e:
-            self.logger.error(f"Search failed: {e}")
-        
-        return results
+            return float(item['date'])
+        except (KeyError, TypeError, ValueError):
+            return None
+    
+    def fetch_item_content(self, item: Dict[str, Any]) -> Optional[str]:
+        """Raw content of a listed paste"""
+        return self.get_paste_content(item['key'])
+    
+    def result_url(self, item: Dict[str, Any]) -> str:
+        """Pastebin page of the paste"""
+        return f"https://pastebin.com/{item['key']}"
     
     def _get_recent_pastes(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get recent pastes from Pastebin's scraping API"""
@@ -104,46 +76,3 @@ class PastebinScraper(BaseScraper):
         except Exception as e:
             self.logger.error(f"Failed to get paste content for {paste_id}: {e}")
             return None
-    
-    def _detect_file_type(self, content: str, syntax_hint: str = '') -> str:
-        """Detect file type from content and syntax hint"""
-        if syntax_hint:
-            # Map Pastebin syntax names to common extensions
-            syntax_map = {
-                'javascript': 'js',
-                'python': 'py',
-                'php': 'php',
-                'sql': 'sql',
-                'json': 'json',
-                'xml': 'xml',
-                'html': 'html',
-                'css': 'css',
-                'java': 'java',
-                'cpp': 'cpp',
-                'c': 'c',
-                'bash': 'sh'
-            }
-            
-            if syntax_hint.lower() in syntax_map:
-                return syntax_map[syntax_hint.lower()]
-        
-        # Fallback to content-based detection
-        content_lower = content.lower()
-        
-        if content.strip().startswith('{') and content.strip().endswith('}'):
-            return 'json'
-        elif '<?php' in content_lower:
-            return 'php'
-        elif 'def ' in content and 'import ' in content:
-            return 'py'
-        elif 'function' in content and ('var ' in content or 'const ' in content):
-            return 'js'
-        elif 'select ' in content_lower or 'insert ' in content_lower:
-            return 'sql'
-        elif '<html' in content_lower or '<!doctype' in content_lower:
-            return 'html'
-        elif content.strip().startswith('<') and content.strip().endswith('>'):
-            return 'xml'
-        
-        return 'txt'
-
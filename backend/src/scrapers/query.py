@@ -0,0 +1,444 @@
+import math
+import re
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Relative cost of looking for one term in a paste. Literals are a C-speed
+# substring search; regexes cost more, and proximity needs both operands'
+# offsets and the paste's word boundaries on top of their presence checks.
+LITERAL_COST = 1.0
+REGEX_COST = 4.0
+NEAR_COST = 2.0
+
+# Share of pastes holding both operands of a NEAR that hold them close
+NEAR_SHARE = 0.5
+
+MAX_QUERY_LENGTH = 2000
+
+# Occurrences of a term located for previews and stored with a result
+MAX_SPANS = 20
+
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<open>\()
+      | (?P<close>\))
+      | "(?P<phrase>[^"]+)"
+      | /(?P<regex>(?:\\.|[^/\\])+)/(?=[\s()]|$)
+      | NEAR/(?P<near>\d+)(?=[\s()"]|$)
+      | (?P<word>[^\s()"]+)
+    )''', re.VERBOSE)
+
+_OPERATORS = ('AND', 'OR', 'NOT')
+
+
+class QuerySyntaxError(ValueError):
+    """A query that does not parse; the message says where and why"""
+
+
+class TermProbe:
+    """Looks for one term in a `PasteDocument`.
+    
+    Presence, occurrence counts and offsets are cached on the document
+    under `key`, so every matcher and query with the same term shares them:
+    ('lit', lower-cased text) for literals matched case-insensitively,
+    ('re', pattern) for regexes.
+    """
+    
+    __slots__ = ('term', 'key', 'cost', '_literal', '_pattern')
+    
+    def __init__(self, term: str, literal: Optional[str] = None, pattern: Optional[re.Pattern] = None):
+        self.term = term
+        self._literal = literal
+        self._pattern = pattern
+        if pattern is not None:
+            self.key = ('re', pattern.pattern)
+            self.cost = REGEX_COST
+        else:
+            self.key = ('lit', literal)
+            self.cost = LITERAL_COST
+    
+    @classmethod
+    def literal(cls, term: str) -> 'TermProbe':
+        return cls(term, literal=term.lower())
+    
+    @classmethod
+    def regex(cls, term: str, pattern: str) -> 'TermProbe':
+        return cls(term, pattern=re.compile(pattern, re.IGNORECASE))
+    
+    def present(self, document) -> bool:
+        return document.contains(self.key, self._search)
+    
+    def count(self, document) -> int:
+        return document.count(self.key, self._count)
+    
+    def offsets(self, document) -> List[Tuple[int, int]]:
+        """(start, end) of every occurrence, in the lower-cased content for literals"""
+        return document.offsets(self.key, self._offsets)
+    
+    def spans(self, document) -> List[Tuple[int, int]]:
+        """(start, end) in the content of the first MAX_SPANS occurrences"""
+        return document.spans(self.key, self._spans)
+    
+    def _search(self, document) -> bool:
+        if self._pattern is not None:
+            return self._pattern.search(document.content) is not None
+        return self._literal in document.lower
+    
+    def _count(self, document) -> int:
+        if self._pattern is not None:
+            return sum(1 for _ in self._pattern.finditer(document.content))
+        return document.lower.count(self._literal)
+    
+    def _offsets(self, document) -> List[Tuple[int, int]]:
+        if self._pattern is not None:
+            return [match.span() for match in self._pattern.finditer(document.content)]
+        text, literal, offsets = document.lower, self._literal, []
+        position = text.find(literal)
+        while position != -1:
+            offsets.append((position, position + len(literal)))
+            position = text.find(literal, position + len(literal))
+        return offsets
+    
+    def _spans(self, document) -> List[Tuple[int, int]]:
+        if self._pattern is not None:
+            return [match.span() for match in islice(self._pattern.finditer(document.content), MAX_SPANS)]
+        if len(document.lower) != len(document.content):
+            # Lower-casing changed the length of some characters, so offsets
+            # in the lower-cased copy would not line up with the content
+            matches = re.finditer(re.escape(self.term), document.content, re.IGNORECASE)
+            return [match.span() for match in islice(matches, MAX_SPANS)]
+        text, literal, spans = document.lower, self._literal, []
+        position = text.find(literal)
+        while position != -1 and len(spans) < MAX_SPANS:
+            spans.append((position, position + len(literal)))
+            position = text.find(literal, position + len(literal))
+        return spans
+
+
+class _Node:
+    """A step of a match plan, with its estimated cost and match probability"""
+    
+    cost = 0.0
+    probability = 0.5
+    
+    def plan(self, probability_of: Callable[[str], float]):
+        """Estimate cost and probability bottom-up and order children to short-circuit early"""
+        raise NotImplementedError
+    
+    def matches(self, document) -> bool:
+        raise NotImplementedError
+    
+    def probes(self, negated: bool = False):
+        """Yield (probe, negated) for every term of the subtree"""
+        raise NotImplementedError
+
+
+class _Term(_Node):
+    def __init__(self, probe: TermProbe):
+        self.probe = probe
+    
+    def plan(self, probability_of):
+        self.cost = self.probe.cost
+        self.probability = probability_of(self.probe.term)
+    
+    def matches(self, document) -> bool:
+        return self.probe.present(document)
+    
+    def probes(self, negated=False):
+        yield self.probe, negated
+    
+    def __str__(self):
+        return self.probe.term
+
+
+class _Near(_Node):
+    """Both terms occur within `distance` words of each other, in either order.
+    
+    The distance runs from the last word of one occurrence to the first
+    word of the other, so multi-word phrases are not penalised for their
+    own length: `"api key" NEAR/3 secret` matches "api key is the secret".
+    """
+    
+    def __init__(self, left: _Term, right: _Term, distance: int):
+        self.operands = [left, right]
+        self.distance = distance
+    
+    def plan(self, probability_of):
+        for operand in self.operands:
+            operand.plan(probability_of)
+        # Check the operand more likely to be missing first
+        self.operands.sort(key=lambda operand: operand.cost / max(1.0 - operand.probability, 1e-9))
+        left, right = self.operands
+        self.cost = left.cost + left.probability * (right.cost + right.probability * NEAR_COST)
+        self.probability = left.probability * right.probability * NEAR_SHARE
+    
+    def matches(self, document) -> bool:
+        if not all(operand.matches(document) for operand in self.operands):
+            return False
+        # Merge the two sorted lists of (first word, last word) for the
+        # closest pair; the one ending first cannot be closer to a later one
+        first, second = ([(document.word_index(start), document.word_index(max(start, end - 1)))
+                          for start, end in operand.probe.offsets(document)]
+                         for operand in self.operands)
+        i = j = 0
+        while i < len(first) and j < len(second):
+            (first_start, first_end), (second_start, second_end) = first[i], second[j]
+            if second_start - first_end <= self.distance and first_start - second_end <= self.distance:
+                return True
+            if first_end < second_end:
+                i += 1
+            else:
+                j += 1
+        return False
+    
+    def probes(self, negated=False):
+        for operand in self.operands:
+            yield from operand.probes(negated)
+    
+    def __str__(self):
+        left, right = self.operands
+        return f'{left} NEAR/{self.distance} {right}'
+
+
+class _Not(_Node):
+    def __init__(self, child: _Node):
+        self.child = child
+    
+    def plan(self, probability_of):
+        self.child.plan(probability_of)
+        self.cost = self.child.cost
+        self.probability = 1.0 - self.child.probability
+    
+    def matches(self, document) -> bool:
+        return not self.child.matches(document)
+    
+    def probes(self, negated=False):
+        yield from self.child.probes(not negated)
+    
+    def __str__(self):
+        return f'NOT {self.child}'
+
+
+class _And(_Node):
+    def __init__(self, children: List[_Node]):
+        self.children = children
+    
+    def plan(self, probability_of):
+        for child in self.children:
+            child.plan(probability_of)
+        # Cheapest per chance of ending the conjunction first
+        self.children.sort(key=lambda child: child.cost / max(1.0 - child.probability, 1e-9))
+        self.cost, reached = 0.0, 1.0
+        for child in self.children:
+            self.cost += reached * child.cost
+            reached *= child.probability
+        self.probability = reached
+    
+    def matches(self, document) -> bool:
+        return all(child.matches(document) for child in self.children)
+    
+    def probes(self, negated=False):
+        for child in self.children:
+            yield from child.probes(negated)
+    
+    def __str__(self):
+        return '(' + ' AND '.join(map(str, self.children)) + ')'
+
+
+class _Or(_Node):
+    def __init__(self, children: List[_Node]):
+        self.children = children
+    
+    def plan(self, probability_of):
+        for child in self.children:
+            child.plan(probability_of)
+        # Cheapest per chance of deciding the disjunction first
+        self.children.sort(key=lambda child: child.cost / max(child.probability, 1e-9))
+        self.cost, reached = 0.0, 1.0
+        for child in self.children:
+            self.cost += reached * child.cost
+            reached *= 1.0 - child.probability
+        self.probability = 1.0 - reached
+    
+    def matches(self, document) -> bool:
+        return any(child.matches(document) for child in self.children)
+    
+    def probes(self, negated=False):
+        for child in self.children:
+            yield from child.probes(negated)
+    
+    def __str__(self):
+        return '(' + ' OR '.join(map(str, self.children)) + ')'
+
+
+class _Parser:
+    """Recursive descent over the tokens of a query.
+        
+        query := and ('OR' and)*
+        and   := unary (['AND'] unary)*
+        unary := 'NOT' unary | near
+        near  := atom ('NEAR/n' term)*
+        atom  := term | '(' query ')'
+        term  := word | "phrase" | /regex/
+    
+    Operators are upper-case; adjacent operands are ANDed, so "a NOT b"
+    reads as "a AND NOT b".
+    """
+    
+    def __init__(self, text: str):
+        self.tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                position += len(text[position:]) - len(text[position:].lstrip())
+                raise QuerySyntaxError(f'Unexpected character at position {position}: {text[position]!r}')
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup), position))
+            position = match.end()
+        self.index = 0
+    
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else (None, None, None)
+    
+    def take(self):
+        token = self.peek()
+        self.index += 1
+        return token
+    
+    def is_operator(self, name: str) -> bool:
+        kind, value, _ = self.peek()
+        return kind == 'word' and value == name
+    
+    def parse(self) -> _Node:
+        if not self.tokens:
+            raise QuerySyntaxError('The query is empty')
+        node = self.parse_or()
+        kind, value, position = self.peek()
+        if kind is not None:
+            raise QuerySyntaxError(f'Unexpected {value!r} at position {position}')
+        return node
+    
+    def parse_or(self) -> _Node:
+        children = [self.parse_and()]
+        while self.is_operator('OR'):
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else _Or(_flatten(children, _Or))
+    
+    def parse_and(self) -> _Node:
+        children = [self.parse_unary()]
+        while True:
+            if self.is_operator('AND'):
+                self.take()
+            elif not self.starts_operand():
+                break
+            children.append(self.parse_unary())
+        return children[0] if len(children) == 1 else _And(_flatten(children, _And))
+    
+    def starts_operand(self) -> bool:
+        kind, value, _ = self.peek()
+        if kind in ('open', 'phrase', 'regex'):
+            return True
+        return kind == 'word' and value not in ('AND', 'OR')
+    
+    def parse_unary(self) -> _Node:
+        if self.is_operator('NOT'):
+            self.take()
+            return _Not(self.parse_unary())
+        return self.parse_near()
+    
+    def parse_near(self) -> _Node:
+        left = self.parse_atom()
+        pairs = []
+        while self.peek()[0] == 'near':
+            _, distance, position = self.take()
+            right = self.parse_atom()
+            if not isinstance(left, _Term) or not isinstance(right, _Term):
+                raise QuerySyntaxError(f'NEAR/{distance} at position {position} must join two terms')
+            pairs.append(_Near(left, right, int(distance)))
+            left = right
+        if not pairs:
+            return left
+        return pairs[0] if len(pairs) == 1 else _And(pairs)
+    
+    def parse_atom(self) -> _Node:
+        kind, value, position = self.take()
+        if kind == 'open':
+            node = self.parse_or()
+            if self.take()[0] != 'close':
+                raise QuerySyntaxError(f'Unclosed parenthesis at position {position}')
+            return node
+        if kind == 'phrase':
+            return _Term(TermProbe.literal(value))
+        if kind == 'regex':
+            try:
+                return _Term(TermProbe.regex(f'/{value}/', value))
+            except re.error as e:
+                raise QuerySyntaxError(f'Invalid regex at position {position}: {e}') from None
+        if kind == 'word' and value not in _OPERATORS:
+            return _Term(TermProbe.literal(value))
+        if kind is None:
+            raise QuerySyntaxError('The query ends where a term was expected')
+        raise QuerySyntaxError(f'Expected a term at position {position}, found {value!r}')
+
+
+def _flatten(children: List[_Node], kind: type) -> List[_Node]:
+    flat = []
+    for child in children:
+        flat.extend(child.children if isinstance(child, kind) else [child])
+    return flat
+
+
+class Query:
+    """A boolean/proximity search query compiled into a match plan.
+    
+    Terms are words, "quoted phrases" (both case-insensitive substrings) or
+    /regexes/, combined with AND, OR, NOT, parentheses and `a NEAR/n b`
+    (within n words). `plan` orders every AND and OR so the terms cheapest
+    to check and likeliest to decide the outcome run first; evaluation
+    stops as soon as the outcome is known. Proximity is decided from the
+    term offsets cached on the document, not by scanning again.
+    """
+    
+    def __init__(self, text: str):
+        if len(text) > MAX_QUERY_LENGTH:
+            raise QuerySyntaxError(f'Queries are limited to {MAX_QUERY_LENGTH} characters')
+        self.text = text
+        self.root = _Parser(text).parse()
+        
+        self.probes: Dict[tuple, TermProbe] = {}
+        positive: Dict[str, TermProbe] = {}
+        for probe, negated in self.root.probes():
+            self.probes.setdefault(probe.key, probe)
+            if not negated:
+                positive.setdefault(probe.term, probe)
+        if not positive:
+            raise QuerySyntaxError('A query needs at least one term that is not negated')
+        self.positive = list(positive.values())
+        self.plan(lambda term: 0.5)
+    
+    @property
+    def terms(self) -> List[str]:
+        """The terms a matching paste is credited with, in query order"""
+        return [probe.term for probe in self.positive]
+    
+    def plan(self, probability_of: Callable[[str], float]):
+        """Reorder the plan for the given per-term match probabilities"""
+        self.root.plan(probability_of)
+    
+    def matches(self, document) -> bool:
+        return self.root.matches(document)
+    
+    def explain(self) -> str:
+        """The plan in evaluation order"""
+        return str(self.root)
+
+
+def match_probability(idf: float) -> float:
+    """Share of pastes holding a term, recovered from its BM25 IDF.
+    
+    exp(-idf) is exactly (matches + 0.5) / (docs + 1) for the IDF in
+    `relevance.inverse_document_frequency`.
+    """
+    return math.exp(-idf)
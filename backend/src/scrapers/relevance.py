@@ -0,0 +1,100 @@
+import math
+from typing import Dict, Optional, Tuple
+
+# Standard BM25 parameters: term-frequency saturation and length normalisation
+K1 = 1.2
+B = 0.75
+
+
+def inverse_document_frequency(docs: int, matches: int) -> float:
+    """BM25 IDF of a term found in `matches` of the `docs` pastes checked for it.
+    
+    Unseen terms (no statistics yet) get the IDF of a term in half the pastes.
+    """
+    return math.log(1.0 + (docs - matches + 0.5) / (matches + 0.5))
+
+
+class Bm25Scorer:
+    """BM25 relevance of a paste for a session's search terms.
+    
+    IDFs and the average paste length come from the service's corpus
+    statistics, frozen when the session starts; a paste is scored from the
+    term counts its matcher already collected and its length, without
+    looking at the content again. Scores are scaled to 0-100 as a share of
+    the best score the terms could reach, so a paste holding only common
+    terms ranks below one holding rare ones.
+    """
+    
+    def __init__(self, idf: Optional[Dict[str, float]] = None, avg_length: float = 0.0,
+                 k1: float = K1, b: float = B):
+        self.idf = dict(idf or {})
+        self.avg_length = avg_length
+        self.k1 = k1
+        self.b = b
+    
+    @classmethod
+    def from_statistics(cls, term_counts: Dict[str, Tuple[int, int]],
+                        corpus_docs: int, corpus_length: int) -> 'Bm25Scorer':
+        """Build a scorer from {term: (docs, matches)} and the service's totals"""
+        idf = {term: inverse_document_frequency(docs, matches)
+               for term, (docs, matches) in term_counts.items()}
+        return cls(idf, corpus_length / corpus_docs if corpus_docs else 0.0)
+    
+    def term_idf(self, term: str) -> float:
+        return self.idf.get(term.strip().lower(), inverse_document_frequency(0, 0))
+    
+    def score(self, hits: Dict[str, int], length: int, terms) -> float:
+        """Score a paste of `length` characters with `hits` {term: count} out of `terms`"""
+        if not hits:
+            return 0.0
+        
+        # Without statistics yet every paste counts as average length
+        ratio = length / self.avg_length if self.avg_length else 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * ratio)
+        
+        total = sum(self.term_idf(term) * count * (self.k1 + 1.0) / (count + norm)
+                    for term, count in hits.items())
+        best = sum(self.term_idf(term) * (self.k1 + 1.0) for term in terms)
+        return min(100.0 * total / best, 100.0) if best else 0.0
+    
+    def spec(self) -> tuple:
+        return (tuple(sorted(self.idf.items())), self.avg_length, self.k1, self.b)
+    
+    @classmethod
+    def from_spec(cls, spec: tuple) -> 'Bm25Scorer':
+        idf, avg_length, k1, b = spec
+        return cls(dict(idf), avg_length, k1, b)
+
+
+class CorpusObservation:
+    """Corpus statistics a session gathered while scanning, not yet stored.
+    
+    A term counts towards `checked` for every paste it was looked for in,
+    which with a short-circuiting query is not every paste evaluated.
+    """
+    
+    __slots__ = ('docs', 'total_length', 'checked', 'matches')
+    
+    def __init__(self):
+        self.docs = 0
+        self.total_length = 0
+        self.checked: Dict[str, int] = {}
+        self.matches: Dict[str, int] = {}
+    
+    def observe(self, length: int, checked: Dict[str, bool]):
+        """Record a paste of `length` characters and {term: found} for the terms looked for"""
+        self.docs += 1
+        self.total_length += length
+        for term, found in checked.items():
+            self.checked[term] = self.checked.get(term, 0) + 1
+            if found:
+                self.matches[term] = self.matches.get(term, 0) + 1
+    
+    def take(self) -> 'CorpusObservation':
+        """Return what was gathered so far and start over"""
+        taken = CorpusObservation()
+        taken.docs, self.docs = self.docs, 0
+        taken.total_length, self.total_length = self.total_length, 0
+        taken.checked, self.checked = self.checked, {}
+        taken.matches, self.matches = self.matches, {}
+        return taken
@@ -1,13 +1,39 @@
 import json
+import os
+import socket
 import threading
-import time
 from typing import List, Dict, Any, Optional, Callable
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from flask import current_app
+
 from .pastebin_scraper import PastebinScraper
 from .gist_scraper import GistScraper
-from src.models.scraper import SearchSession, SearchResult, SearchLog, PastebinService, db
+from .configured_scraper import ConfiguredScraper
+from .service_configs import SERVICE_CONFIGS
+from .base_scraper import ScanCursor
+from .cancellation import CancellationToken
+from .matcher import CompiledMatcher
+from .relevance import Bm25Scorer
+from .shared_fetch import ServiceFeed
+from src.models.scraper import (
+    SearchSession, SearchResult, SearchLog, PastebinService, UserStats, Term, ResultTerm,
+    ContentFingerprint, ServiceCorpusStats, TermStats, db
+)
+from src.models.jobs import ScheduleWatermark, SessionCheckpoint, SessionShard
+from src.jobs.queue import (
+    enqueue_session, cancel_session_jobs, release_dead_leases, requeue_orphaned_sessions, has_pending_jobs
+)
+from src.jobs.fairshare import DEFAULT_CONFIG as FAIR_SHARE_DEFAULTS
+from src.jobs.worker import QueueWorker
+from src.jobs.event_relay import DatabaseEventRelay
+from src.jobs.retention import delete_session_results
+from src.utils.events import EventBus
+from src.utils import serialization
+from src.jobs.coordinator import (
+    split_session, cancel_session_shards, claim_session_completion, session_shard_results
+)
 
 class ScraperManager:
     """Manages multiple scrapers and coordinates search sessions"""
@@ -17,246 +43,572 @@ class ScraperManager:
             'pastebin': PastebinScraper(),
             'gist': GistScraper(),
         }
+        # Every other service is described by configuration (see service_configs)
+        self.scrapers.update(
+            (service_id, ConfiguredScraper(service_id)) for service_id in SERVICE_CONFIGS
+        )
+        
+        # Concurrent sessions share one fetch loop per service
+        self.feeds = {
+            service_id: ServiceFeed(scraper) for service_id, scraper in self.scrapers.items()
+        }
         
-        # Mock scrapers for other services (would be implemented similarly)
-        self.mock_services = [
-            {'id': 'paste_ee', 'name': 'paste.ee', 'rate_limit': 20},
-            {'id': 'dpaste', 'name': 'dpaste.org', 'rate_limit': 30},
-            {'id': 'nekobin', 'name': 'nekobin.com', 'rate_limit': 15},
-            {'id': 'rentry', 'name': 'rentry.co', 'rate_limit': 25},
-            {'id': 'hastebin', 'name': 'hastebin.com', 'rate_limit': 10},
-            {'id': 'gitlab', 'name': 'GitLab Snippets', 'rate_limit': 120},
-            {'id': 'ubuntu_paste', 'name': 'paste.ubuntu.com', 'rate_limit': 20},
-            {'id': 'justpaste', 'name': 'justpaste.it', 'rate_limit': 15},
-            {'id': 'controlc', 'name': 'controlc.com', 'rate_limit': 25},
-            {'id': 'ideone', 'name': 'ideone.com', 'rate_limit': 40}
-        ]
-        
-        self.active_sessions = {}  # session_id -> thread
+        self._services_json = None
+        
+        self.active_sessions = {}  # session_id -> CancellationToken of a session running here
         self.session_callbacks = {}  # session_id -> callback functions
+        
+        # Live logs, progress, results and status for /sessions/<id>/stream
+        self.events = EventBus()
+        self.event_relay = None
+        self._event_relay_lock = threading.Lock()
+        
+        # Queue workers serving sessions in thread execution mode, started on first use
+        self.local_workers = []
+        self._local_workers_lock = threading.Lock()
     
     def get_available_services(self) -> List[Dict[str, Any]]:
         """Get list of all available pastebin services"""
         services = []
         
-        # Add real scrapers
         for scraper_id, scraper in self.scrapers.items():
             services.append({
                 'id': scraper_id,
                 'name': scraper.name,
+                'base_url': scraper.base_url,
                 'status': 'active',
-                'has_api': True,
+                'has_api': scraper.has_api,
                 'rate_limit': scraper.rate_limit
             })
         
-        # Add mock services
-        for service in self.mock_services:
-            services.append({
-                'id': service['id'],
-                'name': service['name'],
-                'status': 'active',
-                'has_api': False,
-                'rate_limit': service['rate_limit']
-            })
-        
         return services
     
+    def available_services_json(self) -> bytes:
+        """`get_available_services` encoded as JSON, built once per process"""
+        if self._services_json is None:
+            self._services_json = serialization.dumps(self.get_available_services())
+        return self._services_json
+    
     def start_search_session(self, session_id: int, 
                            progress_callback: Optional[Callable] = None,
                            log_callback: Optional[Callable] = None) -> bool:
-        """Start a search session in a background thread"""
+        """Queue a search session for the fair-share scheduler.
+        
+        Sessions go through the durable job queue, which orders them fairly
+        across users and applies the per-user caps (see src.jobs.fairshare).
+        In thread execution mode the queue is served by worker threads inside
+        this process; with SCRAPER_EXECUTION_MODE=queue it is served by
+        worker processes (see src/worker.py).
+        """
         
         if session_id in self.active_sessions:
             return False  # Session already running
         
+        job = enqueue_session(session_id)
+        db.session.commit()
+        if job is None:
+            return False
+        
+        if current_app.config.get('SCRAPER_EXECUTION_MODE') == 'queue':
+            return True
+        
         # Store callbacks
         self.session_callbacks[session_id] = {
             'progress': progress_callback,
             'log': log_callback
         }
         
-        # Start search in background thread
-        thread = threading.Thread(
-            target=self._run_search_session,
-            args=(session_id,),
-            daemon=True
-        )
-        thread.start()
-        
-        self.active_sessions[session_id] = thread
+        self._ensure_local_workers(current_app._get_current_object())
+        for worker in self.local_workers:
+            worker.wake()
         return True
     
+    def _ensure_local_workers(self, app):
+        """Start the in-process queue workers used in thread execution mode"""
+        with self._local_workers_lock:
+            if self.local_workers:
+                return
+            
+            fair_share = {**FAIR_SHARE_DEFAULTS, **app.config.get('FAIR_SHARE', {})}
+            worker_prefix = f'{socket.gethostname()}:{os.getpid()}'
+            for index in range(max(fair_share['LOCAL_WORKERS'], 1)):
+                # One process shares each scraper's own limiter already
+                worker = QueueWorker(app, self, worker_id=f'{worker_prefix}:local-{index}',
+                                     shared_rate_budget=False)
+                threading.Thread(target=worker.run_forever, name=f'session-worker-{index}',
+                                 daemon=True).start()
+                self.local_workers.append(worker)
+    
+    def resume_interrupted_sessions(self, app) -> List[int]:
+        """Pick up sessions a restart left behind; call once at startup.
+        
+        Leases held by dead processes on this host are released at once
+        instead of waiting to expire, and running sessions with no job left
+        are queued again. Workers then resume each of them from its
+        checkpoints. Returns the ids of the requeued sessions.
+        """
+        release_dead_leases()
+        requeued = requeue_orphaned_sessions()
+        
+        for session_id in requeued:
+            self._log_message(session_id, 'info', 'System', 'Session interrupted by a restart, resuming')
+        
+        if app.config.get('SCRAPER_EXECUTION_MODE') != 'queue' and has_pending_jobs():
+            self._ensure_local_workers(app)
+        return requeued
+    
+    def ensure_event_relay(self, app):
+        """Start relaying events of sessions run by other processes to this one's bus"""
+        with self._event_relay_lock:
+            if self.event_relay is None:
+                self.event_relay = DatabaseEventRelay(
+                    app, self.events, is_local=lambda session_id: session_id in self.active_sessions
+                )
+            self.event_relay.start()
+    
     def stop_search_session(self, session_id: int) -> bool:
-        """Stop a running search session"""
-        if session_id not in self.active_sessions:
-            return False
+        """Stop a running search session.
         
-        # Update session status
+        Sessions run by another process (a queue worker) are stopped through
+        the database: the status change is picked up by the worker's lease
+        heartbeat.
+        """
         session = SearchSession.query.get(session_id)
-        if session:
-            session.status = 'stopped'
-            session.completed_at = datetime.utcnow()
+        local = session_id in self.active_sessions
+        
+        if not local and not (session and session.status in ('running', 'queued')):
+            return False
+        
+        # Update session status; results saved so far are kept, and a
+        # restart resumes from the session's checkpoints
+        if session and session.status in ('running', 'queued'):
+            self._count_stored_results(session)
+            self._finish_session(session, 'stopped')
+            cancel_session_jobs(session_id)
+            cancel_session_shards(session_id)
             db.session.commit()
         
-        # Remove from active sessions
-        del self.active_sessions[session_id]
-        if session_id in self.session_callbacks:
-            del self.session_callbacks[session_id]
+        # Abort the in-flight work of a session running in this process
+        self.cancel_session(session_id)
+        self.session_callbacks.pop(session_id, None)
         
         return True
     
+    def run_session_job(self, session_id: int):
+        """Run a session in the calling thread, as a queue worker does.
+        
+        The session is registered in `active_sessions` with a cancellation
+        token; `cancel_session` (called by `stop_search_session` and the
+        worker's lease heartbeat) aborts its scrapers mid-request.
+        """
+        self.active_sessions[session_id] = CancellationToken()
+        self._run_search_session(session_id)
+    
+    def cancel_session(self, session_id: int):
+        """Cancel a session running in this process; its scrapers stop within moments"""
+        token = self.active_sessions.pop(session_id, None)
+        if token:
+            token.cancel()
+    
+    def use_rate_budget(self, rate_budget):
+        """Make every scraper draw from a shared rate budget (see DatabaseRateBudget)"""
+        for scraper in self.scrapers.values():
+            scraper.rate_budget = rate_budget
+    
+    def use_match_pool(self, match_pool):
+        """Evaluate fetched pastes in worker processes (see MatchPool)"""
+        for feed in self.feeds.values():
+            feed.match_pool = match_pool
+    
+    def begin_sharded_session(self, session_id: int) -> bool:
+        """Mark a session running and split it into per-service shards.
+        
+        The shards are then claimed by any worker through
+        `src.jobs.coordinator.claim_shard`. Returns False if the session was
+        stopped or deleted before it could start.
+        """
+        session = SearchSession.query.get(session_id)
+        if not session or session.status not in ('pending', 'queued', 'running'):
+            return False
+        
+        self._mark_running(session)
+        split_session(session)
+        db.session.commit()
+        
+        self._log_message(session_id, 'info', 'System', f'Starting sharded search session: {session.name}')
+        return True
+    
+    def run_session_shard(self, session_id: int, service_id: str) -> int:
+        """Search one service of a sharded session; returns the number of results"""
+        session = SearchSession.query.get(session_id)
+        if not session or session.status != 'running':
+            return 0
+        
+        # Registered so a stop seen by the lease heartbeat ends the search early
+        self.active_sessions[session_id] = CancellationToken()
+        try:
+            results_count = self._search_service(session, service_id, self._session_params(session))
+        finally:
+            self.active_sessions.pop(session_id, None)
+        self._recount_if_stopped(session)
+        return results_count
+    
+    def finalize_sharded_session(self, session_id: int):
+        """Complete a sharded session if this caller finished its last shard.
+        
+        The claim has already moved the session to its final status; what
+        is left is the bookkeeping a running session gets when it finishes.
+        """
+        status = claim_session_completion(session_id)
+        if status is None:
+            return
+        
+        session = db.session.get(SearchSession, session_id, populate_existing=True)
+        results_count = session_shard_results(session_id)
+        if status == 'completed':
+            params = self._session_params(session)
+            self._complete_session(session, results_count, params['max_results'], was_running=True)
+            return
+        
+        session.results_count = results_count
+        self._log_message(session_id, 'error', 'System', 'Session failed: every service failed')
+        self._finish_session(session, status, was_running=True)
+        db.session.commit()
+    
+    def _mark_running(self, session: SearchSession):
+        """Move a session to running and count it as an active crawl.
+        
+        A session that is already running is being resumed after a restart
+        and keeps its checkpoints. So does one started again after a stop or
+        an error, as long as some service is unfinished: services already
+        searched are skipped and the results saved so far are kept. Any
+        other start scans every service again from scratch and drops the
+        results of earlier runs, which the new run would find again.
+        """
+        if session.status == 'running':
+            return
+        
+        UserStats.reopen(session)
+        UserStats.increment(session.user_id, active_crawls=1)
+        if self._resumable(session):
+            # Shards cancelled by the stop, or failed, run again
+            db.session.execute(
+                db.update(SessionShard)
+                .where(SessionShard.session_id == session.id,
+                       SessionShard.status.in_(('cancelled', 'failed')))
+                .values(status='queued', attempts=0, lease_owner=None, lease_expires_at=None,
+                        last_error=None, finished_at=None)
+            )
+        else:
+            cleared = delete_session_results(session.id)
+            if cleared:
+                UserStats.increment(session.user_id, total_results=-cleared)
+            session.results_count = 0
+            SessionCheckpoint.clear(session.id)
+            db.session.execute(db.delete(SessionShard).where(SessionShard.session_id == session.id))
+        session.status = 'running'
+        session.started_at = datetime.utcnow()
+        session.completed_at = None
+        self.events.publish_status(session.id, 'running', results_count=session.results_count or 0)
+    
+    def _resumable(self, session: SearchSession) -> bool:
+        """Whether an earlier run left checkpoints and some service unfinished"""
+        checkpoints = dict(
+            db.session.query(SessionCheckpoint.service_id, SessionCheckpoint.status)
+                      .filter_by(session_id=session.id)
+        )
+        services = json.loads(session.services) if session.services else []
+        return bool(checkpoints) and any(checkpoints.get(service_id) != 'done' for service_id in services)
+    
+    def _count_stored_results(self, session: SearchSession):
+        """Set a session's results_count from the results it has saved"""
+        session.results_count = SearchResult.query.filter_by(session_id=session.id).count()
+    
+    def _recount_if_stopped(self, session: SearchSession):
+        """Count the batches a stopped session saved after the stop was recorded"""
+        db.session.refresh(session)
+        if session.status == 'stopped':
+            self._count_stored_results(session)
+            db.session.commit()
+    
+    def _finish_session(self, session: SearchSession, status: str, was_running: Optional[bool] = None):
+        """Move a session to a final status and update the user's stats.
+        
+        `was_running` says whether the session counted as an active crawl,
+        for callers that already changed its status; by default it is read
+        from the session.
+        """
+        if was_running is None:
+            was_running = session.status == 'running'
+        session.status = status
+        session.completed_at = datetime.utcnow()
+        self.events.publish_status(session.id, status, results_count=session.results_count or 0)
+        
+        if not was_running:
+            return
+        
+        if status == 'completed':
+            UserStats.increment(
+                session.user_id, active_crawls=-1,
+                completed_searches=1, success_rate_total=session.success_rate or 0.0
+            )
+        else:
+            UserStats.increment(session.user_id, active_crawls=-1)
+    
     def _run_search_session(self, session_id: int):
         """Run a search session (called in background thread)"""
+        cancel = self.active_sessions.setdefault(session_id, CancellationToken())
         try:
             session = SearchSession.query.get(session_id)
-            if not session:
+            # Stopped or deleted after its job was claimed
+            if not session or session.status not in ('pending', 'queued', 'running'):
                 return
             
-            # Update session status
-            session.status = 'running'
-            session.started_at = datetime.utcnow()
+            self._mark_running(session)
             db.session.commit()
             
             self._log_message(session_id, 'info', 'System', f'Starting search session: {session.name}')
             
-            # Parse session parameters
-            search_terms = json.loads(session.search_terms) if session.search_terms else []
-            file_types = json.loads(session.file_types) if session.file_types else []
-            services = json.loads(session.services) if session.services else []
-            settings = json.loads(session.settings) if session.settings else {}
-            
-            max_results = settings.get('maxResults', 1000)
-            results_per_service = max_results // len(services) if services else max_results
-            
-            all_results = []
+            params = self._session_params(session)
+            services = params['services']
+            results_count = 0
             
             # Search each service
             for i, service_id in enumerate(services):
-                if session_id not in self.active_sessions:
+                if cancel.cancelled:
                     break  # Session was stopped
                 
-                self._log_message(session_id, 'info', service_id, f'Starting search on {service_id}')
-                
                 try:
-                    if service_id in self.scrapers:
-                        # Use real scraper
-                        scraper = self.scrapers[service_id]
-                        results = scraper.search(
-                            search_terms=search_terms,
-                            file_types=file_types,
-                            max_results=results_per_service,
-                            **settings
-                        )
-                    else:
-                        # Mock results for other services
-                        results = self._generate_mock_results(
-                            service_id, search_terms, file_types, results_per_service
-                        )
-                    
-                    # Save results to database
-                    for result_data in results:
-                        result = SearchResult(
-                            session_id=session_id,
-                            paste_id=result_data['paste_id'],
-                            url=result_data['url'],
-                            title=result_data.get('title'),
-                            content_preview=result_data.get('content_preview'),
-                            full_content=result_data.get('full_content'),
-                            file_type=result_data.get('file_type'),
-                            matched_terms=json.dumps(result_data.get('matched_terms', [])),
-                            service=result_data['service'],
-                            relevance_score=result_data.get('relevance_score', 0.0),
-                            file_size=result_data.get('file_size', 0)
-                        )
-                        db.session.add(result)
-                    
-                    all_results.extend(results)
-                    
-                    self._log_message(
-                        session_id, 'success', service_id, 
-                        f'Found {len(results)} matches'
-                    )
+                    results_count += self._search_service(session, service_id, params)
                     
                     # Update progress
                     progress = ((i + 1) / len(services)) * 100
-                    self._update_progress(session_id, progress, len(all_results))
+                    self._update_progress(session_id, progress, results_count)
                     
                 except Exception as e:
+                    db.session.rollback()
                     self._log_message(
                         session_id, 'error', service_id, 
                         f'Search failed: {str(e)}'
                     )
                 
                 # Small delay between services
-                time.sleep(1)
-            
-            # Update final session status
-            session.status = 'completed'
-            session.completed_at = datetime.utcnow()
-            session.results_count = len(all_results)
-            
-            if session.started_at:
-                duration = (session.completed_at - session.started_at).total_seconds()
-                session.duration = int(duration)
+                cancel.wait(1)
             
-            # Calculate success rate (mock calculation)
-            session.success_rate = min(95.0 + (len(all_results) / max_results) * 5, 100.0)
-            
-            db.session.commit()
+            # A stop request has already finalised the session
+            db.session.refresh(session)
+            if session.status != 'running':
+                self._recount_if_stopped(session)
+                return
             
-            self._log_message(
-                session_id, 'success', 'System', 
-                f'Search completed: {len(all_results)} total results found'
-            )
+            self._complete_session(session, results_count, params['max_results'])
             
         except Exception as e:
             # Handle session error
+            db.session.rollback()
+            self._log_message(session_id, 'error', 'System', f'Session failed: {str(e)}')
+            
             session = SearchSession.query.get(session_id)
-            if session:
-                session.status = 'error'
-                session.completed_at = datetime.utcnow()
+            if session and session.status == 'running':
+                self._finish_session(session, 'error')
                 db.session.commit()
-            
-            self._log_message(session_id, 'error', 'System', f'Session failed: {str(e)}')
         
         finally:
             # Clean up
-            if session_id in self.active_sessions:
+            if self.active_sessions.get(session_id) is cancel:
                 del self.active_sessions[session_id]
             if session_id in self.session_callbacks:
                 del self.session_callbacks[session_id]
     
-    def _generate_mock_results(self, service_id: str, search_terms: List[str], 
-                             file_types: List[str], max_results: int) -> List[Dict[str, Any]]:
-        """Generate mock results for services without real scrapers"""
-        results = []
+    def _session_params(self, session: SearchSession) -> Dict[str, Any]:
+        """Decode a session's JSON columns into search parameters"""
+        services = json.loads(session.services) if session.services else []
+        settings = json.loads(session.settings) if session.settings else {}
+        max_results = settings.get('maxResults', 1000)
         
-        # Generate a random number of results (0-5 for demo)
-        import random
-        num_results = random.randint(0, min(5, max_results))
+        return {
+            'search_terms': json.loads(session.search_terms) if session.search_terms else [],
+            'file_types': json.loads(session.file_types) if session.file_types else [],
+            'services': services,
+            'settings': settings,
+            'max_results': max_results,
+            'results_per_service': max_results // len(services) if services else max_results,
+        }
+    
+    def _search_service(self, session: SearchSession, service_id: str,
+                        params: Dict[str, Any]) -> int:
+        """Search a single service for a session and persist what it finds.
+        
+        Progress is checkpointed per service (see SessionCheckpoint): a
+        service finished by an earlier attempt is skipped and a partially
+        scanned one resumes where it left off. Returns the service's total
+        number of results.
+        """
+        checkpoint = SessionCheckpoint.open(session.id, service_id)
+        if checkpoint.status == 'done':
+            db.session.commit()
+            self._log_message(session.id, 'info', service_id,
+                              f'Already searched before the restart: {checkpoint.results_count} matches')
+            return checkpoint.results_count
         
-        for i in range(num_results):
-            paste_id = f"mock_{service_id}_{int(time.time())}_{i}"
+        scanned = checkpoint.keys()
+        if scanned:
+            self._log_message(session.id, 'info', service_id,
+                              f'Resuming search on {service_id} after {len(scanned)} scanned items')
+        else:
+            self._log_message(session.id, 'info', service_id, f'Starting search on {service_id}')
+        
+        remaining = max(params['results_per_service'] - checkpoint.results_count, 0)
+        cancel = self.active_sessions.get(session.id)
+        
+        if service_id in self.scrapers and remaining:
+            # Search through the feed shared with other sessions
+            matcher = CompiledMatcher.from_settings(
+                params['search_terms'], params['file_types'], params['settings']
+            )
+            # Relevance is weighed against what the service's pastes usually
+            # hold, and a query checks its rarest terms first
+            docs, total_length = ServiceCorpusStats.totals(service_id)
+            matcher.scorer = Bm25Scorer.from_statistics(
+                TermStats.counts_for(service_id, matcher.all_terms), docs, total_length
+            )
+            cursor = self._schedule_cursor(session, service_id, checkpoint)
+            # Pastes the user already holds a near-copy of are not matched again
+            known = ContentFingerprint.index_for(session.user_id) \
+                if params['settings'].get('skipNearDuplicates') else None
             
-            # Create mock content with search terms
-            mock_content = f"Mock content containing {random.choice(search_terms)} and other data..."
+            def save_batch(results, scanned_keys, observation, mark):
+                # Results, the checkpoint covering them and the corpus
+                # statistics gathered while scanning commit together
+                stored = self._persist_results(session, results)
+                high_water, boundary_keys = mark or (None, None)
+                checkpoint.record(scanned_keys, len(results), high_water, boundary_keys)
+                ServiceCorpusStats.record(service_id, observation)
+                db.session.commit()
+                # Streamed only once committed, so clients never see rolled back rows
+                for data in stored:
+                    self.events.publish_result(session.id, data)
             
-            result = {
-                'paste_id': paste_id,
-                'url': f"https://{service_id}.example.com/{paste_id}",
-                'title': f"Mock paste {i+1}",
-                'content_preview': mock_content,
-                'full_content': mock_content,
-                'file_type': random.choice(file_types) if file_types else 'txt',
-                'matched_terms': [random.choice(search_terms)],
-                'service': service_id,
-                'relevance_score': random.uniform(70.0, 95.0),
-                'file_size': len(mock_content)
-            }
+            found = self.feeds[service_id].search(
+                matcher, remaining, cancel=cancel, cursor=cursor,
+                scanned=scanned, known=known, on_batch=save_batch
+            )
             
-            results.append(result)
+            # A capped or interrupted scan left older items unscanned; keep the
+            # previous mark so the next run still covers them
+            if (cursor and cursor.high_water is not None
+                    and len(found) < remaining
+                    and not (cancel and cancel.cancelled)):
+                ScheduleWatermark.advance(session.schedule_id, service_id, cursor.high_water,
+                                          cursor.boundary_keys)
         
-        return results
+        # An interrupted scan stays resumable
+        if not (cancel and cancel.cancelled):
+            checkpoint.finish()
+        db.session.commit()
+        
+        self._log_message(
+            session.id, 'success', service_id, 
+            f'Found {checkpoint.results_count} matches'
+        )
+        return checkpoint.results_count
+    
+    def _schedule_cursor(self, session: SearchSession, service_id: str,
+                         checkpoint: SessionCheckpoint) -> Optional[ScanCursor]:
+        """Resume point for a scheduled run: where the schedule's last run stopped"""
+        if not session.schedule_id:
+            return None
+        
+        mark = db.session.get(ScheduleWatermark, (session.schedule_id, service_id))
+        cursor = ScanCursor(mark.high_water, mark.keys()) if mark else ScanCursor()
+        # A resumed run keeps the newest items it had already scanned
+        cursor.advance(checkpoint.high_water)
+        for key in checkpoint.boundary():
+            cursor.advance(checkpoint.high_water, key)
+        return cursor
+    
+    def _complete_session(self, session: SearchSession, results_count: int, max_results: int,
+                          was_running: Optional[bool] = None):
+        """Record final counts for a finished session and mark it completed"""
+        session.results_count = results_count
+        
+        # Calculate success rate (mock calculation)
+        session.success_rate = min(95.0 + (results_count / max_results) * 5, 100.0)
+        
+        # Logged first: live streams end with the final status event
+        self._log_message(
+            session.id, 'success', 'System', 
+            f'Search completed: {results_count} total results found'
+        )
+        
+        self._finish_session(session, 'completed', was_running)
+        
+        if session.started_at:
+            duration = (session.completed_at - session.started_at).total_seconds()
+            session.duration = int(duration)
+        
+        db.session.commit()
+    
+    def _persist_results(self, session: SearchSession,
+                         results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add scraped results, their term index rows and stats deltas to the current transaction.
+        
+        A paste that is a near-duplicate of one the user already holds is
+        linked to it through `duplicate_of` instead of storing its content again.
+        Returns the stored results as dicts, for the caller to publish once
+        it has committed.
+        """
+        if not results:
+            return []
+        
+        rows = []
+        for result_data in results:
+            content = result_data.get('full_content')
+            # Fingerprinted once, when the paste was evaluated
+            fingerprint = result_data.get('simhash') if content else None
+            cluster = ContentFingerprint.find(session.user_id, fingerprint) if fingerprint is not None else None
+            
+            result = SearchResult(
+                session_id=session.id,
+                paste_id=result_data['paste_id'],
+                url=result_data['url'],
+                title=result_data.get('title'),
+                content_preview=result_data.get('content_preview'),
+                full_content=None if cluster else content,
+                file_type=result_data.get('file_type'),
+                matched_terms=json.dumps(result_data.get('matched_terms', [])),
+                service=result_data['service'],
+                relevance_score=result_data.get('relevance_score', 0.0),
+                file_size=result_data.get('file_size', 0),
+                duplicate_of=cluster.result_id if cluster else None,
+                detections=json.dumps(result_data['detections']) if result_data.get('detections') else None,
+                match_offsets=json.dumps(result_data['match_offsets']) if result_data.get('match_offsets') else None,
+                decoded_from=json.dumps(result_data['decoded_from']) if result_data.get('decoded_from') else None
+            )
+            db.session.add(result)
+            if fingerprint is not None and not cluster:
+                db.session.add(ContentFingerprint.create(session.user_id, fingerprint, result))
+            rows.append((result, result_data.get('matched_terms', [])))
+        
+        # Flush to get result ids, then index matched terms in one batch
+        db.session.flush()
+        term_ids = Term.ids_for(term for _, terms in rows for term in terms)
+        links = {
+            (result.id, term_ids[Term.normalise(term)])
+            for result, terms in rows
+            for term in terms
+            if Term.normalise(term) in term_ids
+        }
+        if links:
+            db.session.execute(
+                db.insert(ResultTerm),
+                [{'result_id': result_id, 'term_id': term_id, 'session_id': session.id}
+                 for result_id, term_id in links]
+            )
+        
+        UserStats.increment(session.user_id, total_results=len(results))
+        
+        return [result.to_dict() for result, _ in rows]
     
     def _log_message(self, session_id: int, level: str, service: str, message: str):
         """Add a log message to the session"""
@@ -269,6 +621,8 @@ class ScraperManager:
         db.session.add(log)
         db.session.commit()
         
+        self.events.publish_log(session_id, log.to_dict())
+        
         # Call log callback if available
         callbacks = self.session_callbacks.get(session_id, {})
         if callbacks.get('log'):
@@ -276,6 +630,8 @@ class ScraperManager:
     
     def _update_progress(self, session_id: int, progress: float, results_count: int):
         """Update session progress"""
+        self.events.publish(session_id, 'progress', {'progress': progress, 'results_count': results_count})
+        
         callbacks = self.session_callbacks.get(session_id, {})
         if callbacks.get('progress'):
             callbacks['progress']({
@@ -299,9 +655,5 @@ class ScraperManager:
         for service_id, scraper in self.scrapers.items():
             results[service_id] = scraper.test_connection()
         
-        # Mock results for other services
-        for service in self.mock_services:
-            results[service['id']] = True  # Assume they work for demo
-        
         return results
 
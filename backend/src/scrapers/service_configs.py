@@ -0,0 +1,131 @@
+# Services scraped by ConfiguredScraper, keyed by service id. Adding a
+# service is a matter of adding an entry here.
+#
+#   name, base_url, rate_limit  as for BaseScraper (rate_limit in requests per minute)
+#   has_api                     whether the listing comes from an API (default False)
+#   listing_url                 page or endpoint listing recent pastes; `{limit}` is
+#                               replaced by the number of items wanted
+#   max_listing                 most items one listing returns (optional)
+#   listing_format              'html' (default) or 'json'
+#   item_pattern                html: regex run over the listing page, one match per
+#                               paste, with a `key` group and optionally `title`,
+#                               `date`, `syntax` and `filename` groups; anchor it to
+#                               the listing's markup so site navigation doesn't match
+#   items_path, fields          json: keys leading to the list of pastes, and the
+#                               record field holding each of key/title/date/syntax/filename
+#   raw_url                     raw content of a paste, with `{key}` replaced
+#   content_format              'text' (default) if raw_url serves the paste as is, or
+#                               'html' to extract it from a page
+#   content_pattern             html: regex whose `content` group is the part of the
+#                               page holding the paste (optional; default the whole page)
+#   content_element             html: regex matching the opening tag of the element
+#                               holding the paste, which runs to its matching closing
+#                               tag; for containers with nested elements of their own
+#                               kind (optional, instead of content_pattern)
+#   paste_url                   link shown with results, with `{key}` replaced
+#
+# Dates may be unix timestamps or ISO 8601 strings.
+SERVICE_CONFIGS = {
+    'paste_ee': {
+        'name': 'paste.ee',
+        'base_url': 'https://paste.ee',
+        'rate_limit': 20,
+        'listing_url': 'https://paste.ee/latest',
+        'item_pattern': r'<a href="(?:https://paste\.ee)?/p/(?P<key>[A-Za-z0-9]{5,})"[^>]*>(?P<title>[^<]*)</a>',
+        'raw_url': 'https://paste.ee/r/{key}',
+        'paste_url': 'https://paste.ee/p/{key}',
+    },
+    'dpaste': {
+        'name': 'dpaste.org',
+        'base_url': 'https://dpaste.org',
+        'rate_limit': 30,
+        'listing_url': 'https://dpaste.org/history/',
+        'item_pattern': r'<td[^>]*>\s*<a href="/(?P<key>[A-Za-z0-9]{4,})"[^>]*>(?P<title>[^<]*)</a>',
+        'raw_url': 'https://dpaste.org/{key}/raw',
+        'paste_url': 'https://dpaste.org/{key}',
+    },
+    'nekobin': {
+        'name': 'nekobin.com',
+        'base_url': 'https://nekobin.com',
+        'rate_limit': 15,
+        'has_api': True,
+        'listing_url': 'https://nekobin.com/api/documents/recent?limit={limit}',
+        'max_listing': 100,
+        'listing_format': 'json',
+        'items_path': ('result',),
+        'fields': {'key': 'key', 'title': 'title', 'date': 'created_at'},
+        'raw_url': 'https://nekobin.com/raw/{key}',
+        'paste_url': 'https://nekobin.com/{key}',
+    },
+    'rentry': {
+        'name': 'rentry.co',
+        'base_url': 'https://rentry.co',
+        'rate_limit': 25,
+        'listing_url': 'https://rentry.co/recent',
+        'item_pattern': r'<td[^>]*>\s*<a href="/(?P<key>[A-Za-z0-9_-]{3,})"[^>]*>(?P<title>[^<]*)</a>',
+        'raw_url': 'https://rentry.co/{key}/raw',
+        'paste_url': 'https://rentry.co/{key}',
+    },
+    'hastebin': {
+        'name': 'hastebin.com',
+        'base_url': 'https://hastebin.com',
+        'rate_limit': 10,
+        'listing_url': 'https://hastebin.com/recent',
+        'item_pattern': r'<a href="/(?:share/)?(?P<key>[a-z0-9]{8,})(?:\.(?P<syntax>\w+))?"',
+        'raw_url': 'https://hastebin.com/raw/{key}',
+        'paste_url': 'https://hastebin.com/share/{key}',
+    },
+    'gitlab': {
+        'name': 'GitLab Snippets',
+        'base_url': 'https://gitlab.com',
+        'rate_limit': 120,
+        'has_api': True,
+        'listing_url': 'https://gitlab.com/api/v4/snippets/public?per_page={limit}',
+        'max_listing': 100,
+        'listing_format': 'json',
+        'items_path': (),
+        'fields': {'key': 'id', 'title': 'title', 'date': 'created_at', 'filename': 'file_name'},
+        'raw_url': 'https://gitlab.com/api/v4/snippets/{key}/raw',
+        'paste_url': 'https://gitlab.com/-/snippets/{key}',
+    },
+    'ubuntu_paste': {
+        'name': 'paste.ubuntu.com',
+        'base_url': 'https://paste.ubuntu.com',
+        'rate_limit': 20,
+        'listing_url': 'https://paste.ubuntu.com/',
+        'item_pattern': r'<a href="/p/(?P<key>[A-Za-z0-9]{6,})/"[^>]*>(?P<title>[^<]*)</a>',
+        'raw_url': 'https://paste.ubuntu.com/p/{key}/plain/',
+        'paste_url': 'https://paste.ubuntu.com/p/{key}/',
+    },
+    'justpaste': {
+        'name': 'justpaste.it',
+        'base_url': 'https://justpaste.it',
+        'rate_limit': 15,
+        'listing_url': 'https://justpaste.it/latest',
+        'item_pattern': r'<a href="(?:https://justpaste\.it)?/(?P<key>[a-z0-9]{4,})"[^>]*>(?P<title>[^<]*)</a>',
+        'raw_url': 'https://justpaste.it/{key}',
+        'content_format': 'html',
+        'content_pattern': r'(?s)<div[^>]+id="articleContent"[^>]*>(?P<content>.*?)<div[^>]+class="articleFooter',
+        'paste_url': 'https://justpaste.it/{key}',
+    },
+    'controlc': {
+        'name': 'controlc.com',
+        'base_url': 'https://controlc.com',
+        'rate_limit': 25,
+        'listing_url': 'https://controlc.com/recent',
+        'item_pattern': r'<a href="(?:https://controlc\.com)?/(?P<key>[0-9a-f]{8})"[^>]*>(?P<title>[^<]*)</a>',
+        'raw_url': 'https://controlc.com/{key}',
+        'content_format': 'html',
+        'content_element': r'<div[^>]+id="paste_content"[^>]*>',
+        'paste_url': 'https://controlc.com/{key}',
+    },
+    'ideone': {
+        'name': 'ideone.com',
+        'base_url': 'https://ideone.com',
+        'rate_limit': 40,
+        'listing_url': 'https://ideone.com/recent',
+        'item_pattern': r'<a href="/(?P<key>[A-Za-z0-9]{6})"[^>]*>#(?P=key)</a>',
+        'raw_url': 'https://ideone.com/plain/{key}',
+        'paste_url': 'https://ideone.com/{key}',
+    },
+}
@@ -0,0 +1,358 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from flask import current_app, has_app_context
+
+from .base_scraper import BaseScraper, ScanCursor
+from .cancellation import CancellationToken, ScrapeCancelled
+from .matcher import CompiledMatcher, PasteDocument
+from .relevance import CorpusObservation
+from src.utils.simhash import NearDuplicateIndex
+
+# `offer` evaluates the item itself unless handed a precomputed result
+EVALUATE = object()
+
+# A cursor's (high_water, boundary_keys) as of a drain; None without a cursor
+CursorMark = Optional[Tuple[Optional[float], FrozenSet[str]]]
+
+# Evaluations sent to the match pool, each with the call that offers its results
+PendingDeliveries = Dict[Future, Callable[[], None]]
+
+
+class FeedSubscription:
+    """One session's interest in a service feed"""
+    
+    def __init__(self, matcher: CompiledMatcher, max_results: int, listing_limit: int,
+                 required_pass: int, cursor: Optional[ScanCursor] = None,
+                 scanned: Optional[Set[str]] = None, known: Optional[NearDuplicateIndex] = None):
+        self.matcher = matcher
+        self.cursor = cursor
+        self.known = known  # near-duplicates of these are skipped unevaluated
+        self.max_results = max_results
+        self.listing_limit = listing_limit
+        self.required_pass = required_pass  # first pass that started after subscribing
+        self.results: List[Dict[str, Any]] = []
+        self.seen = set(scanned or ())
+        self.corpus = CorpusObservation()  # statistics for the service's BM25 scorer
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self._drained = 0
+        self._fresh: Set[str] = set()  # keys scanned since the last drain
+    
+    def wants(self, key: str, watermark: Optional[float]) -> bool:
+        """Whether an item still needs evaluating for this subscription"""
+        if key in self.seen:
+            return False
+        return self.cursor is None or self.cursor.wants(watermark, key)
+    
+    def skips(self, document: PasteDocument) -> bool:
+        """Whether a paste is a near-duplicate of one already known to the session"""
+        return self.known is not None and self.known.find(document.simhash) is not None
+    
+    def offer(self, scraper: BaseScraper, key: str, item: Dict[str, Any],
+              document: Optional[PasteDocument], watermark: Optional[float],
+              result: Any = EVALUATE):
+        """Evaluate an item once for this subscription, or take `result` computed elsewhere"""
+        with self._lock:
+            if self.done.is_set() or not self.wants(key, watermark):
+                return
+            self.seen.add(key)
+            self._fresh.add(key)
+            if self.cursor is not None:
+                self.cursor.advance(watermark, key)
+            if document is None or self.skips(document):
+                return
+            
+            if result is EVALUATE:
+                result = scraper.evaluate(item, document, self.matcher)
+            # Only what evaluation already looked for counts; nothing is searched here
+            self.corpus.observe(len(document.content), self.matcher.checked(document))
+            if result:
+                if self.known is not None:
+                    self.known.add(document.simhash)
+                self.results.append(result)
+                if len(self.results) >= self.max_results:
+                    self.done.set()
+    
+    def drain(self) -> Tuple[List[Dict[str, Any]], Set[str], CorpusObservation, CursorMark]:
+        """Results found, keys scanned and corpus statistics gathered since the last drain.
+        
+        The cursor's mark is taken in the same step, so it covers exactly
+        the keys scanned up to this drain while the pump keeps advancing it.
+        """
+        with self._lock:
+            batch = self.results[self._drained:self.max_results]
+            self._drained += len(batch)
+            fresh, self._fresh = self._fresh, set()
+            mark = (self.cursor.high_water, frozenset(self.cursor.boundary_keys)) if self.cursor else None
+            return batch, fresh, self.corpus.take(), mark
+
+
+class ServiceFeed:
+    """Shared ingestion loop for one service.
+    
+    Every session searching the service subscribes its compiled matcher to
+    the feed. A single pump thread lists recent items, downloads each one
+    once and fans the content out to all subscribers, so network cost grows
+    with the rate of new pastes rather than with the number of sessions.
+    Recently fetched items are kept in a bounded cache and replayed to
+    sessions that subscribe mid-pass.
+    
+    A subscription completes when it reaches its result limit, when the
+    feed finishes a full listing pass that started after it subscribed, or
+    when its session is cancelled. Once no subscription is waiting, the
+    pass in progress is cancelled too, abandoning its in-flight request.
+    
+    With a `match_pool`, evaluation moves to worker processes: the pump
+    hands each fetched item off and goes on fetching, and a pass only ends
+    once every item it dispatched has been evaluated. Results are offered
+    to the subscriptions by the thread that dispatched the item, not by the
+    pool's result handler thread, which every pool task shares.
+    """
+    
+    def __init__(self, scraper: BaseScraper, cache_items: int = 1000,
+                 cache_bytes: int = 64 * 1024 * 1024):
+        self.scraper = scraper
+        self.cache_items = cache_items
+        self.cache_bytes = cache_bytes
+        self.logger = logging.getLogger(f'feed.{scraper.service_id}')
+        
+        self._lock = threading.Lock()
+        self._subscriptions: List[FeedSubscription] = []
+        self._cache: 'OrderedDict[str, Tuple[Dict[str, Any], PasteDocument]]' = OrderedDict()
+        self._cached_bytes = 0
+        self._pass_number = 0
+        self._pump_thread = None
+        self._pass_cancel = CancellationToken()
+        self._app = None
+        self.match_pool = None  # MatchPool evaluating items off the pump thread, if any
+    
+    def search(self, matcher: CompiledMatcher, max_results: int,
+               cancel: Optional[CancellationToken] = None,
+               cursor: Optional[ScanCursor] = None,
+               scanned: Optional[Set[str]] = None,
+               known: Optional[NearDuplicateIndex] = None,
+               on_batch: Optional[Callable[[List[Dict[str, Any]], Set[str], CorpusObservation, CursorMark],
+                                           None]] = None,
+               batch_seconds: float = 5.0) -> List[Dict[str, Any]]:
+        """Subscribe a matcher and block until its search is complete.
+        
+        When `cancel` fires the subscription is dropped at once and the
+        results found so far are returned. With a `cursor`, items older than
+        its high-water mark are skipped and the cursor is advanced past
+        every item evaluated. Keys in `scanned` (from a checkpoint) are
+        skipped without being fetched, and pastes that are near-duplicates
+        of a fingerprint in `known` are skipped before matching.
+        
+        With `on_batch`, the calling thread is handed the results, keys
+        scanned and corpus statistics gathered since its previous call, and
+        the cursor's mark as of those keys, every `batch_seconds` and once
+        more at the end, so it can persist progress while the scan runs.
+        """
+        if has_app_context() and self._app is None:
+            self._app = current_app._get_current_object()
+        
+        with self._lock:
+            subscription = FeedSubscription(
+                matcher, max_results, self.scraper.listing_limit(max_results),
+                required_pass=self._pass_number + 1, cursor=cursor, scanned=scanned,
+                known=known
+            )
+            self._subscriptions.append(subscription)
+            cached = list(self._cache.items())
+            self._ensure_pump()
+        
+        remove = cancel.on_cancel(subscription.done.set) if cancel else None
+        try:
+            # Replay what the feed already holds; no network involved
+            deliveries: PendingDeliveries = {}
+            for key, (item, document) in cached:
+                delivery = self._evaluate(key, item, document, self.scraper.item_watermark(item),
+                                          [subscription])
+                if delivery is not None:
+                    deliveries[delivery[0]] = delivery[1]
+            self._deliver(deliveries, ALL_COMPLETED)
+            
+            while not subscription.done.wait(batch_seconds if on_batch else None):
+                on_batch(*subscription.drain())
+        finally:
+            if remove:
+                remove()
+            with self._lock:
+                if subscription in self._subscriptions:
+                    self._subscriptions.remove(subscription)
+                # Captured under the lock: a pass started later is not affected
+                abandoned = None if any(not s.done.is_set() for s in self._subscriptions) \
+                    else self._pass_cancel
+            if abandoned:
+                abandoned.cancel()
+        
+        if on_batch:
+            on_batch(*subscription.drain())
+        
+        with subscription._lock:
+            return subscription.results[:max_results]
+    
+    def _ensure_pump(self):
+        """Start the pump thread if it is not running (caller holds the lock)"""
+        if self._pump_thread is None or not self._pump_thread.is_alive():
+            self._pump_thread = threading.Thread(
+                target=self._pump_in_context, name=f'feed-{self.scraper.service_id}', daemon=True
+            )
+            self._pump_thread.start()
+    
+    def _pump_in_context(self):
+        # Shared rate budgets use the database, which needs an app context
+        if self._app is not None:
+            with self._app.app_context():
+                self._pump()
+        else:
+            self._pump()
+    
+    def _active(self) -> List[FeedSubscription]:
+        with self._lock:
+            return [s for s in self._subscriptions if not s.done.is_set()]
+    
+    def _pump(self):
+        """Run listing passes while any subscription is waiting"""
+        while True:
+            with self._lock:
+                active = [s for s in self._subscriptions if not s.done.is_set()]
+                if not active:
+                    self._pump_thread = None
+                    return
+                self._pass_number += 1
+                pass_number = self._pass_number
+                limit = max(s.listing_limit for s in active)
+                self._pass_cancel = CancellationToken()
+                cancel = self._pass_cancel
+            
+            try:
+                with self.scraper.cancellable(cancel):
+                    self._run_pass(limit)
+            except ScrapeCancelled:
+                self.logger.info(f"Pass {pass_number} abandoned: no session is waiting")
+            
+            # Everyone who subscribed before this pass started has now seen it
+            with self._lock:
+                for subscription in self._subscriptions:
+                    if subscription.required_pass <= pass_number:
+                        subscription.done.set()
+    
+    def _run_pass(self, limit: int):
+        """List recent items once and dispatch them to the waiting subscriptions"""
+        try:
+            items = self.scraper.list_items(limit)
+        except Exception as e:
+            self.logger.error(f"Listing failed: {e}")
+            items = []
+        
+        pending: PendingDeliveries = {}
+        try:
+            for item in items:
+                targets = self._active()
+                if not targets:
+                    break
+                try:
+                    delivery = self._dispatch(item, targets)
+                except Exception as e:
+                    self.logger.error(f"Failed to process item: {e}")
+                    continue
+                if delivery is not None:
+                    pending[delivery[0]] = delivery[1]
+                    # Offer what is evaluated so far, waiting while the pool
+                    # holds its limit of items (which bounds their memory)
+                    full = len(pending) >= self.match_pool.max_pending
+                    self._deliver(pending, FIRST_COMPLETED if full else None)
+        finally:
+            # The pass is over once every item it fetched has been evaluated
+            self._deliver(pending, ALL_COMPLETED)
+    
+    def _deliver(self, pending: PendingDeliveries, return_when: Optional[str] = None):
+        """Offer the results of finished pool evaluations and drop them from `pending`.
+        
+        With `return_when` (as for `concurrent.futures.wait`), waits for the
+        pending evaluations first.
+        """
+        if return_when and pending:
+            wait(pending, return_when=return_when)
+        for future in [future for future in pending if future.done()]:
+            try:
+                pending.pop(future)()
+            except Exception as e:
+                self.logger.error(f"Failed to process item: {e}")
+    
+    def _dispatch(self, item: Dict[str, Any], targets: List[FeedSubscription]
+                  ) -> Optional[Tuple[Future, Callable[[], None]]]:
+        """Fetch an item at most once and offer it to every waiting subscription.
+        
+        If the evaluation went to the match pool, returns its future and the
+        call that offers its results once it is done (see `_deliver`).
+        """
+        key = self.scraper.item_key(item)
+        watermark = self.scraper.item_watermark(item)
+        targets = [s for s in targets if s.wants(key, watermark)]
+        if not targets:
+            return None
+        
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached:
+                self._cache.move_to_end(key)
+        
+        if cached:
+            document = cached[1]
+        else:
+            content = self.scraper.fetch_item_content(item)
+            document = PasteDocument(content) if content else None
+            if document is not None:
+                self._remember(key, item, document)
+        
+        return self._evaluate(key, item, document, watermark, targets)
+    
+    def _evaluate(self, key: str, item: Dict[str, Any], document: Optional[PasteDocument],
+                  watermark: Optional[float], targets: List[FeedSubscription]
+                  ) -> Optional[Tuple[Future, Callable[[], None]]]:
+        """Offer an item to `targets`, evaluating it in the match pool if there is one"""
+        targets = [s for s in targets if s.wants(key, watermark)]
+        if self.match_pool is not None and document is not None:
+            # Known near-duplicates are dropped here rather than sent to the pool
+            skipped = [s for s in targets if s.skips(document)]
+            for subscription in skipped:
+                subscription.offer(self.scraper, key, item, document, watermark)
+            targets = [s for s in targets if s not in skipped]
+        if self.match_pool is None or document is None or not targets:
+            for subscription in targets:
+                subscription.offer(self.scraper, key, item, document, watermark)
+            return None
+        
+        def deliver():
+            try:
+                results = self.match_pool.results(future, document)
+            except Exception as e:
+                self.logger.error(f"Match pool failed, evaluating in-process: {e}")
+                results = [EVALUATE] * len(targets)
+            for subscription, result in zip(targets, results):
+                subscription.offer(self.scraper, key, item, document, watermark, result)
+        
+        try:
+            future = self.match_pool.submit(self.scraper, item, document, [s.matcher for s in targets])
+        except Exception as e:
+            self.logger.error(f"Match pool unavailable, evaluating in-process: {e}")
+            for subscription in targets:
+                subscription.offer(self.scraper, key, item, document, watermark)
+            return None
+        return future, deliver
+    
+    def _remember(self, key: str, item: Dict[str, Any], document: PasteDocument):
+        """Add an item to the replay cache, evicting the oldest beyond the limits"""
+        with self._lock:
+            self._cache[key] = (item, document)
+            self._cached_bytes += len(document.content)
+            while self._cache and (len(self._cache) > self.cache_items
+                                   or self._cached_bytes > self.cache_bytes):
+                _, (_, evicted) = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted.content)
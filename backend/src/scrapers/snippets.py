@@ -0,0 +1,63 @@
+from typing import Dict, List, Tuple
+
+PREVIEW_CHARS = 500
+CONTEXT_CHARS = 80   # shown on each side of a hit
+MAX_WINDOWS = 4
+WORD_SLACK = 15      # how far a window edge may move to avoid cutting a word
+ELLIPSIS = '…'
+
+
+def _widen(content: str, start: int, end: int) -> Tuple[int, int]:
+    """Window of context around a hit, with its edges moved to whitespace"""
+    low = max(start - CONTEXT_CHARS, 0)
+    high = min(end + CONTEXT_CHARS, len(content))
+    if low > 0:
+        space = content.rfind(' ', max(low - WORD_SLACK, 0), low + WORD_SLACK)
+        if space != -1 and space < start:
+            low = space + 1
+    if high < len(content):
+        space = content.find(' ', max(high - WORD_SLACK, end), high + WORD_SLACK)
+        if space != -1:
+            high = space
+    return low, high
+
+
+def keyword_in_context(content: str, spans: Dict[str, List[Tuple[int, int]]]) -> str:
+    """Preview of a paste made of context windows around its first hits.
+    
+    `spans` maps each matched term to the (start, end) of its first
+    occurrences, as `CompiledMatcher.spans` returns them. Windows around the
+    earliest hits are merged where they overlap and joined with an ellipsis
+    until PREVIEW_CHARS is reached. Without hits (a paste matched by secret
+    detection alone) the preview is the start of the paste.
+    """
+    hits = sorted(span for term_spans in spans.values() for span in term_spans)
+    if not hits:
+        return content[:PREVIEW_CHARS] + '...' if len(content) > PREVIEW_CHARS else content
+    
+    windows: List[List[int]] = []
+    used = 0
+    for start, end in hits:
+        if windows and start < windows[-1][1]:
+            continue  # already shown
+        low, high = _widen(content, start, end)
+        if windows and low <= windows[-1][1]:
+            used += high - windows[-1][1]
+            windows[-1][1] = high
+        elif len(windows) < MAX_WINDOWS:
+            windows.append([low, high])
+            used += high - low
+        else:
+            break
+        if used >= PREVIEW_CHARS:
+            break
+    
+    preview = f' {ELLIPSIS} '.join(content[low:high].strip() for low, high in windows)
+    if len(preview) > PREVIEW_CHARS:
+        preview = preview[:PREVIEW_CHARS].rstrip()
+        return f'{ELLIPSIS} {preview} {ELLIPSIS}' if windows[0][0] > 0 else f'{preview} {ELLIPSIS}'
+    if windows[0][0] > 0:
+        preview = f'{ELLIPSIS} {preview}'
+    if windows[-1][1] < len(content):
+        preview = f'{preview} {ELLIPSIS}'
+    return preview
@@ -0,0 +1 @@
+# Shared helpers used by the API routes and background jobs
@@ -0,0 +1,172 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import select
+
+from src.models.scraper import SearchSession, SearchResult, db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; columnar formats are disabled without it
+    pa = None
+    pq = None
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.file'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+COLUMNAR_FORMATS = {
+    'arrow': (ARROW_MIMETYPE, 'arrow'),
+    'parquet': (PARQUET_MIMETYPE, 'parquet'),
+}
+
+# Every listing field is exported, so archives hold what the JSON listings
+# return; these are stored as JSON text and decoded into nested columns
+_JSON_FIELDS = {
+    'matched_terms': list,
+    'detections': dict,
+    'match_offsets': dict,
+    'decoded_from': list,
+}
+
+
+def columnar_export_available() -> bool:
+    """Return True when pyarrow is installed and columnar exports can be built"""
+    return pa is not None
+
+
+def results_schema(include_content: bool = False) -> 'pa.Schema':
+    """Arrow schema used for session result archives: one column per listing field"""
+    dictionary_string = pa.dictionary(pa.int32(), pa.string())
+    field_types = {
+        'id': (pa.int64(), False),
+        'session_id': (pa.int64(), False),
+        'paste_id': (pa.string(), False),
+        'url': (pa.string(), False),
+        'title': (pa.string(), True),
+        'content_preview': (pa.string(), True),
+        'file_type': (dictionary_string, True),
+        'matched_terms': (pa.list_(pa.string()), False),
+        'service': (dictionary_string, False),
+        'discovered_at': (pa.timestamp('us'), True),
+        'relevance_score': (pa.float64(), True),
+        'file_size': (pa.int64(), True),
+        'duplicate_of': (pa.int64(), True),
+        # {detector: hits}
+        'detections': (pa.map_(pa.string(), pa.int64()), False),
+        # {term: [(start, end), ...]}
+        'match_offsets': (pa.map_(pa.string(), pa.list_(pa.list_(pa.int64(), 2))), False),
+        'decoded_from': (pa.list_(pa.string()), False),
+    }
+    fields = [pa.field(name, *field_types[name]) for name in SearchResult.LISTING_FIELDS]
+    if include_content:
+        fields.append(pa.field('full_content', pa.string()))
+    return pa.schema(fields)
+
+
+def _column_value(name: str, value: Any) -> Any:
+    """Convert a stored column value to what its Arrow column takes"""
+    kind = _JSON_FIELDS.get(name)
+    if kind is None:
+        return value
+    decoded = json.loads(value) if value else kind()
+    # Arrow map columns are built from (key, value) pairs
+    return list(decoded.items()) if kind is dict else decoded
+
+
+def _iter_result_batches(session_id: int, include_content: bool,
+                         batch_size: int) -> Iterator['pa.RecordBatch']:
+    """Stream result rows from SQL into Arrow record batches"""
+    schema = results_schema(include_content)
+    columns = SearchResult.listing_columns()
+    if include_content:
+        columns.append(SearchResult.content_column())
+
+    statement = select(*columns)\
+        .where(SearchResult.session_id == session_id)\
+        .order_by(SearchResult.id)\
+        .execution_options(yield_per=batch_size)
+
+    for rows in db.session.execute(statement).partitions():
+        data: Dict[str, List[Any]] = {name: [] for name in schema.names}
+        for row in rows:
+            for name, value in row._mapping.items():
+                data[name].append(_column_value(name, value))
+
+        arrays = []
+        for field in schema:
+            if pa.types.is_dictionary(field.type):
+                arrays.append(pa.array(data[field.name], type=pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(data[field.name], type=field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def build_results_table(session: SearchSession, include_content: bool = False,
+                        batch_size: int = 10000) -> 'pa.Table':
+    """Build an Arrow table holding every result of a session.
+
+    `service` and `file_type` are dictionary encoded with a single dictionary
+    per column, so the table can be written to the IPC file format and read
+    back with zero copies.
+    """
+    schema = results_schema(include_content)
+    batches = list(_iter_result_batches(session.id, include_content, batch_size))
+    table = pa.Table.from_batches(batches, schema=schema).unify_dictionaries().combine_chunks()
+
+    metadata = {
+        'session_id': str(session.id),
+        'session_name': session.name,
+        'search_terms': session.search_terms or '[]',
+        'services': session.services or '[]',
+        'exported_at': datetime.utcnow().isoformat(),
+    }
+    return table.replace_schema_metadata(metadata)
+
+
+def write_session_archive(session: SearchSession, sink: Any, format_type: str = 'arrow',
+                          include_content: bool = False) -> None:
+    """Write a session's results to `sink` (a path or writable file) as Arrow IPC or Parquet.
+
+    Arrow IPC archives are written uncompressed so they can be memory-mapped
+    with `open_session_archive`; Parquet archives are zstd-compressed for
+    long-term storage and transfer.
+    """
+    if format_type not in COLUMNAR_FORMATS:
+        raise ValueError(f'Unsupported columnar format: {format_type}')
+
+    table = build_results_table(session, include_content)
+
+    if format_type == 'parquet':
+        pq.write_table(table, sink, compression='zstd')
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def export_session_bytes(session: SearchSession, format_type: str = 'arrow',
+                         include_content: bool = False) -> bytes:
+    """Serialise a session's results into an in-memory columnar archive"""
+    sink = pa.BufferOutputStream()
+    write_session_archive(session, sink, format_type, include_content)
+    return sink.getvalue().to_pybytes()
+
+
+def open_session_archive(path: str) -> 'pa.Table':
+    """Memory-map an Arrow IPC session archive for zero-copy analysis.
+
+    The returned table references the mapped file directly, so columns can be
+    handed to pandas (`table.to_pandas()`) or polars without loading the whole
+    archive into memory first.
+    """
+    if pa is None:
+        raise RuntimeError('pyarrow is required to open session archives')
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def archive_filename(session: SearchSession, format_type: str) -> str:
+    """Download filename for a session archive"""
+    extension = COLUMNAR_FORMATS[format_type][1]
+    return f'session_{session.id}_results.{extension}'
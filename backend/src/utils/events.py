@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Statuses after which a session produces no further events
+FINAL_STATUSES = ('completed', 'stopped', 'error')
+
+
+class SessionEvent(NamedTuple):
+    seq: int
+    session_id: int
+    event: str  # log, progress, result, status or snapshot
+    data: Dict[str, Any]
+
+
+class EventBus:
+    """In-process fan-out of session events to Server-Sent Events streams.
+    
+    Every event gets a sequence number from one counter and is kept in a
+    bounded per-session buffer, so a client that reconnects with
+    `Last-Event-ID` is sent exactly what it missed. Event ids carry an epoch
+    unique to this process; an id from another process or lifetime, or one
+    that has fallen out of the buffer, cannot be resumed and the caller
+    sends a fresh snapshot instead.
+    
+    Log, result and status events may reach the bus twice, from the scraper
+    running here and from the database relay; `publish_log`,
+    `publish_result` and `publish_status` drop the repeats.
+    """
+    
+    def __init__(self, buffer_size: int = 500, max_sessions: int = 1000):
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self.buffer_size = buffer_size
+        self.max_sessions = max_sessions
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._buffers: 'OrderedDict[int, deque]' = OrderedDict()
+        self._dropped: Dict[int, int] = {}  # session_id -> seq of the newest evicted event
+        self._last_log_id: Dict[int, int] = {}
+        self._last_result_id: Dict[int, int] = {}
+        self._last_status: Dict[int, str] = {}
+        self._watchers: Dict[int, int] = {}
+    
+    def publish(self, session_id: int, event: str, data: Dict[str, Any]) -> SessionEvent:
+        """Append an event to the session's buffer and wake its streams"""
+        with self._cond:
+            return self._append(session_id, event, data)
+    
+    def publish_log(self, session_id: int, log: Dict[str, Any]) -> bool:
+        """Publish a SearchLog dict unless a log with this id was already sent"""
+        with self._cond:
+            if log['id'] <= self._last_log_id.get(session_id, 0):
+                return False
+            self._last_log_id[session_id] = log['id']
+            self._append(session_id, 'log', log)
+            return True
+    
+    def publish_result(self, session_id: int, result: Dict[str, Any]) -> bool:
+        """Publish a SearchResult dict unless a result with this id was already sent"""
+        with self._cond:
+            if result['id'] <= self._last_result_id.get(session_id, 0):
+                return False
+            self._last_result_id[session_id] = result['id']
+            self._append(session_id, 'result', result)
+            return True
+    
+    def publish_status(self, session_id: int, status: str, **extra) -> bool:
+        """Publish a status change; repeats of the current status are dropped"""
+        with self._cond:
+            if self._last_status.get(session_id) == status:
+                return False
+            self._last_status[session_id] = status
+            self._append(session_id, 'status', {'status': status, **extra})
+            return True
+    
+    def note_log_id(self, session_id: int, log_id: int):
+        """Record that logs up to `log_id` were already delivered (e.g. in a snapshot)"""
+        with self._cond:
+            if log_id >= self._last_log_id.get(session_id, 0):
+                self._last_log_id[session_id] = log_id
+    
+    def last_log_id(self, session_id: int) -> Optional[int]:
+        with self._cond:
+            return self._last_log_id.get(session_id)
+    
+    def note_result_id(self, session_id: int, result_id: int):
+        """Record that results up to `result_id` need not be sent (e.g. they predate a snapshot)"""
+        with self._cond:
+            if result_id >= self._last_result_id.get(session_id, 0):
+                self._last_result_id[session_id] = result_id
+    
+    def last_result_id(self, session_id: int) -> Optional[int]:
+        with self._cond:
+            return self._last_result_id.get(session_id)
+    
+    def _append(self, session_id: int, event: str, data: Dict[str, Any]) -> SessionEvent:
+        """Buffer an event (caller holds the condition)"""
+        self._seq += 1
+        item = SessionEvent(self._seq, session_id, event, data)
+        
+        buffer = self._buffers.get(session_id)
+        if buffer is None:
+            buffer = self._buffers[session_id] = deque()
+        self._buffers.move_to_end(session_id)
+        buffer.append(item)
+        if len(buffer) > self.buffer_size:
+            self._dropped[session_id] = buffer.popleft().seq
+        
+        # Forget the least recently active sessions nobody is watching
+        while len(self._buffers) > self.max_sessions:
+            oldest = next((sid for sid in self._buffers if not self._watchers.get(sid)), None)
+            if oldest is None:
+                break
+            del self._buffers[oldest]
+            for state in (self._dropped, self._last_log_id, self._last_result_id, self._last_status):
+                state.pop(oldest, None)
+        
+        self._cond.notify_all()
+        return item
+    
+    def last_seq(self) -> int:
+        with self._cond:
+            return self._seq
+    
+    def event_id(self, seq: int) -> str:
+        return f'{self.epoch}-{seq}'
+    
+    def parse_event_id(self, value: Optional[str]) -> Optional[int]:
+        """Sequence number of a `Last-Event-ID` issued by this bus, else None"""
+        epoch, _, seq = (value or '').partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+    
+    def since(self, session_id: int, seq: int) -> Optional[List[SessionEvent]]:
+        """Buffered events after `seq`, or None if some were already evicted"""
+        with self._cond:
+            if seq < self._dropped.get(session_id, 0) or seq > self._seq:
+                return None
+            return [item for item in self._buffers.get(session_id, ()) if item.seq > seq]
+    
+    def wait(self, session_id: int, after: int, timeout: float) -> List[SessionEvent]:
+        """Block until the session has events after `after`, or `timeout` passes"""
+        def pending():
+            buffer = self._buffers.get(session_id)
+            return bool(buffer) and buffer[-1].seq > after
+        
+        with self._cond:
+            self._cond.wait_for(pending, timeout)
+            return [item for item in self._buffers.get(session_id, ()) if item.seq > after]
+    
+    @contextmanager
+    def watch(self, session_id: int):
+        """Register an open stream for the duration of the block"""
+        with self._cond:
+            self._watchers[session_id] = self._watchers.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._watchers[session_id] -= 1
+                if not self._watchers[session_id]:
+                    del self._watchers[session_id]
+    
+    def watched(self) -> List[int]:
+        """Sessions with at least one open stream"""
+        with self._cond:
+            return list(self._watchers)
+
+
+def format_sse(event_id: Optional[str], event: str, data: Any) -> str:
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.extend(f'data: {line}' for line in json.dumps(data).splitlines())
+    return '\n'.join(lines) + '\n\n'
@@ -0,0 +1,115 @@
+import gzip
+import hashlib
+from typing import Callable, Optional
+
+from flask import Response, request
+
+from src.models.scraper import SearchSession, SearchResult, db
+from src.utils.events import FINAL_STATUSES
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is used without it
+    brotli = None
+
+# Finished sessions only change if they are re-run or touched by retention,
+# and both change their ETag; browsers may reuse them without asking
+FINISHED_CACHE_CONTROL = 'private, max-age=300'
+ACTIVE_CACHE_CONTROL = 'private, no-cache'
+
+MIN_COMPRESS_BYTES = 1024
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'text/plain', 'text/csv', 'text/html', 'text/css', 'application/javascript'
+)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Compressed variants get their own strong ETag, as the bytes differ
+ENCODING_ETAG_SUFFIXES = {'br': '-br', 'gzip': '-gzip'}
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag value for the given representation-defining parts"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+
+def session_etag(session: SearchSession, *parts) -> str:
+    """ETag of a view of a session's results.
+    
+    Derived from the session's state, its result count and newest result
+    id (one indexed query) and `results_updated_at`, plus `parts` such as
+    the query string, so it changes whenever a result is added, purged or
+    rewritten, or the session is re-run.
+    """
+    count, newest = db.session.query(db.func.count(SearchResult.id), db.func.max(SearchResult.id))\
+                              .filter(SearchResult.session_id == session.id).one()
+    completed_at = session.completed_at.isoformat() if session.completed_at else None
+    updated_at = session.results_updated_at.isoformat() if session.results_updated_at else None
+    return make_etag(session.id, session.status, completed_at, updated_at, count, newest, *parts)
+
+
+def session_cache_control(session: SearchSession) -> str:
+    return FINISHED_CACHE_CONTROL if session.status in FINAL_STATUSES else ACTIVE_CACHE_CONTROL
+
+
+def matching_etag(etag: str) -> Optional[str]:
+    """The variant of `etag` named in the request's If-None-Match, if any"""
+    for suffix in ('', *ENCODING_ETAG_SUFFIXES.values()):
+        if request.if_none_match.contains(etag + suffix):
+            return etag + suffix
+    return None
+
+
+def conditional_response(etag: str, build: Callable[[], Response], cache_control: str) -> Response:
+    """Answer 304 if the client holds `etag`, else build the response.
+    
+    The 304 check happens before `build` runs, so unchanged data is neither
+    queried nor serialised again.
+    """
+    held = matching_etag(etag)
+    if held:
+        response = Response(status=304)
+        response.set_etag(held)
+    else:
+        response = build()
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def _choose_encoding() -> str:
+    if brotli is not None and 'br' in request.accept_encodings:
+        return 'br'
+    if 'gzip' in request.accept_encodings:
+        return 'gzip'
+    return ''
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook: gzip or brotli large text responses the client accepts.
+    
+    Streamed responses (Server-Sent Events, file downloads) and binary
+    formats are left alone.
+    """
+    if (response.direct_passthrough or response.is_streamed
+            or not 200 <= response.status_code < 300
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding()
+    data = response.get_data()
+    if not encoding or len(data) < MIN_COMPRESS_BYTES:
+        return response
+    
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = encoding
+    
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(etag + ENCODING_ETAG_SUFFIXES[encoding], weak)
+    return response
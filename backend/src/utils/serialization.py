@@ -0,0 +1,28 @@
+import json
+from typing import Any
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder is used without it
+    orjson = None
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode JSON compactly, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data) -> Any:
+    """Decode JSON text or bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """Like `jsonify`, for large listings: no key sorting or pretty-printing"""
+    return Response(dumps(payload), status=status, mimetype='application/json')
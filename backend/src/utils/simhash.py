@@ -0,0 +1,116 @@
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+SIMHASH_BITS = 64
+BANDS = 4
+BAND_BITS = SIMHASH_BITS // BANDS
+
+# Pastes whose fingerprints differ in at most this many bits are near-duplicates.
+# Editing a few lines of a dump moves it by about 3-6 bits, while unrelated
+# pastes are ~32 bits apart and fall within 7 with a probability near 1e-10.
+# Spread over four bands, 7 differing bits leave at least one band with at
+# most one of them, so looking up each band's value and its 16 one-bit
+# neighbours (`probes`) finds every near-duplicate. Each lookup matches
+# about 1/65536 of unrelated fingerprints. By pigeonhole this only holds
+# while MAX_DISTANCE < 2 * BANDS.
+MAX_DISTANCE = 7
+if MAX_DISTANCE >= 2 * BANDS:
+    raise ValueError(f'MAX_DISTANCE must be below {2 * BANDS} for one-bit band probes to find every near-duplicate')
+
+SHINGLE_WORDS = 3
+MAX_TOKENS = 200_000  # longer pastes are fingerprinted from their start
+
+_TOKEN = re.compile(r'\w+')
+
+
+def _feature_hash(feature: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of a text over its word 3-shingles, weighted by frequency.
+    
+    Reposts with a changed header, a few edited lines or different
+    whitespace land within a few bits of the original.
+    """
+    tokens = _TOKEN.findall(text.lower())[:MAX_TOKENS]
+    if len(tokens) >= SHINGLE_WORDS:
+        features = Counter(' '.join(tokens[i:i + SHINGLE_WORDS])
+                           for i in range(len(tokens) - SHINGLE_WORDS + 1))
+    else:
+        features = Counter(tokens)
+    if not features:
+        return 0
+    
+    # Weights are summed per value of each byte of the feature hashes and
+    # spread over the bits once at the end: 8 additions per feature, not 64
+    tables = [[0] * 256 for _ in range(SIMHASH_BITS // 8)]
+    for feature, weight in features.items():
+        value = _feature_hash(feature)
+        for table in tables:
+            table[value & 0xFF] += weight
+            value >>= 8
+    
+    half = sum(features.values()) / 2
+    fingerprint = 0
+    for position, table in enumerate(tables):
+        for bit in range(8):
+            ones = sum(weight for byte, weight in enumerate(table) if weight and byte >> bit & 1)
+            if ones > half:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def bands(fingerprint: int) -> List[int]:
+    """Split a fingerprint into BANDS integers of BAND_BITS bits each"""
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (i * BAND_BITS)) & mask for i in range(BANDS)]
+
+
+def probes(fingerprint: int) -> List[List[int]]:
+    """For each band, its value followed by the values one bit away from it"""
+    return [[band] + [band ^ (1 << bit) for bit in range(BAND_BITS)] for band in bands(fingerprint)]
+
+
+def to_signed(fingerprint: int) -> int:
+    """Fingerprint as a signed 64-bit integer, as SQL INTEGER columns store it"""
+    return fingerprint - (1 << SIMHASH_BITS) if fingerprint >= 1 << (SIMHASH_BITS - 1) else fingerprint
+
+
+def from_signed(value: int) -> int:
+    return value & ((1 << SIMHASH_BITS) - 1)
+
+
+class NearDuplicateIndex:
+    """In-memory banded LSH over SimHash fingerprints.
+    
+    Used by sessions that skip near-duplicates before matching; the stored
+    clusters live in `ContentFingerprint`.
+    """
+    
+    def __init__(self, fingerprints: Iterable[int] = ()):
+        self._bands: List[Dict[int, List[int]]] = [{} for _ in range(BANDS)]
+        for fingerprint in fingerprints:
+            self.add(fingerprint)
+    
+    def add(self, fingerprint: int):
+        for table, band in zip(self._bands, bands(fingerprint)):
+            table.setdefault(band, []).append(fingerprint)
+    
+    def find(self, fingerprint: int) -> Optional[int]:
+        """The closest indexed fingerprint within MAX_DISTANCE bits, if any"""
+        best, best_distance = None, MAX_DISTANCE + 1
+        for table, keys in zip(self._bands, probes(fingerprint)):
+            for key in keys:
+                for candidate in table.get(key, ()):
+                    distance = hamming(fingerprint, candidate)
+                    if distance < best_distance:
+                        best, best_distance = candidate, distance
+        return best
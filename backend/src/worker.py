@@ -0,0 +1,97 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import logging
+import multiprocessing
+import signal
+import time
+
+# Workers only run search sessions; retention, the schedule poller and the
+# startup requeue of orphaned sessions stay with the API process unless
+# enabled here explicitly
+os.environ.setdefault('RETENTION_ENABLED', 'false')
+os.environ.setdefault('SCHEDULER_ENABLED', 'false')
+os.environ.setdefault('RESUME_SESSIONS', 'false')
+# Worker processes already spread matching over the cores
+os.environ.setdefault('MATCH_PROCESSES', '0')
+
+LOG_FORMAT = '%(asctime)s %(processName)s %(name)s %(message)s'
+
+
+def run_worker(index: int, lease_seconds: int, poll_interval: float, sharding: bool):
+    """Process entry point: run one queue worker until terminated"""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    
+    from src.main import app
+    from src.routes.scraper import scraper_manager
+    from src.jobs.worker import QueueWorker
+    from src.jobs.queue import release_dead_leases
+    
+    # Work of a crashed worker on this host resumes without waiting for its leases
+    with app.app_context():
+        release_dead_leases()
+    
+    worker = QueueWorker(app, scraper_manager, lease_seconds=lease_seconds,
+                         poll_interval=poll_interval, sharding=sharding)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run_forever()
+
+
+def main():
+    """Start N worker processes and restart any that exit unexpectedly"""
+    parser = argparse.ArgumentParser(description='Run search session queue workers')
+    parser.add_argument('--processes', '-n', type=int, default=os.cpu_count() or 1,
+                        help='number of worker processes (default: CPU count)')
+    parser.add_argument('--lease-seconds', type=int, default=60,
+                        help='job lease duration; expired leases are reclaimed')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='seconds to wait when the queue is empty')
+    parser.add_argument('--sharding', action='store_true',
+                        default=os.environ.get('SCRAPER_SHARDING', 'false').lower() == 'true',
+                        help='split sessions into per-service shards shared across nodes')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    
+    # Spawned children import the app fresh instead of sharing the parent's
+    # SQLite connections across fork()
+    context = multiprocessing.get_context('spawn')
+    worker_args = (args.lease_seconds, args.poll_interval, args.sharding)
+    processes = {}
+    stopping = False
+    
+    def start(index):
+        process = context.Process(target=run_worker, args=(index, *worker_args),
+                                  name=f'worker-{index}')
+        process.start()
+        processes[index] = process
+    
+    def shutdown(*_):
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            process.terminate()
+    
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    
+    for index in range(args.processes):
+        start(index)
+    
+    while not stopping:
+        for index, process in list(processes.items()):
+            if not process.is_alive() and not stopping:
+                logging.warning(f'{process.name} exited with {process.exitcode}, restarting')
+                start(index)
+        time.sleep(1)
+    
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
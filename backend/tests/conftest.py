@@ -0,0 +1,40 @@
+import pytest
+from flask import Flask
+
+from src.models.user import db, User
+from src.models import jobs, scraper  # noqa: F401  (registers the tables)
+from src.models.schema import ensure_schema
+from src.routes.scraper import scraper_bp
+
+
+@pytest.fixture
+def app():
+    """An app on a fresh in-memory database, with the scraper API mounted"""
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI='sqlite://',
+        SCRAPER_EXECUTION_MODE='queue',
+    )
+    db.init_app(app)
+    app.register_blueprint(scraper_bp, url_prefix='/api')
+
+    with app.app_context():
+        db.create_all()
+        ensure_schema()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='demo_user', email='test@example.com')
+    db.session.add(user)
+    db.session.commit()
+    return user
@@ -0,0 +1,59 @@
+"""Arrow and Parquet session archives carry every field the JSON listings return."""
+import io
+import json
+
+import pytest
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+from src.models.scraper import SearchResult, SearchSession, db
+from src.utils.columnar_export import export_session_bytes
+
+
+@pytest.fixture
+def session(user):
+    session = SearchSession(user_id=user.id, name='keys', search_terms='["password"]', services='["pastebin"]')
+    db.session.add(session)
+    db.session.flush()
+    original = SearchResult(
+        session_id=session.id, paste_id='a1', url='https://pastebin.com/a1', service='pastebin',
+        matched_terms='["password"]', full_content='password=hunter2',
+        detections='{"aws_access_key": 1}', match_offsets='{"password": [[0, 8]]}',
+        decoded_from='["base64"]'
+    )
+    db.session.add_all([
+        original,
+        SearchResult(session_id=session.id, paste_id='b2', url='https://pastebin.com/b2', service='pastebin',
+                     matched_terms='[]'),
+    ])
+    db.session.flush()
+    db.session.add(SearchResult(session_id=session.id, paste_id='c3', url='https://pastebin.com/c3',
+                                service='pastebin', matched_terms='["password"]', duplicate_of=original.id))
+    db.session.commit()
+    return session
+
+
+def _listing(session):
+    return [result.to_dict() for result in SearchResult.query.filter_by(session_id=session.id).order_by(SearchResult.id)]
+
+
+@pytest.mark.parametrize('format_type', ['arrow', 'parquet'])
+def test_archive_has_every_listing_field(session, format_type):
+    data = export_session_bytes(session, format_type, include_content=True)
+    if format_type == 'parquet':
+        table = pq.read_table(io.BytesIO(data))
+    else:
+        table = pa.ipc.open_file(pa.py_buffer(data)).read_all()
+
+    assert table.column_names == list(SearchResult.LISTING_FIELDS) + ['full_content']
+
+    rows = table.to_pylist()
+    for row, listed in zip(rows, _listing(session)):
+        assert row['duplicate_of'] == listed['duplicate_of']
+        assert dict(row['detections']) == listed['detections']
+        assert json.loads(json.dumps(dict(row['match_offsets']))) == listed['match_offsets']
+        assert row['decoded_from'] == listed['decoded_from']
+        assert row['matched_terms'] == listed['matched_terms']
+    # Near-duplicates export the content of the paste they copy
+    assert rows[2]['full_content'] == 'password=hunter2'
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from src.jobs.coordinator import (
+    claim_shard, fail_exhausted_shards, finish_shard, session_shard_results, split_session
+)
+from src.models.jobs import SessionCheckpoint, SessionShard
+from src.models.scraper import SearchSession, db
+
+
+def _sharded_session(user):
+    session = SearchSession(user_id=user.id, name='keys', search_terms='["password"]',
+                            services='["pastebin", "ghostbin"]', status='running')
+    db.session.add(session)
+    db.session.commit()
+    split_session(session)
+    db.session.commit()
+    return session
+
+
+def _save(session, service_id, results_count):
+    checkpoint = SessionCheckpoint.open(session.id, service_id)
+    checkpoint.record(set(), results_count)
+    db.session.commit()
+
+
+def test_failed_shards_keep_the_count_of_results_they_saved(user):
+    session = _sharded_session(user)
+
+    first = claim_shard('worker-1')
+    second = claim_shard('worker-2')
+    _save(session, first[2], 3)
+    finish_shard(first[0], 'worker-1', 'done')
+    # Saved two batches before failing; those results stay in the session
+    _save(session, second[2], 2)
+    _save(session, second[2], 2)
+    finish_shard(second[0], 'worker-2', 'failed', error='boom')
+
+    assert db.session.get(SessionShard, second[0]).results_count == 4
+    assert session_shard_results(session.id) == 7
+
+
+def test_exhausted_shards_keep_the_count_of_results_they_saved(user):
+    session = _sharded_session(user)
+
+    shard_id, _, service_id = claim_shard('worker-1')
+    _save(session, service_id, 5)
+    shard = db.session.get(SessionShard, shard_id)
+    shard.attempts = shard.max_attempts
+    shard.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    assert fail_exhausted_shards() == [session.id]
+    db.session.refresh(shard)
+    assert (shard.status, shard.results_count) == ('failed', 5)
@@ -0,0 +1,69 @@
+import base64
+import gzip
+import time
+
+from src.scrapers import decoding
+from src.scrapers.decoding import MAX_CANDIDATES, MAX_DECODED_BYTES, MAX_DEPTH, MAX_SECONDS, decode_layers
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def test_nested_payloads_are_peeled():
+    secret = b'db password: hunter2'
+    content = 'config ' + b64(gzip.compress(b64(secret).encode())) + ' end'
+
+    layers = decode_layers(content)
+    assert [layer.encoding for layer in layers] == ['base64+gzip', 'base64+gzip+base64']
+    assert layers[-1].text == secret.decode()
+    # Nested layers point at the span in the paste
+    assert content[layers[-1].start:layers[-1].end].startswith('H4sI')
+
+
+def test_nesting_stops_at_max_depth():
+    payload = b'the innermost secret'
+    for _ in range(MAX_DEPTH + 2):
+        payload = base64.b64encode(payload)
+
+    layers = decode_layers(payload.decode())
+    assert [layer.encoding for layer in layers] == ['+'.join(['base64'] * depth)
+                                                    for depth in range(1, MAX_DEPTH + 1)]
+    assert all('innermost' not in layer.text for layer in layers)
+
+
+def test_candidates_are_capped():
+    content = ' '.join(b64(f'the secret number is {i:03d}'.encode()) for i in range(MAX_CANDIDATES + 36))
+
+    layers = decode_layers(content)
+    assert len(layers) == MAX_CANDIDATES
+    assert layers[-1].text == f'the secret number is {MAX_CANDIDATES - 1:03d}'
+
+
+def test_gzip_bomb_is_cut_off_within_the_budget():
+    bomb = b64(gzip.compress(b'A' * (32 * 1024 * 1024), 9))
+
+    started = time.monotonic()
+    layers = decode_layers(f'x {bomb} y')
+    elapsed = time.monotonic() - started
+
+    assert sum(len(layer.text) for layer in layers) <= MAX_DECODED_BYTES
+    assert layers[0].encoding == 'base64+gzip'
+    assert elapsed < MAX_SECONDS
+
+
+def test_deadline_is_checked_between_inflate_steps():
+    class ExpiresAfterOneCheck(decoding._Budget):
+        checks = 0
+
+        def timed_out(self):
+            self.checks += 1
+            return self.checks > 1
+
+    data = gzip.compress(b'password ' * 200_000)
+    assert len(decoding._inflate(data, 'gzip', ExpiresAfterOneCheck())) == decoding.INFLATE_STEP
+
+
+def test_nothing_is_decoded_once_the_time_is_up(monkeypatch):
+    monkeypatch.setattr(decoding, 'MAX_SECONDS', -1.0)
+    assert decode_layers(b64(gzip.compress(b'password ' * 1000))) == []
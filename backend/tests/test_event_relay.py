@@ -0,0 +1,49 @@
+from src.jobs.event_relay import DatabaseEventRelay
+from src.models.jobs import SessionCheckpoint
+from src.models.scraper import SearchResult, SearchSession, db
+from src.utils.events import EventBus
+
+
+def _add_result(session, paste_id):
+    result = SearchResult(session_id=session.id, paste_id=paste_id, url=f'https://pastebin.com/{paste_id}',
+                          service='pastebin', matched_terms='["password"]')
+    db.session.add(result)
+    return result
+
+
+def test_relay_forwards_results_and_progress_of_sessions_run_elsewhere(app, user):
+    session = SearchSession(user_id=user.id, name='keys', search_terms='["password"]',
+                            services='["pastebin", "gist"]', status='running')
+    db.session.add(session)
+    db.session.flush()
+    earlier = _add_result(session, 'a0')
+    db.session.commit()
+
+    bus = EventBus()
+    relay = DatabaseEventRelay(app, bus, is_local=lambda session_id: False)
+    # The stream's snapshot already covers the results stored before it
+    bus.note_result_id(session.id, earlier.id)
+
+    # A worker process stores a batch and its checkpoint
+    _add_result(session, 'b1')
+    _add_result(session, 'c2')
+    checkpoint = SessionCheckpoint.open(session.id, 'pastebin')
+    checkpoint.record({'b1', 'c2'}, 2)
+    checkpoint.finish()
+    db.session.commit()
+
+    relay.relay([session.id])
+    events = [(item.event, item.data) for item in bus.since(session.id, 0)]
+    assert [data['paste_id'] for event, data in events if event == 'result'] == ['b1', 'c2']
+    assert ('progress', {'progress': 50.0, 'results_count': 2}) in events
+    assert ('status', {'status': 'running', 'results_count': 0}) in events
+
+    # Nothing is sent twice; only what is new since the last poll
+    seen = bus.last_seq()
+    relay.relay([session.id])
+    assert bus.since(session.id, seen) == []
+
+    _add_result(session, 'd3')
+    db.session.commit()
+    relay.relay([session.id])
+    assert [item.data['paste_id'] for item in bus.since(session.id, seen) if item.event == 'result'] == ['d3']
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+from flask import Response
+
+from src.models.scraper import SearchResult, SearchSession, db
+from src.utils.http_cache import (
+    ACTIVE_CACHE_CONTROL, FINISHED_CACHE_CONTROL, conditional_response, session_etag
+)
+
+
+@pytest.fixture
+def session(user):
+    session = SearchSession(user_id=user.id, name='keys', search_terms='["password"]',
+                            services='["pastebin"]', status='running')
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def _add_result(session, paste_id):
+    result = SearchResult(session_id=session.id, paste_id=paste_id, url=f'https://pastebin.com/{paste_id}',
+                          service='pastebin', matched_terms='["password"]')
+    db.session.add(result)
+    db.session.commit()
+    return result
+
+
+def test_session_etag_follows_results_and_state(session):
+    first = session_etag(session, 'results', '')
+    assert session_etag(session, 'results', '') == first
+    assert session_etag(session, 'results', 'page=2') != first
+
+    result = _add_result(session, 'a1')
+    added = session_etag(session, 'results', '')
+    assert added != first
+
+    # Purged and rewritten results
+    _add_result(session, 'b2')
+    db.session.delete(result)
+    db.session.commit()
+    assert session_etag(session, 'results', '') != added
+    before_rewrite = session_etag(session, 'results', '')
+    session.results_updated_at = datetime(2026, 10, 19, 12, 0)
+    assert session_etag(session, 'results', '') != before_rewrite
+
+    finished = session_etag(session, 'results', '')
+    session.status = 'completed'
+    session.completed_at = datetime(2026, 10, 19, 12, 5)
+    assert session_etag(session, 'results', '') != finished
+
+
+def test_conditional_response_answers_304_without_building(app):
+    built = []
+
+    def build():
+        built.append(True)
+        return Response('{}', mimetype='application/json')
+
+    with app.test_request_context(headers={'If-None-Match': '"abc"'}):
+        response = conditional_response('abc', build, FINISHED_CACHE_CONTROL)
+    assert response.status_code == 304
+    assert response.get_etag() == ('abc', False)
+    assert response.headers['Cache-Control'] == FINISHED_CACHE_CONTROL
+    assert not built
+
+    # A client holding the gzip variant is answered with that tag
+    with app.test_request_context(headers={'If-None-Match': '"abc-gzip"'}):
+        response = conditional_response('abc', build, FINISHED_CACHE_CONTROL)
+    assert response.status_code == 304
+    assert response.get_etag() == ('abc-gzip', False)
+    assert not built
+
+    with app.test_request_context(headers={'If-None-Match': '"stale"'}):
+        response = conditional_response('abc', build, ACTIVE_CACHE_CONTROL)
+    assert response.status_code == 200
+    assert response.get_etag() == ('abc', False)
+    assert response.headers['Cache-Control'] == ACTIVE_CACHE_CONTROL
+    assert built
+
+
+def test_results_endpoint_revalidates(client, session):
+    _add_result(session, 'a1')
+    url = f'/api/sessions/{session.id}/results'
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == ACTIVE_CACHE_CONTROL
+    etag = response.headers['ETag']
+
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    _add_result(session, 'b2')
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.get_json()['results']) == 2
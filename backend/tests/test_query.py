@@ -0,0 +1,78 @@
+import re
+
+import pytest
+
+from src.scrapers.matcher import PasteDocument
+from src.scrapers.query import Query, QuerySyntaxError
+
+
+def matches(query: str, content: str) -> bool:
+    return Query(query).matches(PasteDocument(content))
+
+
+@pytest.mark.parametrize('query, content, expected', [
+    ('password', 'DB PASSWORD=x', True),
+    ('password token', 'password only', False),
+    ('password AND token', 'token and password', True),
+    ('password OR token', 'just a token', True),
+    ('password NOT example', 'password=hunter2', True),
+    ('password NOT example', 'example password', False),
+    ('(aws OR gcp) AND "secret key"', 'gcp Secret Key: abc', True),
+    ('(aws OR gcp) AND "secret key"', 'azure secret key', False),
+    ('/AKIA[0-9A-Z]{16}/', 'id=akiaABCDEFGHIJKLMNOP', True),
+    ('/AKIA[0-9A-Z]{16}/', 'id=AKIA123', False),
+])
+def test_boolean_operators(query, content, expected):
+    assert matches(query, content) is expected
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('api key secret', True),
+    ('secret one two api key', True),          # either order
+    ('api key is the secret', True),
+    ('api key is not the stored secret', False),
+    ('api secret key', False),                 # the phrase itself is missing
+])
+def test_near_counts_words_between_operands(content, expected):
+    # Measured from the end of one operand to the start of the other, so the
+    # phrase's own length does not count towards the distance
+    assert matches('"api key" NEAR/3 secret', content) is expected
+
+
+def test_near_uses_the_closest_pair_of_occurrences():
+    content = 'token ' + 'filler ' * 20 + 'password then token'
+    assert matches('password NEAR/2 token', content)
+    assert not matches('password NEAR/1 token', 'token ' + 'filler ' * 20 + 'password')
+
+
+def test_terms_are_the_non_negated_ones_in_query_order():
+    query = Query('beta AND (alpha OR "gamma ray") NOT delta')
+    assert query.terms == ['beta', 'alpha', 'gamma ray']
+    assert set(key for key in query.probes) == {
+        ('lit', 'beta'), ('lit', 'alpha'), ('lit', 'gamma ray'), ('lit', 'delta')
+    }
+
+
+def test_plan_checks_rare_terms_first():
+    query = Query('common AND rare')
+    query.plan(lambda term: {'common': 0.9, 'rare': 0.01}[term])
+    assert query.explain() == '(rare AND common)'
+
+    query = Query('common OR rare')
+    query.plan(lambda term: {'common': 0.9, 'rare': 0.01}[term])
+    assert query.explain() == '(common OR rare)'
+
+
+@pytest.mark.parametrize('query, message', [
+    ('', 'empty'),
+    ('   ', 'empty'),
+    ('(password', 'Unclosed parenthesis'),
+    ('password AND', 'ends where a term was expected'),
+    ('password)', "Unexpected ')'"),
+    ('NOT password', 'at least one term that is not negated'),
+    ('(a OR b) NEAR/2 c', 'must join two terms'),
+    ('/[unclosed/', 'Invalid regex'),
+])
+def test_syntax_errors(query, message):
+    with pytest.raises(QuerySyntaxError, match=re.escape(message)):
+        Query(query)
@@ -0,0 +1,45 @@
+from src.jobs.queue import claim_job, enqueue_session
+from src.models.jobs import SessionJob
+from src.models.scraper import SearchLog, SearchSession, UserStats, db
+from src.scrapers.scraper_manager import ScraperManager
+
+
+def test_session_stopped_after_its_job_was_claimed_is_not_run(user):
+    UserStats.rebuild(user.id)
+    session = SearchSession(user_id=user.id, name='keys', search_terms='["password"]', services='["pastebin"]')
+    db.session.add(session)
+    db.session.commit()
+
+    manager = ScraperManager()
+    enqueue_session(session.id)
+    db.session.commit()
+    job_id, session_id = claim_job('worker-1')
+    assert session_id == session.id
+
+    # The stop lands before the worker gets to run the session
+    assert manager.stop_search_session(session.id)
+    manager.run_session_job(session.id)
+
+    db.session.refresh(session)
+    assert session.status == 'stopped'
+    assert db.session.get(SessionJob, job_id).status == 'cancelled'
+    assert not SearchLog.query.filter_by(session_id=session.id).count()
+    assert UserStats.query.filter_by(user_id=user.id).one().active_crawls == 0
+    assert session.id not in manager.active_sessions
+
+
+def test_claims_stop_at_the_per_user_cap(user):
+    sessions = []
+    for name in ('a', 'b', 'c'):
+        session = SearchSession(user_id=user.id, name=name, search_terms='["password"]', services='["pastebin"]')
+        db.session.add(session)
+        db.session.commit()
+        enqueue_session(session.id)
+        db.session.commit()
+        sessions.append(session.id)
+
+    claimed = [claim_job('worker-1', max_running_per_user=2), claim_job('worker-2', max_running_per_user=2)]
+    assert [session_id for _, session_id in claimed] == sessions[:2]
+    # The third waits although none of the claimed sessions has started running yet
+    assert claim_job('worker-3', max_running_per_user=2) is None
+    assert claim_job('worker-3')[1] == sessions[2]
@@ -0,0 +1,19 @@
+from src.models.scraper import SearchResult, SearchSession, db
+
+
+def test_detector_filter_matches_the_detector_name_exactly(client, user):
+    session = SearchSession(user_id=user.id, name='keys', search_terms='["password"]', services='["pastebin"]')
+    db.session.add(session)
+    db.session.flush()
+    for paste_id, detections in [('a1', '{"aws_access_key": 1}'), ('b2', '{"awsXaccessXkey": 2}'),
+                                 ('c3', '{"high_entropy_token": 1}'), ('d4', None)]:
+        db.session.add(SearchResult(session_id=session.id, paste_id=paste_id, url=f'https://x/{paste_id}',
+                                    service='pastebin', matched_terms='[]', detections=detections))
+    db.session.commit()
+
+    url = f'/api/sessions/{session.id}/results'
+    response = client.get(url, query_string={'detector': 'aws_access_key'})
+    assert [result['paste_id'] for result in response.get_json()['results']] == ['a1']
+
+    response = client.get(url, query_string={'detector': 'aws%'})
+    assert response.status_code == 400
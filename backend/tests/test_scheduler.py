@@ -0,0 +1,46 @@
+from datetime import datetime
+
+import pytest
+
+from src.jobs.scheduler import CronSchedule, validate_schedule
+
+
+@pytest.mark.parametrize('expression, after, expected', [
+    # Steps
+    ('*/15 * * * *', datetime(2026, 10, 19, 10, 7, 30), datetime(2026, 10, 19, 10, 15)),
+    # Strictly after: a matching moment gives the next one
+    ('30 10 * * *', datetime(2026, 10, 19, 10, 30), datetime(2026, 10, 20, 10, 30)),
+    # Weekday ranges skip the weekend (Friday 23rd -> Monday 26th)
+    ('0 9 * * 1-5', datetime(2026, 10, 23, 9, 0), datetime(2026, 10, 26, 9, 0)),
+    # 7 is Sunday too
+    ('0 12 * * 7', datetime(2026, 10, 19), datetime(2026, 10, 25, 12, 0)),
+    # With both day fields restricted either one matches: the 20th comes before Friday
+    ('0 0 20 * 5', datetime(2026, 10, 19), datetime(2026, 10, 20, 0, 0)),
+    # Lists, and months without a matching day are skipped
+    ('5,45 6 31 * *', datetime(2026, 10, 31, 6, 5), datetime(2026, 10, 31, 6, 45)),
+    ('0 0 31 * *', datetime(2026, 10, 31, 1, 0), datetime(2026, 12, 31, 0, 0)),
+    # Leap days
+    ('0 0 29 2 *', datetime(2026, 10, 19), datetime(2028, 2, 29, 0, 0)),
+])
+def test_next_after(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+
+def test_never_matching_expression_is_rejected():
+    with pytest.raises(ValueError, match='never matches'):
+        CronSchedule('0 0 31 2 *').next_after(datetime(2026, 10, 19))
+
+
+@pytest.mark.parametrize('expression', ['* * * *', '60 * * * *', '* 24 * * *', '0 0 0 * *', '*/0 * * * *',
+                                        '5-1 * * * *', 'x * * * *'])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_validate_schedule():
+    assert validate_schedule(None, '*/5 * * * *') is None
+    assert validate_schedule(3600, None) is None
+    assert validate_schedule(30, None) == 'interval_seconds must be at least 60'
+    assert validate_schedule(3600, '* * * * *') == 'Provide exactly one of interval_seconds or cron'
+    assert 'never matches' in validate_schedule(None, '0 0 30 2 *')
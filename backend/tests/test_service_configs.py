@@ -0,0 +1,75 @@
+"""Runs each configured service's listing and content patterns over a saved
+page (tests/fixtures/services), so a pattern that stops matching the markup
+it was written for fails here rather than silently returning no pastes."""
+from pathlib import Path
+
+import pytest
+import requests
+
+from src.scrapers.configured_scraper import ConfiguredScraper
+from src.scrapers.service_configs import SERVICE_CONFIGS
+
+FIXTURES = Path(__file__).parent / 'fixtures' / 'services'
+
+# Items each listing fixture yields, in order, with their key fields
+EXPECTED_ITEMS = {
+    'paste_ee': [{'key': 'Xk3dQ', 'title': 'config dump & notes'}, {'key': 'a9Lm2Rt', 'title': 'Untitled'}],
+    'dpaste': [{'key': 'BQ7fx', 'title': 'deploy script'}, {'key': '7PzaD2', 'title': 'Untitled'}],
+    'nekobin': [{'key': 'wumolakuxe', 'title': 'docker-compose.yml', 'date': '2026-10-18T11:58:42Z'},
+                {'key': 'gofivepera', 'title': '', 'date': '2026-10-18T11:55:07Z'}],
+    'rentry': [{'key': 'server-notes_2', 'title': 'server-notes_2'}, {'key': 'k8s', 'title': 'k8s'}],
+    'hastebin': [{'key': 'ulopedivaj', 'syntax': 'py'}, {'key': 'ekujaqocex'}],
+    'gitlab': [{'key': '4829113', 'title': 'nginx reverse proxy', 'date': '2026-10-18T11:59:01.512Z',
+                'filename': 'nginx.conf'},
+               {'key': '4829108', 'title': 'backup.sh', 'date': '2026-10-18T11:52:33.004Z',
+                'filename': 'backup.sh'}],
+    'ubuntu_paste': [{'key': 'Vq8nD2kTwY', 'title': 'apt sources'}, {'key': '4FhZmRp9Cj', 'title': 'syslog excerpt'}],
+    'justpaste': [{'key': 'b7x2q', 'title': 'Meeting notes'}, {'key': '9kdwe', 'title': 'Weekly report'}],
+    'controlc': [{'key': '3fa21c9e', 'title': 'credentials backup'}, {'key': 'b04d7e11', 'title': 'Untitled'}],
+    'ideone': [{'key': 'Xr4tQe'}, {'key': 'pL9a2M'}],
+}
+
+# Text extracted from the paste page fixture of services serving HTML
+EXPECTED_CONTENT = {
+    'justpaste': 'Meeting notes\nStaging DB password: hunter2\nNext sync & review on Monday',
+    'controlc': 'host=db.internal\nuser=admin\npass=Winter2026!',
+}
+
+
+def _fixture_response(path: Path) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.encoding = 'utf-8'
+    response._content = path.read_bytes()
+    return response
+
+
+def _scraper(service_id: str, page: str, monkeypatch) -> ConfiguredScraper:
+    """The service's scraper, answering every request with one fixture"""
+    scraper = ConfiguredScraper(service_id)
+    response = _fixture_response(next(FIXTURES.glob(f'{service_id}_{page}.*')))
+    monkeypatch.setattr(scraper, '_make_request', lambda url, **kwargs: response)
+    return scraper
+
+
+def test_every_service_has_fixtures():
+    assert set(EXPECTED_ITEMS) == set(SERVICE_CONFIGS)
+    html_services = {service_id for service_id, config in SERVICE_CONFIGS.items()
+                     if config.get('content_format') == 'html'}
+    assert set(EXPECTED_CONTENT) == html_services
+
+
+@pytest.mark.parametrize('service_id', sorted(SERVICE_CONFIGS))
+def test_listing(service_id, monkeypatch):
+    scraper = _scraper(service_id, 'listing', monkeypatch)
+    items = scraper.list_items(50)
+    expected = EXPECTED_ITEMS[service_id]
+    assert [item['key'] for item in items] == [item['key'] for item in expected]
+    for item, fields in zip(items, expected):
+        assert {name: item.get(name) for name in fields} == fields
+
+
+@pytest.mark.parametrize('service_id', sorted(EXPECTED_CONTENT))
+def test_paste_content(service_id, monkeypatch):
+    scraper = _scraper(service_id, 'paste', monkeypatch)
+    assert scraper.get_paste_content(EXPECTED_ITEMS[service_id][0]['key']) == EXPECTED_CONTENT[service_id]
@@ -0,0 +1,34 @@
+from src.scrapers.base_scraper import ScanCursor
+from src.scrapers.matcher import CompiledMatcher
+from src.scrapers.shared_fetch import FeedSubscription
+
+
+def _subscription(cursor=None):
+    return FeedSubscription(CompiledMatcher(['password']), max_results=10, listing_limit=10,
+                            required_pass=1, cursor=cursor)
+
+
+def test_drain_snapshots_the_cursor_with_the_keys_it_covers():
+    subscription = _subscription(ScanCursor())
+    # Items without content advance the cursor without being evaluated
+    subscription.offer(None, 'a', {}, None, 100.0)
+    subscription.offer(None, 'b', {}, None, 100.0)
+
+    results, scanned, _, mark = subscription.drain()
+    assert results == [] and scanned == {'a', 'b'}
+    assert mark == (100.0, frozenset({'a', 'b'}))
+
+    # Scanning after the drain belongs to the next batch and leaves this mark alone
+    subscription.offer(None, 'c', {}, None, 100.0)
+    subscription.offer(None, 'd', {}, None, 200.0)
+    assert mark == (100.0, frozenset({'a', 'b'}))
+
+    _, scanned, _, mark = subscription.drain()
+    assert scanned == {'c', 'd'}
+    assert mark == (200.0, frozenset({'d'}))
+
+
+def test_drain_without_a_cursor_has_no_mark():
+    subscription = _subscription()
+    subscription.offer(None, 'a', {}, None, 100.0)
+    assert subscription.drain()[3] is None
@@ -0,0 +1,84 @@
+"""The dashboard aggregate maintained by UserStats.increment must stay equal
+to what UserStats.rebuild computes from the session tables."""
+import pytest
+
+from src.jobs.queue import enqueue_session
+from src.models.scraper import SearchResult, SearchSession, UserStats, db
+from src.routes.scraper import scraper_manager
+
+COUNTERS = ('total_searches', 'total_results', 'active_crawls', 'completed_searches', 'success_rate_total')
+
+
+def _counters(user_id):
+    stats = db.session.get(UserStats, UserStats.query.filter_by(user_id=user_id).one().id,
+                           populate_existing=True)
+    return {name: pytest.approx(getattr(stats, name)) for name in COUNTERS}
+
+
+def _assert_matches_rebuild(user_id):
+    incremental = _counters(user_id)
+    UserStats.rebuild(user_id)
+    db.session.flush()
+    assert _counters(user_id) == incremental
+
+
+def _create_session(client):
+    response = client.post('/api/sessions', json={
+        'name': 'keys', 'search_terms': ['password'], 'services': ['pastebin']
+    })
+    assert response.status_code == 201
+    return db.session.get(SearchSession, response.get_json()['id'])
+
+
+def _run(session, paste_ids):
+    """Queue the session and take it through one run that finds `paste_ids`"""
+    enqueue_session(session.id)
+    db.session.commit()
+    scraper_manager._mark_running(session)
+    db.session.commit()
+    scraper_manager._persist_results(session, [
+        {'paste_id': paste_id, 'url': f'https://pastebin.com/{paste_id}', 'service': 'pastebin',
+         'matched_terms': ['password']}
+        for paste_id in paste_ids
+    ])
+    db.session.commit()
+    scraper_manager._complete_session(session, len(paste_ids), max_results=10)
+
+
+def test_increment_matches_rebuild_across_run_rerun_and_delete(client, user):
+    UserStats.rebuild(user.id)
+    db.session.commit()
+
+    session = _create_session(client)
+    _assert_matches_rebuild(user.id)
+
+    _run(session, ['a1', 'b2'])
+    _assert_matches_rebuild(user.id)
+    assert UserStats.query.filter_by(user_id=user.id).one().completed_searches == 1
+
+    # A fresh run replaces the results of the previous one
+    _run(session, ['a1', 'c3'])
+    _assert_matches_rebuild(user.id)
+    stats = UserStats.query.filter_by(user_id=user.id).one()
+    assert stats.completed_searches == 1
+    assert stats.total_results == session.results_count == 2
+    assert sorted(r.paste_id for r in SearchResult.query.filter_by(session_id=session.id)) == ['a1', 'c3']
+
+    assert client.delete(f'/api/sessions/{session.id}/delete').status_code == 200
+    stats = client.get('/api/dashboard/stats').get_json()
+    assert stats['total_searches'] == 0
+    assert stats['total_results'] == 0
+    assert stats['success_rate'] == 0.0
+    _assert_matches_rebuild(user.id)
+
+
+def test_reopen_ignores_sessions_that_did_not_complete(client, user):
+    UserStats.rebuild(user.id)
+    session = _create_session(client)
+    session.status = 'stopped'
+    session.success_rate = 97.0
+
+    UserStats.reopen(session)
+    db.session.flush()
+
+    assert UserStats.query.filter_by(user_id=user.id).one().completed_searches == 0
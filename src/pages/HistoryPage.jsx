@@ -32,6 +32,15 @@ import {
   RefreshCw
 } from 'lucide-react'
 
+// Previews are windows around the hits; mark the literal terms inside them
+const highlightTerms = (text, terms) => {
+  const literals = (terms || []).filter(term => term && !(term.length > 1 && term.startsWith('/') && term.endsWith('/')))
+  if (!text || literals.length === 0) return text
+  const escaped = literals.map(term => term.replace(/[.*+?^${}()|[\]\\]/g, '\\$&'))
+  const parts = text.split(new RegExp(`(${escaped.join('|')})`, 'gi'))
+  return parts.map((part, index) => index % 2 === 1 ? <mark key={index}>{part}</mark> : part)
+}
+
 const HistoryPage = () => {
   const { user, logout } = useAuth()
   
@@ -546,8 +555,8 @@ const HistoryPage = () => {
                           {sessionResults.slice(0, 5).map((result) => (
                             <div key={result.id} className="border rounded p-2 text-xs">
                               <div className="font-medium truncate">{result.title || result.paste_id}</div>
-                              <div className="text-muted-foreground truncate">
-                                {result.content_preview}
+                              <div className="text-muted-foreground line-clamp-3 break-words">
+                                {highlightTerms(result.content_preview, result.matched_terms)}
                               </div>
                               <div className="flex items-center justify-between mt-1">
                                 <Badge variant="outline" className="text-xs">
@@ -87,6 +87,9 @@ const ScraperPage = () => {
     rateLimit: 30,
     includeExpired: false,
     regexMode: false,
+    skipNearDuplicates: false,
+    detectSecrets: false,
+    query: '',
     minFileSize: 0,
     maxFileSize: 10000,
     dateRange: 'all',
@@ -114,35 +117,64 @@ const ScraperPage = () => {
     fetchServices()
   }, [])
 
-  // Poll session status when running
+  // Follow the running session's live event stream
+  const sessionId = currentSession?.id
+
   useEffect(() => {
-    if (currentSession && isRunning) {
-      const pollSession = () => {
-        apiService.pollSessionStatus(currentSession.id, (session) => {
-          setCurrentSession(session)
-          setCurrentStats(prev => ({
-            ...prev,
-            resultsFound: session.results_count || 0,
-            timeElapsed: session.duration || 0
-          }))
-          
-          if (session.status === 'completed' || session.status === 'error') {
-            setIsRunning(false)
-            setIsPaused(false)
-          }
-        })
-      }
+    if (!sessionId || !isRunning) {
+      return
+    }
 
-      const pollLogs = () => {
-        apiService.pollSessionLogs(currentSession.id, (logs) => {
-          setLogs(logs)
-        })
+    const finish = (status) => {
+      if (['completed', 'stopped', 'error'].includes(status)) {
+        setIsRunning(false)
+        setIsPaused(false)
       }
+    }
 
-      pollSession()
-      pollLogs()
+    if (typeof EventSource === 'undefined') {
+      apiService.pollSessionStatus(sessionId, (session) => {
+        setCurrentSession(session)
+        setCurrentStats(prev => ({
+          ...prev,
+          resultsFound: session.results_count || 0,
+          timeElapsed: session.duration || 0
+        }))
+        finish(session.status)
+      })
+      apiService.pollSessionLogs(sessionId, (logs) => {
+        setLogs(logs)
+      })
+      return
     }
-  }, [currentSession, isRunning])
+
+    return apiService.streamSession(sessionId, {
+      onSnapshot: ({ session, logs }) => {
+        setCurrentSession(session)
+        setLogs(logs)
+        setCurrentStats(prev => ({
+          ...prev,
+          resultsFound: session.results_count || 0,
+          timeElapsed: session.duration || 0
+        }))
+        finish(session.status)
+      },
+      onLog: (log) => setLogs(prev => [...prev, log]),
+      onProgress: ({ results_count }) => setCurrentStats(prev => ({
+        ...prev,
+        resultsFound: results_count
+      })),
+      onResult: () => setCurrentStats(prev => ({
+        ...prev,
+        resultsFound: prev.resultsFound + 1
+      })),
+      onStatus: ({ status, results_count }) => {
+        setCurrentSession(prev => ({ ...prev, status, results_count }))
+        setCurrentStats(prev => ({ ...prev, resultsFound: results_count }))
+        finish(status)
+      }
+    })
+  }, [sessionId, isRunning])
 
   const addSearchTerm = () => {
     setSearchTerms([...searchTerms, ''])
@@ -183,8 +215,8 @@ const ScraperPage = () => {
     }
     
     const validTerms = searchTerms.filter(term => term.trim())
-    if (validTerms.length === 0) {
-      setError('At least one search term is required')
+    if (validTerms.length === 0 && !advancedSettings.query.trim() && !advancedSettings.detectSecrets) {
+      setError('At least one search term or a query is required')
       return false
     }
     
@@ -516,6 +548,20 @@ const ScraperPage = () => {
                       </div>
                     </div>
                     
+                    <div className="space-y-2">
+                      <Label htmlFor="query">Query (replaces the search terms)</Label>
+                      <Input
+                        id="query"
+                        placeholder='password AND (aws OR s3) NOT example, "api key" NEAR/20 secret'
+                        value={advancedSettings.query}
+                        onChange={(e) => setAdvancedSettings(prev => ({
+                          ...prev,
+                          query: e.target.value
+                        }))}
+                        disabled={isRunning}
+                      />
+                    </div>
+                    
                     <div className="flex items-center space-x-2">
                       <Switch
                         id="regex-mode"
@@ -528,6 +574,32 @@ const ScraperPage = () => {
                       />
                       <Label htmlFor="regex-mode">Enable Regex Mode</Label>
                     </div>
+                    
+                    <div className="flex items-center space-x-2">
+                      <Switch
+                        id="skip-near-duplicates"
+                        checked={advancedSettings.skipNearDuplicates}
+                        onCheckedChange={(checked) => setAdvancedSettings(prev => ({
+                          ...prev,
+                          skipNearDuplicates: checked
+                        }))}
+                        disabled={isRunning}
+                      />
+                      <Label htmlFor="skip-near-duplicates">Skip Reposts of Pastes Already Found</Label>
+                    </div>
+                    
+                    <div className="flex items-center space-x-2">
+                      <Switch
+                        id="detect-secrets"
+                        checked={advancedSettings.detectSecrets}
+                        onCheckedChange={(checked) => setAdvancedSettings(prev => ({
+                          ...prev,
+                          detectSecrets: checked
+                        }))}
+                        disabled={isRunning}
+                      />
+                      <Label htmlFor="detect-secrets">Detect API Keys and Secrets</Label>
+                    </div>
                   </TabsContent>
                 </Tabs>
 
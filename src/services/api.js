@@ -164,7 +164,36 @@ class ApiService {
     return await this.request(`/export/session/${sessionId}?format=${format}`);
   }
 
-  // Real-time updates (polling-based for now)
+  // Real-time updates over Server-Sent Events. EventSource reconnects on its
+  // own and sends Last-Event-ID, so only missed events are replayed.
+  // Returns a function that closes the stream.
+  streamSession(sessionId, handlers = {}) {
+    const source = new EventSource(`${API_BASE_URL}/sessions/${sessionId}/stream`);
+
+    const on = (event, handler) => {
+      source.addEventListener(event, (message) => {
+        const data = JSON.parse(message.data);
+        if (handler) handler(data);
+        const status = event === 'snapshot' ? data.session.status : data.status;
+        if (['completed', 'stopped', 'error'].includes(status)) {
+          source.close();
+        }
+      });
+    };
+
+    on('snapshot', handlers.onSnapshot);
+    on('log', handlers.onLog);
+    on('progress', handlers.onProgress);
+    on('result', handlers.onResult);
+    on('status', handlers.onStatus);
+    source.onerror = (error) => {
+      if (handlers.onError) handlers.onError(error);
+    };
+
+    return () => source.close();
+  }
+
+  // Polling fallback for environments without EventSource
   async pollSessionStatus(sessionId, callback, interval = 2000) {
     const poll = async () => {
       try {